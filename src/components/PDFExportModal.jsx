@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle } from '@/components/ui/dialog'
 import { Button } from '@/components/ui/button'
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card'
@@ -8,6 +8,9 @@ import { Label } from '@/components/ui/label'
 import { Separator } from '@/components/ui/separator'
 import { CheckCircle, Download, CreditCard, FileText, Star, Zap, Shield, Crown } from 'lucide-react'
 
+const PDF_POLL_INTERVAL_MS = 1000
+const PDF_POLL_TIMEOUT_MS = 5 * 60 * 1000
+
 export default function PDFExportModal({ isOpen, onClose, familyTree }) {
   const [step, setStep] = useState('plans') // plans, payment, processing, success
   const [selectedPlan, setSelectedPlan] = useState(null)
@@ -15,6 +18,9 @@ export default function PDFExportModal({ isOpen, onClose, familyTree }) {
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState(null)
   const [downloadUrl, setDownloadUrl] = useState(null)
+  const [progress, setProgress] = useState(null)
+  // Cleared when the modal closes so an in-flight poll stops updating it
+  const pollingRef = useRef(false)
   const [paymentForm, setPaymentForm] = useState({
     cardNumber: '',
     expiryDate: '',
@@ -47,9 +53,35 @@ export default function PDFExportModal({ isOpen, onClose, familyTree }) {
     setStep('payment')
   }
 
+  // Queued exports answer 202 until rendered; poll the job until its file is ready
+  const waitForPdf = async (statusUrl) => {
+    const deadline = Date.now() + PDF_POLL_TIMEOUT_MS
+    while (pollingRef.current) {
+      const response = await fetch(statusUrl)
+      const data = await response.json()
+      if (!data.success) {
+        throw new Error(data.error)
+      }
+      if (data.job.status === 'done') {
+        return true
+      }
+      if (data.job.status === 'failed') {
+        throw new Error(data.job.error || 'PDF generation failed')
+      }
+      if (Date.now() > deadline) {
+        throw new Error('PDF generation is taking longer than expected. Please try again later.')
+      }
+      setProgress(data.job.progress)
+      await new Promise(resolve => setTimeout(resolve, PDF_POLL_INTERVAL_MS))
+    }
+    return false
+  }
+
   const handlePayment = async () => {
     setLoading(true)
     setError(null)
+    setProgress(null)
+    pollingRef.current = true
 
     try {
       // Create payment intent
@@ -88,6 +120,10 @@ export default function PDFExportModal({ isOpen, onClose, familyTree }) {
         throw new Error(confirmData.error)
       }
 
+      if (confirmData.status !== 'done' && !(await waitForPdf(confirmData.status_url))) {
+        return
+      }
+
       setDownloadUrl(confirmData.download_url)
       setStep('success')
 
@@ -111,6 +147,7 @@ export default function PDFExportModal({ isOpen, onClose, familyTree }) {
     setSelectedPlan(null)
     setError(null)
     setDownloadUrl(null)
+    setProgress(null)
     setPaymentForm({
       cardNumber: '',
       expiryDate: '',
@@ -121,6 +158,7 @@ export default function PDFExportModal({ isOpen, onClose, familyTree }) {
   }
 
   const handleClose = () => {
+    pollingRef.current = false
     resetModal()
     onClose()
   }
@@ -300,7 +338,9 @@ export default function PDFExportModal({ isOpen, onClose, familyTree }) {
       <div className="animate-spin rounded-full h-16 w-16 border-b-2 border-green-600 mx-auto"></div>
       <div>
         <h3 className="text-lg font-semibold mb-2">Processing Your Payment</h3>
-        <p className="text-gray-600">Please wait while we generate your PDF...</p>
+        <p className="text-gray-600">
+          Please wait while we generate your PDF...{progress !== null && ` ${progress}%`}
+        </p>
       </div>
     </div>
   )
@@ -0,0 +1,124 @@
+from flask.cli import with_appcontext
+from src.models.user import db
+from src.models.strain import Strain
+from src.models.family_tree import FamilyTree, Cross
+from sqlalchemy import bindparam, case, event, func, select
+from sqlalchemy.orm import Session, attributes
+from collections import Counter
+import click
+
+# Cross columns the counters are derived from
+COUNTED_COLUMNS = ('family_tree_id', 'parent1_id', 'parent2_id', 'offspring_id', 'generation')
+
+# Denormalized columns kept by this module, as 'table.column'
+COUNTER_COLUMNS = {'family_tree.crosses_count', 'family_tree.max_generation', 'strain.usage_count'}
+
+def apply_cross_counters(connection, crosses, sign=1):
+    """Add (sign=1) or remove (sign=-1) crosses from the denormalized counters.
+
+    `crosses` are dicts holding COUNTED_COLUMNS, as inserted by Core. Every counter moves with one
+    relative UPDATE per tree or strain on `connection`, so the change
+    commits or rolls back with the crosses themselves.
+    """
+    tree_deltas = Counter()
+    tree_generations = {}
+    strain_deltas = Counter()
+    for cross in crosses:
+        tree_id = cross['family_tree_id']
+        tree_deltas[tree_id] += sign
+        tree_generations[tree_id] = max(tree_generations.get(tree_id, 0), cross['generation'] or 0)
+        for role in ('parent1_id', 'parent2_id', 'offspring_id'):
+            strain_deltas[cross[role]] += sign
+
+    trees = FamilyTree.__table__
+    strains = Strain.__table__
+    if tree_deltas:
+        connection.execute(
+            trees.update().where(trees.c.id == bindparam('tree_id')).values(
+                crosses_count=trees.c.crosses_count + bindparam('delta')
+            ),
+            [{'tree_id': tree_id, 'delta': delta} for tree_id, delta in tree_deltas.items()]
+        )
+        if sign > 0:
+            connection.execute(
+                trees.update().where(trees.c.id == bindparam('tree_id')).values(
+                    max_generation=case(
+                        (trees.c.max_generation < bindparam('generation'), bindparam('generation')),
+                        else_=trees.c.max_generation
+                    )
+                ),
+                [{'tree_id': tree_id, 'generation': generation} for tree_id, generation in tree_generations.items()]
+            )
+        else:
+            refresh_max_generation(connection, tree_deltas)
+    if strain_deltas:
+        connection.execute(
+            strains.update().where(strains.c.id == bindparam('strain_id')).values(
+                usage_count=strains.c.usage_count + bindparam('delta')
+            ),
+            [{'strain_id': strain_id, 'delta': delta} for strain_id, delta in strain_deltas.items()]
+        )
+
+def refresh_max_generation(connection, tree_ids):
+    trees = FamilyTree.__table__
+    crosses = Cross.__table__
+    highest = select(func.coalesce(func.max(crosses.c.generation), 0)).where(
+        crosses.c.family_tree_id == trees.c.id
+    ).scalar_subquery()
+    connection.execute(trees.update().where(trees.c.id.in_(list(tree_ids))).values(max_generation=highest))
+
+def counted_values(cross):
+    return {column: getattr(cross, column) for column in COUNTED_COLUMNS}
+
+@event.listens_for(Session, 'after_flush')
+def track_cross_counters(session, flush_context):
+    """Keep counters in step with crosses written through the ORM"""
+    added = [counted_values(obj) for obj in session.new if isinstance(obj, Cross)]
+    removed = [counted_values(obj) for obj in session.deleted if isinstance(obj, Cross)]
+    regenerated = {
+        obj.family_tree_id for obj in session.dirty
+        if isinstance(obj, Cross) and attributes.get_history(obj, 'generation').has_changes()
+    }
+    if not (added or removed or regenerated):
+        return
+    connection = session.connection()
+    if added:
+        apply_cross_counters(connection, added, 1)
+    if removed:
+        apply_cross_counters(connection, removed, -1)
+    if regenerated:
+        refresh_max_generation(connection, regenerated)
+
+def reconcile_counters():
+    """Recompute every counter from the cross table, returning (trees, strains) corrected"""
+    trees = FamilyTree.__table__
+    strains = Strain.__table__
+    crosses = Cross.__table__
+
+    tree_count = select(func.count(crosses.c.id)).where(crosses.c.family_tree_id == trees.c.id).scalar_subquery()
+    tree_generation = select(func.coalesce(func.max(crosses.c.generation), 0)).where(
+        crosses.c.family_tree_id == trees.c.id
+    ).scalar_subquery()
+    fixed_trees = db.session.execute(
+        trees.update().where(
+            (trees.c.crosses_count != tree_count) | (trees.c.max_generation != tree_generation)
+        ).values(crosses_count=tree_count, max_generation=tree_generation)
+    ).rowcount
+
+    usage = sum(
+        select(func.count(crosses.c.id)).where(column == strains.c.id).scalar_subquery()
+        for column in (crosses.c.parent1_id, crosses.c.parent2_id, crosses.c.offspring_id)
+    )
+    fixed_strains = db.session.execute(
+        strains.update().where(strains.c.usage_count != usage).values(usage_count=usage)
+    ).rowcount
+
+    db.session.commit()
+    return fixed_trees, fixed_strains
+
+@click.command('reconcile-counters')
+@with_appcontext
+def reconcile_counters_command():
+    """Recompute crosses_count, max_generation and usage_count from the crosses."""
+    fixed_trees, fixed_strains = reconcile_counters()
+    click.echo(f'Corrected {fixed_trees} trees and {fixed_strains} strains')
@@ -1,4 +1,7 @@
-from src.models.user import db
+from src.models.user import db, User
+from src.models.strain import Strain, serialize_value
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, load_only, aliased
 from datetime import datetime
 import uuid
 
@@ -11,14 +14,44 @@ class FamilyTree(db.Model):
     owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     is_public = db.Column(db.Boolean, default=False)
     share_token = db.Column(db.String(36), unique=True, default=lambda: str(uuid.uuid4()))
+
+    # Denormalized from the tree's crosses; maintained by src.models.counters
+    crosses_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    max_generation = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Relationships
     crosses = db.relationship('Cross', backref='family_tree', lazy=True, cascade='all, delete-orphan')
 
+    __table_args__ = (
+        # Owner listings and the public catalog, both newest first
+        db.Index('ix_family_tree_owner_updated', 'owner_id', 'updated_at'),
+        db.Index('ix_family_tree_public_updated', 'is_public', 'updated_at'),
+    )
+
+    # Serialized fields that are not plain columns
+    DERIVED_FIELDS = ['owner_username']
+
     def __repr__(self):
         return f'<FamilyTree {self.name}>'
 
-    def to_dict(self):
+    @classmethod
+    def field_names(cls):
+        return [column.key for column in cls.__table__.columns] + cls.DERIVED_FIELDS
+
+    @classmethod
+    def load_options(cls, fields=None, extra_columns=()):
+        """Loader options that fetch exactly what to_dict(fields) will read"""
+        if fields is None:
+            return [joinedload(cls.owner)]
+        columns = [getattr(cls, field) for field in fields if field not in cls.DERIVED_FIELDS]
+        options = [load_only(cls.id, *columns, *extra_columns)]
+        if 'owner_username' in fields:
+            options.append(joinedload(cls.owner).load_only(User.username))
+        return options
+
+    def to_dict(self, fields=None):
+        if fields is not None:
+            return {field: self.field_value(field) for field in fields}
         return {
             'id': self.id,
             'name': self.name,
@@ -29,9 +62,15 @@ class FamilyTree(db.Model):
             'owner_username': self.owner.username if self.owner else f'User {self.owner_id}',
             'is_public': self.is_public,
             'share_token': self.share_token,
-            'crosses_count': len(self.crosses) if self.crosses else 0
+            'crosses_count': self.crosses_count,
+            'max_generation': self.max_generation
         }
 
+    def field_value(self, field):
+        if field == 'owner_username':
+            return self.owner.username if self.owner else f'User {self.owner_id}'
+        return serialize_value(getattr(self, field))
+
 class Cross(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     parent1_id = db.Column(db.Integer, db.ForeignKey('strain.id'), nullable=False)
@@ -52,6 +91,15 @@ class Cross(db.Model):
     parent2_strain = db.relationship('Strain', foreign_keys=[parent2_id], lazy=True)
     offspring_strain = db.relationship('Strain', foreign_keys=[offspring_id], lazy=True)
 
+    __table_args__ = (
+        # Tree reads; the implicit rowid keeps them in id order
+        db.Index('ix_cross_family_tree', 'family_tree_id'),
+        # Strain lookups by role, covering the tree id they resolve to
+        db.Index('ix_cross_parent1_tree', 'parent1_id', 'family_tree_id'),
+        db.Index('ix_cross_parent2_tree', 'parent2_id', 'family_tree_id'),
+        db.Index('ix_cross_offspring_tree', 'offspring_id', 'family_tree_id'),
+    )
+
     def __repr__(self):
         return f'<Cross {self.parent1_strain.name} x {self.parent2_strain.name} = {self.offspring_strain.name}>'
 
@@ -73,3 +121,24 @@ class Cross(db.Model):
             'position_y': self.position_y
         }
 
+def tree_strain_versions(tree_id):
+    """(sum of strain versions, latest strain updated_at) over a tree's cross edges.
+
+    Cross writes bump the tree's updated_at, but strain edits only bump the
+    strain's version; anything rendered from strain names or details keys
+    on this sum as well. One aggregate query, without loading the crosses.
+    """
+    parent1 = aliased(Strain)
+    parent2 = aliased(Strain)
+    offspring = aliased(Strain)
+    versions, *modified = db.session.query(
+        func.coalesce(func.sum(parent1.version + parent2.version + offspring.version), 0),
+        func.max(parent1.updated_at),
+        func.max(parent2.updated_at),
+        func.max(offspring.updated_at)
+    ).select_from(Cross
+    ).join(parent1, Cross.parent1_id == parent1.id
+    ).join(parent2, Cross.parent2_id == parent2.id
+    ).join(offspring, Cross.offspring_id == offspring.id
+    ).filter(Cross.family_tree_id == tree_id).one()
+    return versions, max((value for value in modified if value), default=None)
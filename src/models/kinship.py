@@ -0,0 +1,130 @@
+from src.models.family_tree import tree_strain_versions
+from collections import OrderedDict, defaultdict
+import heapq
+import threading
+
+# Kinship results per tree version (see get_tree_kinship); trees are small, matrices are not
+CACHE_SIZE = 32
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def pedigree_order(crosses):
+    """Strains of a tree in topological order with their in-tree parents.
+
+    Each offspring takes its parents from its earliest cross in the tree.
+    Strains are released parents-first, lowest generation first among
+    those ready; members of a cycle fall back to founders for the parents
+    that are not yet placed.
+    """
+    parents = {}
+    generations = {}
+    strains = {}
+    for cross in sorted(crosses, key=lambda c: c.id):
+        for strain in (cross.parent1_strain, cross.parent2_strain, cross.offspring_strain):
+            strains[strain.id] = strain
+        if cross.offspring_id not in parents:
+            parents[cross.offspring_id] = (cross.parent1_id, cross.parent2_id)
+            generations[cross.offspring_id] = cross.generation or 0
+
+    children = defaultdict(list)
+    pending = {}
+    for strain_id in strains:
+        strain_parents = {p for p in parents.get(strain_id, ()) if p != strain_id}
+        pending[strain_id] = len(strain_parents)
+        for parent_id in strain_parents:
+            children[parent_id].append(strain_id)
+
+    ready = [(generations.get(s, 0), s) for s, count in pending.items() if count == 0]
+    heapq.heapify(ready)
+    order = []
+    placed = set()
+    while len(order) < len(strains):
+        if not ready:
+            stuck = min(s for s in strains if s not in placed)
+            heapq.heappush(ready, (generations.get(stuck, 0), stuck))
+        _, strain_id = heapq.heappop(ready)
+        if strain_id in placed:
+            continue
+        placed.add(strain_id)
+        order.append(strain_id)
+        for child_id in children[strain_id]:
+            pending[child_id] -= 1
+            if pending[child_id] == 0 and child_id not in placed:
+                heapq.heappush(ready, (generations.get(child_id, 0), child_id))
+
+    index = {strain_id: i for i, strain_id in enumerate(order)}
+    ordered_parents = []
+    for strain_id in order:
+        sire, dam = parents.get(strain_id, (None, None))
+        sire = index.get(sire) if sire in index and index[sire] < index[strain_id] else None
+        dam = index.get(dam) if dam in index and index[dam] < index[strain_id] else None
+        ordered_parents.append((sire, dam))
+
+    return [strains[s] for s in order], ordered_parents, generations
+
+def kinship_matrix(ordered_parents):
+    """Coefficient-of-coancestry matrix by the tabular method.
+
+    With strains in parents-first order each row only depends on earlier
+    rows: K[i, :i] is the mean of the parents' rows and K[i, i] is
+    (1 + K[sire, dam]) / 2. Unknown parents count as unrelated founders.
+    """
+    # numpy costs ~70ms to import; only kinship requests pay for it
+    import numpy as np
+    n = len(ordered_parents)
+    K = np.zeros((n, n), dtype=np.float64)
+    for i, (sire, dam) in enumerate(ordered_parents):
+        if sire is not None and dam is not None:
+            K[i, :i] = 0.5 * (K[sire, :i] + K[dam, :i])
+            K[i, i] = 0.5 * (1.0 + K[sire, dam])
+        elif sire is not None or dam is not None:
+            known = sire if sire is not None else dam
+            K[i, :i] = 0.5 * K[known, :i]
+            K[i, i] = 0.5
+        else:
+            K[i, i] = 0.5
+        K[:i, i] = K[i, :i]
+    return K
+
+def compute_tree_kinship(crosses):
+    import numpy as np
+    strains, ordered_parents, generations = pedigree_order(crosses)
+    K = kinship_matrix(ordered_parents)
+    inbreeding = 2.0 * np.diag(K) - 1.0
+
+    return {
+        'strains': [{
+            'id': strain.id,
+            'name': strain.name,
+            'generation': generations.get(strain.id),
+            'is_founder': ordered_parents[i] == (None, None),
+            'inbreeding_coefficient': round(float(inbreeding[i]), 6)
+        } for i, strain in enumerate(strains)],
+        'kinship': np.round(K, 6).tolist(),
+        'mean_inbreeding': round(float(inbreeding.mean()), 6) if len(strains) else 0.0
+    }
+
+def get_tree_kinship(family_tree, load_crosses):
+    """Kinship analysis for a tree, cached per tree version.
+
+    The version is the tree's updated_at plus its strain-version sum, since
+    the result lists strain names and strain edits leave the tree alone.
+    `load_crosses` is only called on a cache miss, so repeated requests for
+    an unchanged tree never touch the cross rows.
+    """
+    strain_versions, _ = tree_strain_versions(family_tree.id)
+    key = (family_tree.id, family_tree.updated_at, strain_versions)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    result = compute_tree_kinship(load_crosses())
+
+    with _cache_lock:
+        _cache[key] = result
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
@@ -0,0 +1,496 @@
+from flask import current_app, has_app_context
+from flask.cli import with_appcontext
+from sqlalchemy import select, union_all, or_, literal, null, cast, true, case, event, Integer
+from sqlalchemy.orm import Session, attributes
+from src.models.user import db
+from src.models.strain import Strain
+from src.models.family_tree import FamilyTree, Cross
+from collections import defaultdict, deque
+import click
+
+DEFAULT_MAX_DEPTH = 20
+MAX_DEPTH_LIMIT = 100
+
+# Rows per IN (...) list, below SQLite's default bound-parameter limit
+CHUNK_SIZE = 500
+
+class StrainLineage(db.Model):
+    """Materialized ancestor/descendant closure over the crosses of public trees.
+
+    One row per (ancestor, descendant) pair with the shortest path length
+    and the number of distinct paths. Each cross contributes the edges
+    parent1 -> offspring and parent2 -> offspring; edges that would close a
+    cycle are left out so path counts stay finite. A path may run through
+    several trees, so rows cannot be filtered per tree: private trees are
+    left out entirely and their owners are answered by the CTE walk.
+    """
+    __tablename__ = 'strain_lineage'
+    ancestor_id = db.Column(db.Integer, db.ForeignKey('strain.id'), primary_key=True)
+    descendant_id = db.Column(db.Integer, db.ForeignKey('strain.id'), primary_key=True)
+    depth = db.Column(db.Integer, nullable=False)
+    path_count = db.Column(db.Integer, nullable=False, default=1)
+
+    __table_args__ = (
+        db.Index('ix_strain_lineage_descendant', 'descendant_id', 'ancestor_id'),
+    )
+
+def lineage_step(lineage, direction, user_id=None):
+    """Recursive term of query_lineage: one step from each reached strain through a visible cross.
+
+    Joins the cross table on its parent/offspring indexes at every level
+    instead of materializing every visible cross as an edge list up front,
+    so a shallow walk only reads the crosses it reaches. Ancestors step
+    offspring -> each parent, descendants parent -> offspring. Visible
+    crosses are those in public trees plus the given user's private trees.
+    """
+    visibility = FamilyTree.is_public == True
+    if user_id:
+        visibility = or_(visibility, FamilyTree.owner_id == user_id)
+    if direction == 'ancestors':
+        # One row per parent: pair each cross with sides 1 and 2
+        side = union_all(select(literal(1, Integer).label('side')), select(literal(2, Integer).label('side'))).subquery('side')
+        to_id = case((side.c.side == 1, Cross.parent1_id), else_=Cross.parent2_id)
+        reached = Cross.offspring_id == lineage.c.strain_id
+    else:
+        side = None
+        to_id = Cross.offspring_id
+        reached = or_(Cross.parent1_id == lineage.c.strain_id, Cross.parent2_id == lineage.c.strain_id)
+    step = select(
+        to_id, lineage.c.depth + 1, Cross.id, Cross.parent1_id,
+        Cross.parent2_id, Cross.offspring_id, Cross.generation, Cross.family_tree_id
+    ).select_from(lineage).join(Cross, reached).join(FamilyTree, FamilyTree.id == Cross.family_tree_id)
+    if side is not None:
+        step = step.join(side, true())
+    return step.where(visibility)
+
+def query_lineage(strain_id, direction='ancestors', max_depth=DEFAULT_MAX_DEPTH, user_id=None):
+    """Walk a strain's ancestors or descendants with one recursive query.
+
+    The recursive CTE uses UNION over (strain, depth, cross) rows and stops
+    at max_depth. There is no visited set: a pedigree that loops back on
+    itself (a backcross recorded in both directions, bad data) re-expands
+    its cycle on every level down to max_depth. UNION still keeps each
+    (strain, depth, cross) row once, so such a walk costs at most
+    max_depth times the crosses it can reach. Tracking paths to cut cycles
+    would instead make rows grow with the number of distinct paths, which
+    repeated backcrossing makes exponential. Returns the nodes with their
+    shortest depth and every cross traversed.
+    """
+    # Typed so PostgreSQL agrees with the recursive term's column types
+    null_id = cast(null(), Integer)
+
+    lineage = select(
+        literal(strain_id, Integer).label('strain_id'),
+        literal(0, Integer).label('depth'),
+        null_id.label('cross_id'), null_id.label('parent1_id'), null_id.label('parent2_id'),
+        null_id.label('offspring_id'), null_id.label('generation'), null_id.label('family_tree_id')
+    ).cte('lineage', recursive=True)
+    lineage = lineage.union(
+        lineage_step(lineage, direction, user_id).where(lineage.c.depth < max_depth)
+    )
+
+    rows = db.session.execute(
+        select(
+            lineage, Strain.name, Strain.strain_type, Strain.is_verified, Strain.is_lab_tested
+        ).join(Strain, Strain.id == lineage.c.strain_id)
+    ).all()
+
+    nodes = {}
+    crosses = {}
+    for row in rows:
+        node = nodes.get(row.strain_id)
+        if node is None:
+            nodes[row.strain_id] = {
+                'id': row.strain_id,
+                'name': row.name,
+                'strain_type': row.strain_type,
+                'is_verified': row.is_verified,
+                'is_lab_tested': row.is_lab_tested,
+                'depth': row.depth
+            }
+        elif row.depth < node['depth']:
+            node['depth'] = row.depth
+        if row.cross_id is not None and row.cross_id not in crosses:
+            crosses[row.cross_id] = {
+                'id': row.cross_id,
+                'parent1_id': row.parent1_id,
+                'parent2_id': row.parent2_id,
+                'offspring_id': row.offspring_id,
+                'generation': row.generation,
+                'family_tree_id': row.family_tree_id
+            }
+
+    return {
+        'strain_id': strain_id,
+        'direction': direction,
+        'max_depth': max_depth,
+        'depth_reached': max((n['depth'] for n in nodes.values()), default=0),
+        'nodes': sorted(nodes.values(), key=lambda n: (n['depth'], n['name'] or '')),
+        'edges': list(crosses.values())
+    }
+
+def closure_enabled():
+    return current_app.config.get('LINEAGE_CLOSURE_ENABLED', False)
+
+def closure_covers(user_id=None):
+    """Whether the closure holds every cross the caller can see.
+
+    True for anonymous callers and for users without crosses in private
+    trees of their own; anyone else needs the visibility-filtered walk.
+    """
+    if not user_id:
+        return True
+    private_cross = select(Cross.id).join(FamilyTree, FamilyTree.id == Cross.family_tree_id).where(
+        FamilyTree.owner_id == user_id, FamilyTree.is_public.is_not(True)
+    ).limit(1)
+    return db.session.execute(private_cross).first() is None
+
+def closure_edges():
+    """Parent edges the closure is built from: crosses in public trees"""
+    return select(Cross.parent1_id, Cross.parent2_id, Cross.offspring_id).join(
+        FamilyTree, FamilyTree.id == Cross.family_tree_id
+    ).where(FamilyTree.is_public == True)
+
+def chunked(values, size=CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def upsert_statement(table):
+    # Dialect modules are imported on first write rather than at startup
+    from sqlalchemy.dialects import sqlite, postgresql
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return sqlite.insert(table)
+    if dialect == 'postgresql':
+        return postgresql.insert(table)
+    raise NotImplementedError(f'Lineage closure does not support {dialect}')
+
+def closure_row(ancestor_id, descendant_id):
+    table = StrainLineage.__table__
+    return db.session.execute(
+        select(table.c.depth, table.c.path_count).where(
+            table.c.ancestor_id == ancestor_id, table.c.descendant_id == descendant_id
+        )
+    ).first()
+
+def add_lineage_edge(parent_id, child_id):
+    """Add every path running through the edge parent -> child.
+
+    Runs in the caller's transaction. For each ancestor a of the parent and
+    each descendant d of the child (both including themselves) the pair
+    (a, d) gains path_count(a, parent) * path_count(child, d) paths, merged
+    in with a single INSERT ... SELECT ... ON CONFLICT.
+    """
+    table = StrainLineage.__table__
+    if parent_id == child_id or closure_row(child_id, parent_id):
+        return False
+
+    ancestors = union_all(
+        select(table.c.ancestor_id, table.c.depth, table.c.path_count).where(table.c.descendant_id == parent_id),
+        select(literal(parent_id, Integer), literal(0, Integer), literal(1, Integer))
+    ).subquery('a')
+    descendants = union_all(
+        select(table.c.descendant_id, table.c.depth, table.c.path_count).where(table.c.ancestor_id == child_id),
+        select(literal(child_id, Integer), literal(0, Integer), literal(1, Integer))
+    ).subquery('d')
+    paths = select(
+        ancestors.c.ancestor_id,
+        descendants.c.descendant_id,
+        ancestors.c.depth + descendants.c.depth + 1,
+        ancestors.c.path_count * descendants.c.path_count
+    ).select_from(ancestors.join(descendants, true())).where(true())
+
+    insert = upsert_statement(table).from_select(
+        ['ancestor_id', 'descendant_id', 'depth', 'path_count'], paths
+    )
+    insert = insert.on_conflict_do_update(
+        index_elements=['ancestor_id', 'descendant_id'],
+        set_={
+            'depth': case((insert.excluded.depth < table.c.depth, insert.excluded.depth), else_=table.c.depth),
+            'path_count': table.c.path_count + insert.excluded.path_count
+        }
+    )
+    db.session.execute(insert)
+    return True
+
+def add_cross_to_lineage(cross):
+    if not closure_enabled():
+        return
+    family_tree = db.session.get(FamilyTree, cross.family_tree_id)
+    if not family_tree or not family_tree.is_public:
+        return
+    add_lineage_edge(cross.parent1_id, cross.offspring_id)
+    add_lineage_edge(cross.parent2_id, cross.offspring_id)
+
+@event.listens_for(Session, 'after_flush')
+def track_lineage_edges(session, flush_context):
+    """Recompute closure rows under crosses removed from, or moved into, the closure.
+
+    Catches every ORM delete path (single crosses as well as trees and
+    users whose crosses go with them by cascade) and trees switching
+    between public and private. Shortest depths cannot be decremented in
+    place, so each offspring and all of its descendants get their ancestor
+    sets rebuilt from the remaining public crosses.
+    """
+    if not has_app_context() or not closure_enabled():
+        return
+    affected = {obj.offspring_id for obj in session.deleted if isinstance(obj, Cross)}
+    toggled = [
+        obj.id for obj in session.dirty
+        if isinstance(obj, FamilyTree) and attributes.get_history(obj, 'is_public').has_changes()
+    ]
+    if toggled:
+        affected.update(session.execute(
+            select(Cross.offspring_id).where(Cross.family_tree_id.in_(toggled))
+        ).scalars())
+    if affected:
+        refresh_lineage(affected)
+
+def refresh_lineage(offspring_ids):
+    """Rebuild the closure below a set of strains, e.g. after batch cross writes"""
+    if not closure_enabled():
+        return
+    table = StrainLineage.__table__
+    affected = set(offspring_ids)
+    for chunk in chunked(offspring_ids):
+        affected.update(db.session.execute(
+            select(table.c.descendant_id).where(table.c.ancestor_id.in_(chunk))
+        ).scalars())
+    rebuild_lineage(affected)
+
+def rebuild_lineage(strain_ids=None):
+    """Recompute the closure for the given descendants, or for every strain.
+
+    Ancestor sets are derived from parent edges in topological order, so
+    each strain's set is the merge of its parents' sets shifted by one.
+    """
+    table = StrainLineage.__table__
+
+    if strain_ids is None:
+        db.session.execute(table.delete())
+        edges = db.session.execute(closure_edges()).all()
+        affected = {edge.offspring_id for edge in edges}
+    else:
+        affected = set(strain_ids)
+        edges = []
+        for chunk in chunked(affected):
+            db.session.execute(table.delete().where(table.c.descendant_id.in_(chunk)))
+            edges.extend(db.session.execute(closure_edges().where(Cross.offspring_id.in_(chunk))).all())
+
+    parents = defaultdict(list)
+    children = defaultdict(list)
+    pending = defaultdict(int)
+    for edge in edges:
+        for parent_id in (edge.parent1_id, edge.parent2_id):
+            parents[edge.offspring_id].append(parent_id)
+            if parent_id in affected and parent_id != edge.offspring_id:
+                children[parent_id].append(edge.offspring_id)
+                pending[edge.offspring_id] += 1
+
+    # Ancestor sets of parents outside the rebuilt set are already correct
+    outside = {p for ids in parents.values() for p in ids if p not in affected}
+    closure = defaultdict(dict)
+    for chunk in chunked(outside):
+        for row in db.session.execute(
+            select(table.c.ancestor_id, table.c.descendant_id, table.c.depth, table.c.path_count)
+            .where(table.c.descendant_id.in_(chunk))
+        ):
+            closure[row.descendant_id][row.ancestor_id] = (row.depth, row.path_count)
+
+    order = deque(strain_id for strain_id in affected if not pending[strain_id])
+    remaining = set(affected)
+    rows = []
+    while remaining:
+        if not order:
+            # Only cycles are left: break one and carry on with what is known
+            order.append(min(remaining))
+        strain_id = order.popleft()
+        if strain_id not in remaining:
+            continue
+        remaining.discard(strain_id)
+
+        ancestors = {}
+        for parent_id in parents[strain_id]:
+            if parent_id == strain_id or (parent_id in affected and parent_id in remaining):
+                continue
+            inherited = [(parent_id, (0, 1))] + list(closure[parent_id].items())
+            for ancestor_id, (depth, path_count) in inherited:
+                if ancestor_id == strain_id:
+                    continue
+                if ancestor_id in ancestors:
+                    known_depth, known_count = ancestors[ancestor_id]
+                    ancestors[ancestor_id] = (min(known_depth, depth + 1), known_count + path_count)
+                else:
+                    ancestors[ancestor_id] = (depth + 1, path_count)
+        closure[strain_id] = ancestors
+        rows.extend(
+            {'ancestor_id': a, 'descendant_id': strain_id, 'depth': d, 'path_count': c}
+            for a, (d, c) in ancestors.items()
+        )
+
+        for child_id in children[strain_id]:
+            pending[child_id] -= 1
+            if pending[child_id] == 0:
+                order.append(child_id)
+
+        if len(rows) >= 10000:
+            db.session.execute(table.insert(), rows)
+            rows = []
+    if rows:
+        db.session.execute(table.insert(), rows)
+
+def lineage_relationship(strain_a_id, strain_b_id, user_id=None):
+    """Direct ancestry and shared ancestors of a pair of strains.
+
+    Served from the closure when it covers the caller, otherwise derived
+    from ancestor walks over the crosses the caller can see.
+    """
+    if not closure_covers(user_id):
+        return walked_relationship(strain_a_id, strain_b_id, user_id)
+
+    table = StrainLineage.__table__
+    a_to_b = closure_row(strain_a_id, strain_b_id)
+    b_to_a = closure_row(strain_b_id, strain_a_id)
+
+    lineage_a = table.alias('lineage_a')
+    lineage_b = table.alias('lineage_b')
+    shared = db.session.execute(
+        select(
+            lineage_a.c.ancestor_id, Strain.name,
+            lineage_a.c.depth.label('depth_a'), lineage_b.c.depth.label('depth_b'),
+            lineage_a.c.path_count.label('paths_a'), lineage_b.c.path_count.label('paths_b')
+        )
+        .join(lineage_b, lineage_b.c.ancestor_id == lineage_a.c.ancestor_id)
+        .join(Strain, Strain.id == lineage_a.c.ancestor_id)
+        .where(lineage_a.c.descendant_id == strain_a_id, lineage_b.c.descendant_id == strain_b_id)
+        .order_by(lineage_a.c.depth + lineage_b.c.depth, Strain.name)
+    ).all()
+
+    return {
+        'strain_a_id': strain_a_id,
+        'strain_b_id': strain_b_id,
+        'a_is_ancestor_of_b': dict(a_to_b._mapping) if a_to_b else None,
+        'b_is_ancestor_of_a': dict(b_to_a._mapping) if b_to_a else None,
+        'shared_ancestors': [{
+            'id': row.ancestor_id,
+            'name': row.name,
+            'depth_a': row.depth_a,
+            'depth_b': row.depth_b,
+            'path_count_a': row.paths_a,
+            'path_count_b': row.paths_b
+        } for row in shared]
+    }
+
+def walked_lineage(strain_id, direction, user_id=None):
+    """Closure-shaped {strain_id: (depth, path_count)} and node details from one CTE walk.
+
+    Covers the ancestors or descendants of a strain over the crosses the
+    caller can see. Like the closure, edges that would close a cycle are
+    skipped.
+    """
+    lineage = query_lineage(strain_id, direction, max_depth=MAX_DEPTH_LIMIT, user_id=user_id)
+    nodes = {node['id']: node for node in lineage['nodes']}
+    steps = defaultdict(list)
+    for edge in lineage['edges']:
+        for parent_id in (edge['parent1_id'], edge['parent2_id']):
+            if direction == 'ancestors':
+                steps[edge['offspring_id']].append(parent_id)
+            else:
+                steps[parent_id].append(edge['offspring_id'])
+
+    known = {}
+    def reachable_from(node_id, path):
+        if node_id in known:
+            return known[node_id]
+        reached = {}
+        for next_id in steps[node_id]:
+            if next_id in path:
+                continue
+            inherited = [(next_id, (0, 1))] + list(reachable_from(next_id, path | {next_id}).items())
+            for other_id, (depth, path_count) in inherited:
+                if other_id in reached:
+                    known_depth, known_count = reached[other_id]
+                    reached[other_id] = (min(known_depth, depth + 1), known_count + path_count)
+                else:
+                    reached[other_id] = (depth + 1, path_count)
+        known[node_id] = reached
+        return reached
+
+    return reachable_from(strain_id, {strain_id}), nodes
+
+def walked_relationship(strain_a_id, strain_b_id, user_id=None):
+    ancestors_a, nodes = walked_lineage(strain_a_id, 'ancestors', user_id)
+    ancestors_b, nodes_b = walked_lineage(strain_b_id, 'ancestors', user_id)
+    nodes.update(nodes_b)
+
+    def ancestry(ancestor_id, ancestors):
+        if ancestor_id not in ancestors:
+            return None
+        depth, path_count = ancestors[ancestor_id]
+        return {'depth': depth, 'path_count': path_count}
+
+    shared = sorted(
+        set(ancestors_a) & set(ancestors_b),
+        key=lambda ancestor_id: (ancestors_a[ancestor_id][0] + ancestors_b[ancestor_id][0], nodes[ancestor_id]['name'] or '')
+    )
+    return {
+        'strain_a_id': strain_a_id,
+        'strain_b_id': strain_b_id,
+        'a_is_ancestor_of_b': ancestry(strain_a_id, ancestors_b),
+        'b_is_ancestor_of_a': ancestry(strain_b_id, ancestors_a),
+        'shared_ancestors': [{
+            'id': ancestor_id,
+            'name': nodes[ancestor_id]['name'],
+            'depth_a': ancestors_a[ancestor_id][0],
+            'depth_b': ancestors_b[ancestor_id][0],
+            'path_count_a': ancestors_a[ancestor_id][1],
+            'path_count_b': ancestors_b[ancestor_id][1]
+        } for ancestor_id in shared]
+    }
+
+def lineage_descendants(strain_id, max_depth=None, user_id=None):
+    """Flat descendant list of a strain, nearest first.
+
+    Served from the closure when it covers the caller, otherwise derived
+    from a descendant walk over the crosses the caller can see.
+    """
+    if closure_covers(user_id):
+        return closure_descendants(strain_id, max_depth=max_depth)
+
+    descendants, nodes = walked_lineage(strain_id, 'descendants', user_id)
+    flat = [
+        {**nodes[descendant_id], 'depth': depth, 'path_count': path_count}
+        for descendant_id, (depth, path_count) in descendants.items()
+        if not max_depth or depth <= max_depth
+    ]
+    return sorted(flat, key=lambda node: (node['depth'], node['name'] or ''))
+
+def closure_descendants(strain_id, max_depth=None):
+    """All descendants of a strain from the closure table, nearest first"""
+    table = StrainLineage.__table__
+    query = select(
+        table.c.descendant_id, table.c.depth, table.c.path_count,
+        Strain.name, Strain.strain_type, Strain.is_verified, Strain.is_lab_tested
+    ).join(Strain, Strain.id == table.c.descendant_id).where(table.c.ancestor_id == strain_id)
+    if max_depth:
+        query = query.where(table.c.depth <= max_depth)
+    return [{
+        'id': row.descendant_id,
+        'name': row.name,
+        'strain_type': row.strain_type,
+        'is_verified': row.is_verified,
+        'is_lab_tested': row.is_lab_tested,
+        'depth': row.depth,
+        'path_count': row.path_count
+    } for row in db.session.execute(query.order_by(table.c.depth, Strain.name))]
+
+@click.command('rebuild-lineage')
+@with_appcontext
+def rebuild_lineage_command():
+    """Rebuild the strain lineage closure table from all crosses."""
+    db.create_all()
+    rebuild_lineage()
+    db.session.commit()
+    count = db.session.query(StrainLineage).count()
+    click.echo(f'Rebuilt strain lineage closure: {count} ancestor/descendant pairs')
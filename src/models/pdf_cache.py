@@ -0,0 +1,175 @@
+from flask import current_app
+from flask.cli import with_appcontext
+from src.models.user import db
+from src.models.pdf_export_job import PdfExportJob
+from src.models.family_tree import tree_strain_versions
+from datetime import datetime, timedelta
+import click
+import hashlib
+import os
+import threading
+import time
+
+# Bump when the PDF layout changes so stale renders are not served
+PDF_TEMPLATE_VERSION = 2
+
+# Total size of cached renders kept on disk
+PDF_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Partial renders and pre-cache files older than this are treated as orphans
+ORPHAN_AGE = timedelta(hours=1)
+
+# Renders nobody has downloaded or re-exported for this long are deleted
+UNUSED_RENDER_AGE = timedelta(hours=24)
+
+# Seconds between background sweeps of expired tokens and files
+SWEEP_INTERVAL = 600
+
+CACHE_PREFIX = 'tree_'
+
+# One-off renders made with the cache off; the download deletes them once sent
+EXPORT_PREFIX = 'export_'
+
+_evict_lock = threading.Lock()
+_sweeper = None
+
+def pdf_cache_dir():
+    """Render directory: PDF_CACHE_DIR, else generated_pdfs/ in the instance folder"""
+    path = current_app.config.get('PDF_CACHE_DIR') or os.path.join(current_app.instance_path, 'generated_pdfs')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def pdf_cache_key(family_tree, plan_type):
+    """Content address of a render: tree and strain versions, plan and template version.
+
+    The PDF prints strain names and details, and strain edits do not touch
+    the tree's updated_at, so the strain-version sum is part of the key.
+    """
+    version = family_tree.updated_at.isoformat() if family_tree.updated_at else ''
+    strain_versions, _ = tree_strain_versions(family_tree.id)
+    raw = f'{family_tree.id}|{version}|{strain_versions}|{plan_type}|{PDF_TEMPLATE_VERSION}'
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+def pdf_cache_path(family_tree, plan_type):
+    filename = f'{CACHE_PREFIX}{family_tree.id}_{plan_type}_{pdf_cache_key(family_tree, plan_type)}.pdf'
+    return os.path.join(pdf_cache_dir(), filename)
+
+def export_pdf_path(job_id):
+    return os.path.join(pdf_cache_dir(), f'{EXPORT_PREFIX}{job_id}.pdf')
+
+def cached_pdf(path):
+    """Return `path` if a finished render is cached there, marking it recently used"""
+    try:
+        os.utime(path)
+    except OSError:
+        return None
+    return path
+
+def referenced_paths():
+    """Files behind download tokens that have not expired yet"""
+    now = datetime.utcnow()
+    rows = db.session.query(PdfExportJob.pdf_path).filter(
+        PdfExportJob.pdf_path.isnot(None),
+        db.or_(PdfExportJob.expires_at.is_(None), PdfExportJob.expires_at > now)
+    )
+    return {os.path.abspath(path) for (path,) in rows}
+
+def evict_pdf_cache(max_bytes=PDF_CACHE_MAX_BYTES, max_age=None):
+    """Trim the render directory to `max_bytes`, least recently used first.
+
+    Files still behind a live download token are never evicted. Partial
+    renders (`*.tmp`) and files outside the cache naming scheme are removed
+    once they are older than ORPHAN_AGE, and with `max_age` so are renders
+    unused for that long. Returns the number of files removed.
+    """
+    with _evict_lock:
+        pdf_dir = pdf_cache_dir()
+        keep = referenced_paths()
+        now = time.time()
+        orphan_before = now - ORPHAN_AGE.total_seconds()
+        unused_before = now - max_age.total_seconds() if max_age else None
+        removed = 0
+        entries = []
+        total = 0
+        with os.scandir(pdf_dir) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                path = os.path.abspath(entry.path)
+                is_cache = entry.name.startswith(CACHE_PREFIX) and entry.name.endswith('.pdf')
+                if not is_cache:
+                    if stat.st_mtime < orphan_before and path not in keep:
+                        removed += remove_file(path)
+                    continue
+                if path in keep:
+                    total += stat.st_size
+                elif unused_before is not None and stat.st_mtime < unused_before:
+                    removed += remove_file(path)
+                else:
+                    total += stat.st_size
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            if remove_file(path):
+                total -= size
+                removed += 1
+        return removed
+
+def remove_file(path):
+    try:
+        os.remove(path)
+        return 1
+    except OSError:
+        return 0
+
+def sweep_expired_downloads(max_bytes=PDF_CACHE_MAX_BYTES):
+    """Drop expired download tokens, then the files no live token needs.
+
+    Only finished jobs are removed; a queued or running job keeps its row
+    until a worker settles it. Returns (tokens removed, files removed).
+    """
+    expired = PdfExportJob.query.filter(
+        PdfExportJob.status.in_(['done', 'failed']),
+        PdfExportJob.expires_at < datetime.utcnow()
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return expired, evict_pdf_cache(max_bytes, max_age=UNUSED_RENDER_AGE)
+
+def start_download_sweeper(app):
+    """Sweep expired downloads every PDF_SWEEP_INTERVAL seconds on a daemon thread.
+
+    Each web worker runs its own sweeper; the sweep is idempotent, so
+    overlapping runs across workers are harmless.
+    """
+    global _sweeper
+    interval = app.config.get('PDF_SWEEP_INTERVAL', SWEEP_INTERVAL)
+    if _sweeper is not None or not interval:
+        return
+
+    def run():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    sweep_expired_downloads(app.config.get('PDF_CACHE_MAX_BYTES', PDF_CACHE_MAX_BYTES))
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"PDF download sweep failed: {e}")
+                finally:
+                    db.session.remove()
+
+    _sweeper = threading.Thread(target=run, name='pdf-download-sweeper', daemon=True)
+    _sweeper.start()
+
+@click.command('prune-pdf-cache')
+@click.option('--max-mb', type=int, help='Cache size to trim to; defaults to PDF_CACHE_MAX_BYTES.')
+@with_appcontext
+def prune_pdf_cache_command(max_mb):
+    """Remove expired download tokens, stale PDF renders and orphaned files."""
+    max_bytes = max_mb * 1024 * 1024 if max_mb is not None else current_app.config.get('PDF_CACHE_MAX_BYTES', PDF_CACHE_MAX_BYTES)
+    tokens, files = sweep_expired_downloads(max_bytes)
+    click.echo(f'Removed {tokens} expired tokens and {files} files')
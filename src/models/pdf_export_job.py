@@ -0,0 +1,36 @@
+from src.models.user import db
+from datetime import datetime
+import uuid
+
+class PdfExportJob(db.Model):
+    """A queued PDF export; the table doubles as the job queue for the worker pool"""
+    __tablename__ = 'pdf_export_job'
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    family_tree_id = db.Column(db.Integer, db.ForeignKey('family_tree.id'), nullable=False)
+    plan_type = db.Column(db.String(20), nullable=False, default='basic')
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)  # queued, running, done, failed
+    progress = db.Column(db.Integer, nullable=False, default=0)  # 0-100
+    error = db.Column(db.Text)
+    pdf_path = db.Column(db.String(500))
+    download_token = db.Column(db.String(36), unique=True, default=lambda: str(uuid.uuid4()))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<PdfExportJob {self.id} {self.status}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'family_tree_id': self.family_tree_id,
+            'plan_type': self.plan_type,
+            'status': self.status,
+            'progress': self.progress,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'download_url': f'/api/pdf/download/{self.download_token}' if self.status == 'done' else None
+        }
@@ -0,0 +1,194 @@
+from src.models.user import db
+from src.models.strain import Strain
+from src.models.family_tree import Cross, tree_strain_versions
+from sqlalchemy.orm import aliased
+from collections import OrderedDict, defaultdict
+import heapq
+import threading
+
+# Layout units between neighbouring strains and between generations
+NODE_SPACING = 160
+LAYER_SPACING = 120
+MARGIN = 40
+
+# Alternating down/up barycenter passes used for crossing minimization
+SWEEPS = 8
+
+# Layouts per tree, keyed by tree version
+CACHE_SIZE = 64
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def tree_layout_edges(family_tree_id):
+    """Cross edges of a tree with strain names, as plain rows in one query"""
+    parent1 = aliased(Strain)
+    parent2 = aliased(Strain)
+    offspring = aliased(Strain)
+    return db.session.query(
+        Cross.id, Cross.parent1_id, Cross.parent2_id, Cross.offspring_id,
+        Cross.generation, Cross.position_x, Cross.position_y,
+        parent1.name.label('parent1_name'),
+        parent2.name.label('parent2_name'),
+        offspring.name.label('offspring_name')
+    ).join(parent1, Cross.parent1_id == parent1.id
+    ).join(parent2, Cross.parent2_id == parent2.id
+    ).join(offspring, Cross.offspring_id == offspring.id
+    ).filter(Cross.family_tree_id == family_tree_id
+    ).order_by(Cross.id).all()
+
+def assign_layers(nodes, parents, generations):
+    """Layer each strain below all of its parents, never above its generation.
+
+    Founders sit on layer 0 and an offspring goes on the deeper of its
+    cross generation and one below its lowest parent. Strains are placed
+    parents-first; a cycle is broken at its lowest id.
+    """
+    children = defaultdict(list)
+    pending = {}
+    for node in nodes:
+        node_parents = parents[node] - {node}
+        pending[node] = len(node_parents)
+        for parent in node_parents:
+            children[parent].append(node)
+
+    ready = [node for node in nodes if pending[node] == 0]
+    heapq.heapify(ready)
+    layers = {}
+    while len(layers) < len(nodes):
+        if not ready:
+            heapq.heappush(ready, min(node for node in nodes if node not in layers))
+        node = heapq.heappop(ready)
+        if node in layers:
+            continue
+        placed = [layers[p] + 1 for p in parents[node] if p in layers and p != node]
+        layers[node] = max([generations.get(node, 0)] + placed)
+        for child in children[node]:
+            pending[child] -= 1
+            if pending[child] == 0 and child not in layers:
+                heapq.heappush(ready, child)
+    return layers
+
+def order_layers(rows, parents, children, seed_keys):
+    """Barycenter crossing minimization over alternating sweeps.
+
+    Positions are normalized to [0, 1] within each row, so edges that skip
+    generations pull on their endpoints without dummy nodes. Each pass is
+    a sort per row, O(E + V log V).
+    """
+    position = {}
+    for row in rows:
+        row.sort(key=lambda node: seed_keys[node])
+        for i, node in enumerate(row):
+            position[node] = (i + 0.5) / len(row)
+
+    for sweep in range(SWEEPS):
+        downward = sweep % 2 == 0
+        neighbours = parents if downward else children
+        sequence = rows[1:] if downward else rows[-2::-1]
+        for row in sequence:
+            keys = {}
+            for node in row:
+                linked = [position[n] for n in neighbours[node] if n != node]
+                keys[node] = sum(linked) / len(linked) if linked else position[node]
+            row.sort(key=lambda node: keys[node])
+            for i, node in enumerate(row):
+                position[node] = (i + 0.5) / len(row)
+    return rows
+
+def layout_pedigree(edges):
+    """Layered pedigree layout from cross edges.
+
+    Strains are layered by generation, ordered within each layer to reduce
+    edge crossings, and spread out on a grid. An offspring whose cross has
+    a stored position keeps it and is marked pinned; the stored x also
+    seeds its initial order.
+    """
+    names = {}
+    parents = defaultdict(set)
+    children = defaultdict(set)
+    generations = {}
+    stored = {}
+    first_seen = {}
+    for edge in edges:
+        for strain_id, name in ((edge.parent1_id, edge.parent1_name),
+                                (edge.parent2_id, edge.parent2_name),
+                                (edge.offspring_id, edge.offspring_name)):
+            names[strain_id] = name
+            first_seen.setdefault(strain_id, len(first_seen))
+        for parent_id in (edge.parent1_id, edge.parent2_id):
+            parents[edge.offspring_id].add(parent_id)
+            children[parent_id].add(edge.offspring_id)
+        if edge.offspring_id not in generations:
+            generations[edge.offspring_id] = edge.generation or 0
+        if (edge.position_x or edge.position_y) and edge.offspring_id not in stored:
+            stored[edge.offspring_id] = (edge.position_x or 0, edge.position_y or 0)
+
+    nodes = list(names)
+    layers = assign_layers(nodes, parents, generations)
+    depth = max(layers.values(), default=-1) + 1
+    rows = [[] for _ in range(depth)]
+    for node in nodes:
+        rows[layers[node]].append(node)
+    rows = [row for row in rows if row]
+
+    seed_keys = {node: (stored[node][0] if node in stored else 0, first_seen[node]) for node in nodes}
+    order_layers(rows, parents, children, seed_keys)
+
+    widest = max((len(row) for row in rows), default=0)
+    layout_nodes = []
+    for layer, row in enumerate(rows):
+        offset = (widest - len(row)) * NODE_SPACING / 2
+        for order, node in enumerate(row):
+            x, y = MARGIN + offset + order * NODE_SPACING, MARGIN + layer * LAYER_SPACING
+            pinned = node in stored
+            if pinned:
+                x, y = stored[node]
+            layout_nodes.append({
+                'id': node,
+                'name': names[node],
+                'layer': layer,
+                'order': order,
+                'x': x,
+                'y': y,
+                'pinned': pinned
+            })
+
+    return {
+        'nodes': layout_nodes,
+        'edges': [{
+            'id': edge.id,
+            'parent1_id': edge.parent1_id,
+            'parent2_id': edge.parent2_id,
+            'offspring_id': edge.offspring_id
+        } for edge in edges],
+        'layers': len(rows),
+        'width': max((n['x'] for n in layout_nodes), default=0) + MARGIN,
+        'height': max((n['y'] for n in layout_nodes), default=0) + MARGIN
+    }
+
+def compute_tree_layout(family_tree_id):
+    return layout_pedigree(tree_layout_edges(family_tree_id))
+
+def get_tree_layout(family_tree):
+    """Layout for a tree, cached per tree version.
+
+    Every cross write bumps the tree's updated_at and every strain edit its
+    strain-version sum (nodes carry strain names), so a write moves the
+    tree to a new version; storing it drops the older layout straight away.
+    """
+    version = (family_tree.updated_at, tree_strain_versions(family_tree.id)[0])
+    with _cache_lock:
+        entry = _cache.get(family_tree.id)
+        if entry and entry[0] == version:
+            _cache.move_to_end(family_tree.id)
+            return entry[1]
+
+    layout = compute_tree_layout(family_tree.id)
+
+    with _cache_lock:
+        _cache[family_tree.id] = (version, layout)
+        _cache.move_to_end(family_tree.id)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return layout
@@ -0,0 +1,94 @@
+from flask.cli import with_appcontext
+from src.models.user import db
+from src.models.strain import Strain
+from src.models.counters import COUNTER_COLUMNS, reconcile_counters
+from src.models.strain_search import init_strain_search
+from sqlalchemy import inspect
+import click
+
+def ensure_columns():
+    """Add model columns missing from tables created by an older release.
+
+    db.create_all() only creates missing tables, so a column added to an
+    existing model would otherwise be absent from deployed databases. Only
+    additive changes are handled: each missing column is added with its
+    server default, which new NOT NULL columns must therefore declare.
+    Returns the added columns as 'table.column' names.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    dialect = db.engine.dialect
+    ddl_compiler = dialect.ddl_compiler(dialect, None)
+    added = []
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                ddl = f'ALTER TABLE {dialect.identifier_preparer.quote(table.name)} ADD COLUMN ' \
+                      f'{dialect.identifier_preparer.quote(column.name)} {column.type.compile(dialect)}'
+                default = ddl_compiler.get_column_default_string(column)
+                if default is not None:
+                    ddl += f' DEFAULT {default}'
+                if not column.nullable:
+                    ddl += ' NOT NULL'
+                connection.exec_driver_sql(ddl)
+                added.append(f'{table.name}.{column.name}')
+    return added
+
+def ensure_indexes():
+    """Create model indexes missing from tables created by an older release.
+
+    Like columns, indexes declared on an existing table are skipped by
+    db.create_all(). Returns the names of the indexes created.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    created = []
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in present:
+                    continue
+                index.create(bind=connection)
+                created.append(index.name)
+    return created
+
+def backfill_strain_flags():
+    """Set NULL verification flags to false.
+
+    Rows written before the flags had a server default may hold NULL;
+    catalog cursors compare the raw columns, which NULLs would fall out of.
+    """
+    strains = Strain.__table__
+    with db.engine.begin() as connection:
+        for column in (strains.c.is_lab_tested, strains.c.is_verified):
+            connection.execute(strains.update().where(column.is_(None)).values({column.name: False}))
+
+def init_database():
+    """Create and upgrade the schema: tables, new columns, indexes, data fixes, search index.
+
+    Runs inside an app context. Idempotent, so it is safe on every
+    development boot and as a deploy step via `flask init-db`.
+    """
+    db.create_all()
+    added_columns = ensure_columns()
+    ensure_indexes()
+    backfill_strain_flags()
+    # Counter columns start at zero on an existing database; fill them once
+    if COUNTER_COLUMNS.intersection(added_columns):
+        reconcile_counters()
+    init_strain_search()
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create missing tables, columns and indexes."""
+    init_database()
+    click.echo('Database schema is up to date')
@@ -0,0 +1,150 @@
+from flask import request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+import os
+import shutil
+import uuid
+
+# Pool defaults for server databases such as PostgreSQL
+DB_POOL_SIZE = 5
+DB_MAX_OVERFLOW = 10
+DB_POOL_RECYCLE = 1800
+
+# Committed development database; only ever read, as the seed for local_database_url()
+BUNDLED_DATABASE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'app.db')
+
+# Bind used for reads during GET/HEAD requests in SQLite production mode
+READONLY_BIND = 'readonly'
+
+# Seconds a connection waits on a locked database before raising
+SQLITE_BUSY_TIMEOUT = 15
+
+# Per-connection pragmas; journal_mode=WAL is persistent and set by the writer
+SQLITE_PRAGMAS = {
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # KiB when negative
+    'temp_store': 'MEMORY'
+}
+
+class ReadRoutingSession(Session):
+    """Session that sends SELECTs to the read-only bind while `read_only` is set.
+
+    Flushes, DML and raw SQL keep using the default bind, so a write made
+    during a GET still goes to the writer connection.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and self.info.get('read_only') and getattr(clause, 'is_select', False)
+                and READONLY_BIND in self._db.engines):
+            return self._db.engines[READONLY_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def database_url(value, default):
+    """Database URL from configuration, or `default` when unset.
+
+    Hosting providers still hand out postgres:// URLs, which SQLAlchemy
+    no longer accepts as an alias for postgresql://.
+    """
+    if not value:
+        return default
+    if value.startswith('postgres://'):
+        return 'postgresql://' + value[len('postgres://'):]
+    return value
+
+def local_database_url(app):
+    """SQLite URL of the working database in the instance folder.
+
+    On first use it starts as a copy of BUNDLED_DATABASE, so schema upgrades
+    and writes never modify the committed file. The copy is linked into
+    place, so workers booting together cannot overwrite each other's copy.
+    """
+    path = os.path.join(app.instance_path, 'app.db')
+    os.makedirs(app.instance_path, exist_ok=True)
+    if not os.path.exists(path) and os.path.exists(BUNDLED_DATABASE):
+        tmp_path = f'{path}.{uuid.uuid4().hex[:8]}.tmp'
+        shutil.copyfile(BUNDLED_DATABASE, tmp_path)
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+    return f'sqlite:///{path}'
+
+def configure_storage(app):
+    """Set engine options for the configured backend; call before db.init_app().
+
+    Server databases get a sized pool whose connections are pinged before
+    use and recycled, so workers survive database restarts and idle
+    timeouts. SQLite files get the production mode below when enabled.
+    """
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite':
+        return configure_sqlite_storage(app, url)
+
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    options.setdefault('pool_size', app.config.get('DB_POOL_SIZE', DB_POOL_SIZE))
+    options.setdefault('max_overflow', app.config.get('DB_MAX_OVERFLOW', DB_MAX_OVERFLOW))
+    options.setdefault('pool_recycle', app.config.get('DB_POOL_RECYCLE', DB_POOL_RECYCLE))
+    options.setdefault('pool_pre_ping', True)
+    return False
+
+def configure_sqlite_storage(app, url):
+    """Set SQLite engine options and the read-only bind.
+
+    Only applies when SQLITE_PRODUCTION is on and the database is a file.
+    Both engines get a busy timeout on connect; the read-only one opens
+    the same file with mode=ro.
+    """
+    if not app.config.get('SQLITE_PRODUCTION') or url.database in (None, '', ':memory:'):
+        return False
+
+    timeout = app.config.get('SQLITE_BUSY_TIMEOUT', SQLITE_BUSY_TIMEOUT)
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    options.setdefault('connect_args', {}).setdefault('timeout', timeout)
+    options.setdefault('pool_size', app.config.get('SQLITE_POOL_SIZE', 5))
+
+    path = url.database if os.path.isabs(url.database) else os.path.join(app.instance_path, url.database)
+    readonly_url = url.set(database=f'file:{path}', query={'mode': 'ro', 'uri': 'true'})
+    app.config.setdefault('SQLALCHEMY_BINDS', {})[READONLY_BIND] = {
+        'url': readonly_url.render_as_string(hide_password=False),
+        'connect_args': {'timeout': timeout},
+        'pool_size': app.config.get('SQLITE_READ_POOL_SIZE', 10)
+    }
+    return True
+
+def init_sqlite_storage(app, db):
+    """Install pragmas and GET read routing; call after db.init_app()"""
+    if READONLY_BIND not in app.config.get('SQLALCHEMY_BINDS', {}):
+        return
+
+    with app.app_context():
+        writer = db.engines[None]
+        reader = db.engines[READONLY_BIND]
+
+    @event.listens_for(writer, 'connect')
+    def set_writer_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        apply_pragmas(cursor)
+        cursor.close()
+
+    @event.listens_for(reader, 'connect')
+    def set_reader_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        apply_pragmas(cursor)
+        cursor.close()
+
+    # The writer switches the file to WAL before any reader opens it
+    with writer.connect():
+        pass
+
+    @app.before_request
+    def route_reads():
+        db.session.info['read_only'] = request.method in ('GET', 'HEAD')
+
+def apply_pragmas(cursor):
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f'PRAGMA {name}={value}')
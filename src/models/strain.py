@@ -1,5 +1,32 @@
-from src.models.user import db
-from datetime import datetime
+from src.models.user import db, User
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload, load_only
+from datetime import datetime, date
+
+def parse_fields(value, allowed):
+    """Field names from a comma-separated ?fields= value, or None for all fields.
+
+    Raises ValueError naming any field the serializer does not know.
+    """
+    if not value:
+        return None
+    fields = list(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields or None
+
+def serialize_value(value):
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+def safe_float(value):
+    """Safely convert value to float, returning None for empty/invalid values"""
+    if value == '' or value is None:
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
 
 class Strain(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -11,11 +38,14 @@ class Strain(db.Model):
     flowering_time = db.Column(db.String(50))
     yield_info = db.Column(db.String(100))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')  # Bumped on every ORM update, see bump_strain_version
+    usage_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Crosses using it; see src.models.counters
     
     # Verification fields
-    is_verified = db.Column(db.Boolean, default=False)  # For community verification
-    is_lab_tested = db.Column(db.Boolean, default=False)  # Lab-tested verification
+    is_verified = db.Column(db.Boolean, default=False, server_default=db.false())  # For community verification
+    is_lab_tested = db.Column(db.Boolean, default=False, server_default=db.false())  # Lab-tested verification
     lab_name = db.Column(db.String(200))  # Name of the testing laboratory
     lab_test_date = db.Column(db.Date)  # Date of lab testing
     lab_report_url = db.Column(db.String(500))  # URL to lab report document
@@ -36,10 +66,43 @@ class Strain(db.Model):
     parent2_crosses = db.relationship('Cross', foreign_keys='Cross.parent2_id', lazy=True)
     offspring_crosses = db.relationship('Cross', foreign_keys='Cross.offspring_id', lazy=True)
 
+    __table_args__ = (
+        # Catalog order: lab tested, then verified, then name
+        db.Index('ix_strain_catalog_order', is_lab_tested.desc(), is_verified.desc(), name),
+        # A user's own strains by name (available strains, batch offspring reuse)
+        db.Index('ix_strain_creator_name', 'created_by', 'name'),
+    )
+
+    # Serialized fields backed by a relationship instead of a column
+    RELATED_FIELDS = {'creator_username': 'creator', 'verifier_username': 'verifier'}
+
     def __repr__(self):
         return f'<Strain {self.name}>'
 
-    def to_dict(self):
+    @classmethod
+    def field_names(cls):
+        return [column.key for column in cls.__table__.columns] + list(cls.RELATED_FIELDS)
+
+    @classmethod
+    def load_options(cls, fields=None, extra_columns=()):
+        """Loader options that fetch exactly what to_dict(fields) will read.
+
+        With fields=None every column loads and both usernames are joined in
+        rather than lazily loaded per strain. `extra_columns` adds columns the
+        caller reads itself, such as cursor keys.
+        """
+        if fields is None:
+            return [joinedload(cls.creator), joinedload(cls.verifier)]
+        columns = [getattr(cls, field) for field in fields if field not in cls.RELATED_FIELDS]
+        options = [load_only(cls.id, *columns, *extra_columns)]
+        for field, relationship in cls.RELATED_FIELDS.items():
+            if field in fields:
+                options.append(joinedload(getattr(cls, relationship)).load_only(User.username))
+        return options
+
+    def to_dict(self, fields=None):
+        if fields is not None:
+            return {field: self.field_value(field) for field in fields}
         return {
             'id': self.id,
             'name': self.name,
@@ -50,6 +113,9 @@ class Strain(db.Model):
             'flowering_time': self.flowering_time,
             'yield_info': self.yield_info,
             'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'version': self.version,
+            'usage_count': self.usage_count,
             'created_by': self.created_by,
             'is_verified': self.is_verified,
             'is_lab_tested': self.is_lab_tested,
@@ -67,3 +133,17 @@ class Strain(db.Model):
             'verifier_username': self.verifier.username if self.verifier else None
         }
 
+    def field_value(self, field):
+        if field in self.RELATED_FIELDS:
+            related = getattr(self, self.RELATED_FIELDS[field])
+            return related.username if related else None
+        return serialize_value(getattr(self, field))
+
+@event.listens_for(Strain, 'before_update')
+def bump_strain_version(mapper, connection, target):
+    """Increment the ETag version in SQL, so concurrent edits each move it.
+
+    Not a version_id_col: that would turn concurrent edits into
+    StaleDataError instead of last-write-wins like the rest of the app.
+    """
+    target.version = Strain.version + 1
@@ -0,0 +1,207 @@
+from flask.cli import with_appcontext
+from src.models.user import db, User
+from src.models.strain import Strain, safe_float
+from src.models.strain_index import strain_name_index
+import click
+import codecs
+import csv
+import json
+
+# Rows inserted per executemany / committed per transaction
+BATCH_SIZE = 2000
+
+# Rows per name IN (...) lookup, below SQLite's default bound-parameter limit
+NAME_CHUNK_SIZE = 500
+
+# Rejections listed in the report; the total is always counted
+MAX_REPORTED_ERRORS = 100
+
+TEXT_FIELDS = ['description', 'strain_type', 'flowering_time', 'yield_info']
+FLOAT_FIELDS = ['thc_content', 'cbd_content']
+
+def detect_format(filename=None, content_type=None):
+    filename = (filename or '').lower()
+    content_type = (content_type or '').lower()
+    if filename.endswith(('.ndjson', '.jsonl')) or 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'ndjson'
+    if filename.endswith('.csv') or 'csv' in content_type:
+        return 'csv'
+    return None
+
+class InvalidEncoding(ValueError):
+    def __init__(self, line_number):
+        super().__init__(f'Line {line_number} is not valid UTF-8')
+        self.line_number = line_number
+
+def iter_text_lines(stream):
+    """Decode a binary stream line by line without reading it all into memory.
+
+    Each line is decoded strictly on its own (a newline byte never occurs
+    inside a UTF-8 sequence), so a bad byte raises InvalidEncoding naming
+    its line instead of failing a whole chunk.
+    """
+    pending = b''
+    line_number = 0
+
+    def decode(raw):
+        try:
+            return raw.decode('utf-8-sig' if line_number == 1 else 'utf-8', errors='strict')
+        except UnicodeDecodeError:
+            raise InvalidEncoding(line_number) from None
+
+    for chunk in iter(lambda: stream.read(64 * 1024), b''):
+        pending += chunk
+        lines = pending.split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            line_number += 1
+            yield decode(line) + '\n'
+    if pending:
+        line_number += 1
+        yield decode(pending)
+
+def iter_records(stream, fmt):
+    """Yield (row_number, record or None, error) from a CSV or NDJSON byte stream"""
+    lines = iter_text_lines(stream)
+    if fmt == 'csv':
+        for row_number, record in enumerate(csv.DictReader(lines), start=1):
+            yield row_number, record, None
+        return
+
+    row_number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield row_number, None, 'Invalid JSON'
+            continue
+        if not isinstance(record, dict):
+            yield row_number, None, 'Record must be a JSON object'
+            continue
+        yield row_number, record, None
+
+def clean_record(record, user_id):
+    name = str(record.get('name') or '').strip()
+    if not name:
+        return None, 'Strain name is required'
+    if len(name) > 100:
+        return None, 'Strain name is longer than 100 characters'
+
+    row = {'name': name, 'created_by': user_id, 'is_verified': False, 'is_lab_tested': False}
+    for field in TEXT_FIELDS:
+        value = record.get(field)
+        row[field] = str(value).strip() if value is not None else ''
+    for field in FLOAT_FIELDS:
+        row[field] = safe_float(record.get(field))
+    return row, None
+
+class ImportReport:
+    def __init__(self):
+        self.accepted = 0
+        self.rejected = 0
+        self.errors = []
+        # Set when the upload stopped early; rows up to that point are kept
+        self.error = None
+
+    def reject(self, row_number, error):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'error': error})
+
+    def to_dict(self):
+        return {
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'errors': self.errors,
+            'errors_truncated': self.rejected > len(self.errors),
+            'error': self.error
+        }
+
+def existing_names(names):
+    found = set()
+    names = list(names)
+    for start in range(0, len(names), NAME_CHUNK_SIZE):
+        chunk = names[start:start + NAME_CHUNK_SIZE]
+        found.update(name for (name,) in db.session.query(Strain.name).filter(Strain.name.in_(chunk)))
+    return found
+
+def flush_batch(batch, report):
+    """Drop rows whose name is already in the catalog, then bulk insert the rest"""
+    taken = existing_names(row['name'] for _, row in batch)
+    rows = []
+    for row_number, row in batch:
+        if row['name'] in taken:
+            report.reject(row_number, 'Strain with this name already exists')
+        else:
+            rows.append(row)
+    if rows:
+        db.session.execute(Strain.__table__.insert(), rows)
+    db.session.commit()
+    report.accepted += len(rows)
+
+def import_strains(stream, fmt, user_id, batch_size=BATCH_SIZE):
+    """Stream-import strains from a CSV or NDJSON byte stream.
+
+    Rows are parsed lazily and written in batches, each batch checking its
+    names against the Strain.name index with IN lookups and inserting with
+    one executemany. Names repeated within the upload are rejected after
+    their first occurrence. Each batch commits on its own, so memory stays
+    bounded by the batch size and the report reflects committed rows.
+    A line that is not valid UTF-8 stops the import: the rows before it
+    are committed and report.error says where it stopped.
+    """
+    report = ImportReport()
+    seen_names = set()
+    batch = []
+    try:
+        try:
+            for row_number, record, error in iter_records(stream, fmt):
+                if error:
+                    report.reject(row_number, error)
+                    continue
+                row, error = clean_record(record, user_id)
+                if error:
+                    report.reject(row_number, error)
+                    continue
+                if row['name'] in seen_names:
+                    report.reject(row_number, 'Duplicate strain name in upload')
+                    continue
+                seen_names.add(row['name'])
+                batch.append((row_number, row))
+                if len(batch) >= batch_size:
+                    flush_batch(batch, report)
+                    batch = []
+        except InvalidEncoding as e:
+            report.error = str(e)
+        if batch:
+            flush_batch(batch, report)
+    finally:
+        if report.accepted:
+            strain_name_index.invalidate()
+    return report
+
+@click.command('import-strains')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--user', 'username', required=True, help='Username recorded as the creator of imported strains.')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='Defaults to the file extension.')
+@with_appcontext
+def import_strains_command(path, username, fmt):
+    """Bulk import strains from a CSV or NDJSON file."""
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        raise click.ClickException(f'User {username} not found')
+    fmt = fmt or detect_format(filename=path)
+    if not fmt:
+        raise click.ClickException('Cannot tell the file format, pass --format')
+
+    with open(path, 'rb') as stream:
+        report = import_strains(stream, fmt, user.id)
+
+    click.echo(f'Accepted {report.accepted} strains, rejected {report.rejected}')
+    for error in report.errors:
+        click.echo(f"  row {error['row']}: {error['error']}")
+    if report.error:
+        raise click.ClickException(f'Import stopped early: {report.error}')
@@ -0,0 +1,179 @@
+from flask import current_app
+from src.models.user import db
+from src.models.strain import Strain
+from bisect import bisect_left, insort
+import re
+import threading
+import time
+
+# Seconds before a worker reloads its index to pick up writes made by
+# other processes; writes in this process are applied immediately.
+# Reloads run in the background while lookups keep using the old index.
+INDEX_TTL = 300
+
+WORD_START = re.compile(r'(?:^|\W)(?=\w)')
+
+def strain_tier(is_lab_tested, is_verified):
+    """Rank bucket matching the catalog order: lab tested, verified, rest"""
+    return (0 if is_lab_tested else 2) + (0 if is_verified else 1)
+
+def name_keys(name):
+    """Lowercased suffixes of a name starting at each word, e.g. 'og kush', 'kush'"""
+    lowered = name.lower()
+    return {lowered[m.end():] for m in WORD_START.finditer(lowered)}
+
+class StrainNameIndex:
+    """Per-process prefix index over strain names for typeahead lookups.
+
+    Keys are kept in one sorted list per ranking tier, so a lookup is a
+    bisect into each tier followed by a short forward scan and never touches
+    the database. Only the first lookup waits for a load; later reloads are
+    built on one background thread and swapped in, with writes applied
+    during the load replayed onto the new index.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+        self.entries = {}
+        self.tiers = [[] for _ in range(4)]
+        self.loaded_at = None
+        self.expired = False
+        self.refreshing = False
+        # Upserts seen while a load runs, replayed onto the new index
+        self.pending = None
+
+    def load(self):
+        with self.lock:
+            self.pending = []
+        try:
+            rows = db.session.query(
+                Strain.id, Strain.name, Strain.strain_type,
+                Strain.is_verified, Strain.is_lab_tested
+            ).all()
+        except Exception:
+            with self.lock:
+                self.pending = None
+            raise
+        entries = {}
+        tiers = [[] for _ in range(4)]
+        for row in rows:
+            entry = self.make_entry(*row)
+            entries[row.id] = entry
+            tiers[entry['tier']].extend((key, row.id) for key in entry['keys'])
+        for tier in tiers:
+            tier.sort()
+        with self.lock:
+            self.entries = entries
+            self.tiers = tiers
+            for entry in self.pending:
+                self._discard(entry['id'])
+                self._insert(entry)
+            self.pending = None
+            self.loaded_at = time.monotonic()
+            self.expired = False
+
+    def ensure_loaded(self):
+        if self.loaded_at is None:
+            with self.load_lock:
+                if self.loaded_at is None:
+                    self.load()
+        elif self.expired or time.monotonic() - self.loaded_at > INDEX_TTL:
+            self.refresh_in_background()
+
+    def refresh_in_background(self):
+        """Start a reload unless one is already running; lookups meanwhile use the current index"""
+        with self.lock:
+            if self.refreshing:
+                return
+            self.refreshing = True
+        app = current_app._get_current_object()
+
+        def run():
+            with app.app_context():
+                try:
+                    with self.load_lock:
+                        self.load()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Strain name index reload failed: {e}")
+                finally:
+                    db.session.remove()
+                    self.refreshing = False
+
+        threading.Thread(target=run, name='strain-index-refresh', daemon=True).start()
+
+    def make_entry(self, strain_id, name, strain_type, is_verified, is_lab_tested):
+        return {
+            'id': strain_id,
+            'name': name,
+            'strain_type': strain_type,
+            'is_verified': bool(is_verified),
+            'is_lab_tested': bool(is_lab_tested),
+            'tier': strain_tier(is_lab_tested, is_verified),
+            'keys': name_keys(name or '')
+        }
+
+    def _discard(self, strain_id):
+        entry = self.entries.pop(strain_id, None)
+        if not entry:
+            return
+        tier = self.tiers[entry['tier']]
+        for key in entry['keys']:
+            position = bisect_left(tier, (key, strain_id))
+            if position < len(tier) and tier[position] == (key, strain_id):
+                del tier[position]
+
+    def upsert(self, strain):
+        """Apply a committed insert or update of a single strain"""
+        entry = self.make_entry(
+            strain.id, strain.name, strain.strain_type,
+            strain.is_verified, strain.is_lab_tested
+        )
+        with self.lock:
+            if self.pending is not None:
+                self.pending.append(entry)
+            elif self.loaded_at is None:
+                return
+            self._discard(strain.id)
+            self._insert(entry)
+
+    def _insert(self, entry):
+        self.entries[entry['id']] = entry
+        for key in entry['keys']:
+            insort(self.tiers[entry['tier']], (key, entry['id']))
+
+    def invalidate(self):
+        """Reload on next lookup, e.g. after bulk writes"""
+        self.expired = True
+
+    def lookup(self, prefix, limit=10):
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        self.ensure_loaded()
+        results = []
+        seen = set()
+        with self.lock:
+            for tier in self.tiers:
+                position = bisect_left(tier, (prefix,))
+                while position < len(tier) and len(results) < limit:
+                    key, strain_id = tier[position]
+                    if not key.startswith(prefix):
+                        break
+                    if strain_id not in seen:
+                        seen.add(strain_id)
+                        entry = self.entries[strain_id]
+                        results.append({
+                            'id': entry['id'],
+                            'name': entry['name'],
+                            'strain_type': entry['strain_type'],
+                            'is_verified': entry['is_verified'],
+                            'is_lab_tested': entry['is_lab_tested']
+                        })
+                    position += 1
+                if len(results) >= limit:
+                    break
+        return results
+
+strain_name_index = StrainNameIndex()
@@ -0,0 +1,196 @@
+from flask import current_app
+from sqlalchemy import text, func, inspect, literal_column, Integer, Float
+from src.models.user import db
+from src.models.strain import Strain
+import re
+
+# Columns indexed by the full-text table, in FTS column order
+FTS_COLUMNS = ['name', 'description', 'lab_name', 'verified_terpenes']
+
+# bm25() weights per column: a hit in the name outranks one in the notes
+FTS_WEIGHTS = '10.0, 1.0, 2.0, 2.0'
+
+FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS strain_fts USING fts5(
+        name, description, lab_name, verified_terpenes,
+        content='strain', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS strain_fts_ai AFTER INSERT ON strain BEGIN
+        INSERT INTO strain_fts(rowid, name, description, lab_name, verified_terpenes)
+        VALUES (new.id, new.name, new.description, new.lab_name, new.verified_terpenes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS strain_fts_ad AFTER DELETE ON strain BEGIN
+        INSERT INTO strain_fts(strain_fts, rowid, name, description, lab_name, verified_terpenes)
+        VALUES ('delete', old.id, old.name, old.description, old.lab_name, old.verified_terpenes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS strain_fts_au
+    AFTER UPDATE OF name, description, lab_name, verified_terpenes ON strain BEGIN
+        INSERT INTO strain_fts(strain_fts, rowid, name, description, lab_name, verified_terpenes)
+        VALUES ('delete', old.id, old.name, old.description, old.lab_name, old.verified_terpenes);
+        INSERT INTO strain_fts(rowid, name, description, lab_name, verified_terpenes)
+        VALUES (new.id, new.name, new.description, new.lab_name, new.verified_terpenes);
+    END
+    """
+]
+
+# PostgreSQL tsvector weight per column, ranked like FTS_WEIGHTS
+TSVECTOR_WEIGHTS = {'name': 'A', 'description': 'D', 'lab_name': 'C', 'verified_terpenes': 'C'}
+
+# PostgreSQL GIN indexes by the columns they cover. A search only uses an
+# index built over exactly its columns, so each `columns` argument passed to
+# apply_strain_search needs an entry here.
+SEARCH_INDEXES = {
+    'ix_strain_search': FTS_COLUMNS,
+    'ix_strain_name_search': ['name']
+}
+
+def tsvector_sql(columns, table=None):
+    """Weighted tsvector over the given columns, as SQL text.
+
+    Rendered inline rather than with bound parameters so the query
+    expression matches the GIN index expression.
+    """
+    prefix = f'{table}.' if table else ''
+    return ' || '.join(
+        f"setweight(to_tsvector('simple', coalesce({prefix}{column}, '')), '{TSVECTOR_WEIGHTS[column]}')"
+        for column in columns
+    )
+
+def search_index_ddl():
+    """CREATE INDEX statements for SEARCH_INDEXES"""
+    return [
+        f"CREATE INDEX IF NOT EXISTS {name} ON strain USING gin (({tsvector_sql(columns)}))"
+        for name, columns in SEARCH_INDEXES.items()
+    ]
+
+def init_strain_search():
+    """Create the full-text index if the database supports one.
+
+    SQLite gets an FTS5 table kept in sync by triggers; PostgreSQL gets
+    GIN indexes over weighted tsvector expressions (SEARCH_INDEXES). Must run inside an app
+    context after db.create_all(). Sets STRAIN_SEARCH_FTS so the routes
+    know whether to use full-text matching or fall back to ILIKE scans.
+    """
+    enabled = False
+    if db.engine.dialect.name == 'postgresql':
+        try:
+            with db.engine.begin() as conn:
+                for statement in search_index_ddl():
+                    conn.execute(text(statement))
+            enabled = True
+        except Exception as e:
+            print(f"Full-text strain search unavailable, using LIKE search: {e}")
+    elif db.engine.dialect.name == 'sqlite':
+        try:
+            with db.engine.begin() as conn:
+                existed = conn.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'strain_fts'"
+                )).first() is not None
+                for statement in FTS_DDL:
+                    conn.execute(text(statement))
+                if not existed:
+                    conn.execute(text("INSERT INTO strain_fts(strain_fts) VALUES ('rebuild')"))
+            enabled = True
+        except Exception as e:
+            print(f"Full-text strain search unavailable, using LIKE search: {e}")
+    current_app.config['STRAIN_SEARCH_FTS'] = enabled
+    return enabled
+
+def strain_search_enabled():
+    """Whether a full-text index is available, checked once per app.
+
+    init_strain_search() sets the flag when it runs at startup; app
+    instances that skip schema setup look the index up on first search.
+    """
+    enabled = current_app.config.get('STRAIN_SEARCH_FTS')
+    if enabled is None:
+        inspector = inspect(db.engine)
+        if db.engine.dialect.name == 'postgresql':
+            enabled = any(index['name'] == 'ix_strain_search' for index in inspector.get_indexes('strain'))
+        else:
+            enabled = db.engine.dialect.name == 'sqlite' and inspector.has_table('strain_fts')
+        current_app.config['STRAIN_SEARCH_FTS'] = enabled
+    return enabled
+
+def build_match_expression(search, columns=None):
+    """Turn free text into an FTS5 prefix query, e.g. 'og ku' -> '"og"* "ku"*'"""
+    tokens = [t for t in re.split(r'\W+', search) if t]
+    if not tokens:
+        return None
+    expression = ' '.join('"{}"*'.format(t.replace('"', '""')) for t in tokens)
+    if columns:
+        expression = '{%s} : (%s)' % (' '.join(columns), expression)
+    return expression
+
+def build_tsquery(search):
+    """Turn free text into a PostgreSQL prefix tsquery, e.g. 'og ku' -> 'og:* & ku:*'"""
+    tokens = [t for t in re.split(r'\W+', search) if t]
+    if not tokens:
+        return None
+    return ' & '.join(f'{t}:*' for t in tokens)
+
+def apply_strain_search(query, search, columns=None, ranked=True):
+    """Filter and rank a Strain query by a free-text search.
+
+    Lab-tested and verified strains stay first; within those groups results
+    are ordered by bm25 relevance, then name. The caller must not add its own
+    ORDER BY afterwards. With ranked=False only the filter is applied, for
+    callers such as keyset pagination that impose their own order.
+    On PostgreSQL `columns` must match a SEARCH_INDEXES entry to use an index.
+    """
+    columns = columns or FTS_COLUMNS
+    fts = strain_search_enabled()
+    if fts and db.engine.dialect.name == 'postgresql':
+        expression = build_tsquery(search)
+        if expression is None:
+            return query.filter(db.false())
+        vector = literal_column(tsvector_sql(columns, Strain.__tablename__))
+        tsquery = func.to_tsquery(literal_column("'simple'"), expression)
+        query = query.filter(vector.op('@@')(tsquery))
+        if not ranked:
+            return query
+        return query.order_by(
+            Strain.is_lab_tested.desc(),
+            Strain.is_verified.desc(),
+            func.ts_rank(vector, tsquery).desc(),
+            Strain.name
+        )
+
+    if fts:
+        expression = build_match_expression(search, columns)
+        if expression is None:
+            return query.filter(db.false())
+        matches = text(
+            f"SELECT rowid AS strain_id, bm25(strain_fts, {FTS_WEIGHTS}) AS rank "
+            "FROM strain_fts WHERE strain_fts MATCH :match"
+        ).bindparams(match=expression).columns(strain_id=Integer, rank=Float).subquery()
+        query = query.join(matches, Strain.id == matches.c.strain_id)
+        if not ranked:
+            return query
+        return query.order_by(
+            Strain.is_lab_tested.desc(),
+            Strain.is_verified.desc(),
+            matches.c.rank,
+            Strain.name
+        )
+
+    pattern = f'%{search}%'
+    query = query.filter(
+        db.or_(*[getattr(Strain, column).ilike(pattern) for column in columns])
+    )
+    if not ranked:
+        return query
+    return query.order_by(
+        Strain.is_lab_tested.desc(),
+        Strain.is_verified.desc(),
+        Strain.name
+    )
@@ -1,8 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
+from src.models.storage import ReadRoutingSession
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': ReadRoutingSession})
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -1,10 +1,60 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, g, current_app
+from sqlalchemy.orm import make_transient_to_detached
 from src.models.user import db, User
+from functools import wraps
 import re
+import threading
+import time
 import traceback
 
 auth_bp = Blueprint('auth', __name__)
 
+# Detached User snapshots by id with their expiry, when USER_CACHE_TTL is set
+_user_cache = {}
+_user_cache_lock = threading.Lock()
+
+def load_user(user_id):
+    """User by id, served from the short-lived identity cache when enabled.
+
+    Cached users are column snapshots merged into the request's session
+    without a query, so relationships still lazy-load normally.
+    """
+    ttl = current_app.config.get('USER_CACHE_TTL', 0)
+    if ttl:
+        with _user_cache_lock:
+            entry = _user_cache.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            return db.session.merge(entry[1], load=False)
+
+    user = db.session.get(User, user_id)
+    if user and ttl:
+        snapshot = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+        make_transient_to_detached(snapshot)
+        with _user_cache_lock:
+            _user_cache[user_id] = (time.monotonic() + ttl, snapshot)
+    return user
+
+def forget_user(user_id):
+    """Drop a user from the identity cache after it changes"""
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
+
+def current_user():
+    """The logged-in user for this request, or None; resolved at most once"""
+    if 'current_user' not in g:
+        user_id = session.get('user_id')
+        g.current_user = load_user(user_id) if user_id else None
+    return g.current_user
+
+def login_required(view):
+    """Answer 401 before the view runs when nobody is logged in"""
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        if not current_user():
+            return jsonify({'error': 'Authentication required'}), 401
+        return view(*args, **kwargs)
+    return wrapped
+
 def validate_email(email):
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     return re.match(pattern, email) is not None
@@ -159,7 +209,7 @@ def get_current_user():
     if not user_id:
         return jsonify({'error': 'Not authenticated'}), 401
     
-    user = User.query.get(user_id)
+    user = current_user()
     if not user:
         session.clear()
         return jsonify({'error': 'User not found'}), 401
@@ -172,7 +222,7 @@ def check_auth():
     user_id = session.get('user_id')
     print(f"Auth check - User ID from session: {user_id}")
     if user_id:
-        user = User.query.get(user_id)
+        user = current_user()
         if user:
             print(f"Auth check - User found: {user.username}")
             return jsonify({'authenticated': True, 'user': user.to_dict()}), 200
@@ -0,0 +1,37 @@
+from flask import Response, request
+from datetime import timezone
+import hashlib
+
+def weak_etag(*parts):
+    """Opaque validator for a response built from the given version parts"""
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()[:24]
+
+def http_datetime(value):
+    """Naive UTC datetime as an aware, second-resolution HTTP date"""
+    return value.replace(tzinfo=timezone.utc, microsecond=0) if value else None
+
+def add_validators(response, etag, last_modified=None, private=False):
+    """Attach ETag/Last-Modified and ask clients to revalidate before reuse"""
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = http_datetime(last_modified)
+    response.cache_control.no_cache = True
+    if private:
+        response.cache_control.private = True
+    return response
+
+def not_modified(etag, last_modified=None, private=False):
+    """Return a 304 response if the client's copy is current, else None.
+
+    If-None-Match wins when present; If-Modified-Since is only consulted
+    without it, as RFC 9110 requires.
+    """
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified:
+        fresh = http_datetime(last_modified) <= request.if_modified_since
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    return add_validators(Response(status=304), etag, last_modified, private)
@@ -0,0 +1,67 @@
+from flask import Response, request, stream_with_context
+from src.models.user import db
+from datetime import date, datetime
+import json
+import zlib
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_YIELD_PER = 1000
+
+# Bytes buffered before a chunk is written to the client
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+def json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def stream_rows(statement):
+    """Execute a Core/ORM select and stream its rows as dicts, yield_per rows at a time"""
+    result = db.session.execute(statement.execution_options(yield_per=EXPORT_YIELD_PER))
+    for row in result.mappings():
+        yield {key: json_value(value) for key, value in row.items()}
+
+def ndjson_chunks(records):
+    """Encode records as NDJSON, sending the first line at once and then 64KB chunks"""
+    buffer = []
+    size = 0
+    first = True
+    for record in records:
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        if first:
+            yield line.encode()
+            first = False
+            continue
+        buffer.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield ''.join(buffer).encode()
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def ndjson_response(records, filename):
+    """Stream records to the client as an NDJSON attachment.
+
+    Nothing is materialized: rows flow from the database cursor through the
+    encoder to the socket. Pass ?gzip=true to compress the stream.
+    """
+    chunks = ndjson_chunks(records)
+    headers = {'Content-Disposition': f'attachment; filename={filename}'}
+    if request.args.get('gzip', '').lower() == 'true':
+        chunks = gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(
+        stream_with_context(chunks),
+        mimetype='application/x-ndjson',
+        headers=headers
+    )
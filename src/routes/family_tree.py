@@ -1,32 +1,213 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify
 from src.models.user import db, User
-from src.models.strain import Strain
-from src.models.family_tree import FamilyTree, Cross
+from src.models.strain import Strain, parse_fields
+from src.models.family_tree import FamilyTree, Cross, tree_strain_versions
+from src.models.strain_index import strain_name_index
+from src.models.lineage import add_cross_to_lineage, refresh_lineage
+from src.models.kinship import get_tree_kinship
+from src.models.pedigree_layout import get_tree_layout
+from src.models.counters import apply_cross_counters
+from src.routes.auth import current_user, login_required
+from src.routes.pagination import wants_cursor, cursor_paginate
+from src.routes.export import stream_rows, ndjson_response
+from src.routes.conditional import weak_etag, add_validators, not_modified
+from src.routes.response_cache import cached_json
+from sqlalchemy import select, func
+from sqlalchemy.orm import joinedload, aliased
 from datetime import datetime
 
 family_tree_bp = Blueprint('family_tree', __name__)
 
-def require_auth():
-    user_id = session.get('user_id')
-    if not user_id:
+# Upper bound on items accepted by the batch cross endpoint
+MAX_BATCH_CROSSES = 2000
+
+# Keyset order for cursor pagination of tree listings
+TREE_CURSOR_KEYS = [
+    (FamilyTree.updated_at, True, lambda ft: ft.updated_at, datetime),
+    (FamilyTree.id, True, lambda ft: ft.id, int)
+]
+
+def tree_fields():
+    """Fields requested with ?fields=a,b,c; None when the full record is wanted"""
+    return parse_fields(request.args.get('fields'), FamilyTree.field_names())
+
+def load_family_tree(tree_id):
+    """Load a family tree together with its owner in one query"""
+    return FamilyTree.query.options(joinedload(FamilyTree.owner)).get_or_404(tree_id)
+
+def load_tree_crosses(tree_id):
+    """Load all crosses of a tree with their parent and offspring strains.
+
+    The three strain relationships are joined into the cross query, so the
+    number of SELECTs stays constant however large the tree grows.
+    """
+    return Cross.query.filter_by(family_tree_id=tree_id).options(
+        joinedload(Cross.parent1_strain),
+        joinedload(Cross.parent2_strain),
+        joinedload(Cross.offspring_strain)
+    ).order_by(Cross.id).all()
+
+def tree_validators(family_tree, *variant):
+    """ETag and Last-Modified for a tree payload without loading its crosses.
+
+    Cross writes bump the tree's updated_at; strain edits bump the strain's
+    version, which tree_strain_versions sums over the tree's cross edges.
+    """
+    versions, strains_modified = tree_strain_versions(family_tree.id)
+    last_modified = max((value for value in (family_tree.updated_at, strains_modified) if value), default=None)
+    etag = weak_etag('tree', family_tree.id, family_tree.updated_at, family_tree.is_public, versions, *variant)
+    return etag, last_modified
+
+def strain_node(strain, node_type):
+    return {
+        'id': strain.id,
+        'name': strain.name,
+        'type': node_type,
+        'strain_type': strain.strain_type,
+        'thc_content': strain.thc_content,
+        'cbd_content': strain.cbd_content,
+        'description': strain.description,
+        'flowering_time': strain.flowering_time,
+        'yield_info': strain.yield_info
+    }
+
+def build_visualization_data(family_tree, crosses):
+    """Build the node/edge payload for a tree from preloaded crosses"""
+    nodes = {}
+    edges = []
+    
+    for cross in crosses:
+        if cross.parent1_id not in nodes:
+            nodes[cross.parent1_id] = strain_node(cross.parent1_strain, 'parent')
+        
+        if cross.parent2_id not in nodes:
+            nodes[cross.parent2_id] = strain_node(cross.parent2_strain, 'parent')
+        
+        if cross.offspring_id not in nodes:
+            nodes[cross.offspring_id] = strain_node(cross.offspring_strain, 'offspring')
+            nodes[cross.offspring_id]['generation'] = cross.generation
+        
+        edges.append({
+            'id': cross.id,
+            'parent1_id': cross.parent1_id,
+            'parent2_id': cross.parent2_id,
+            'offspring_id': cross.offspring_id,
+            'generation': cross.generation,
+            'cross_date': cross.cross_date.isoformat() if cross.cross_date else None,
+            'notes': cross.notes,
+            'position_x': cross.position_x,
+            'position_y': cross.position_y
+        })
+    
+    return {
+        'family_tree': family_tree.to_dict(),
+        'nodes': list(nodes.values()),
+        'edges': edges
+    }
+
+def parse_strain_id(value):
+    """Strain id from request data, accepting digit strings as create_cross does"""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError('Parent strain ids must be integers')
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError('Parent strain ids must be integers')
+
+def parse_generation(value):
+    """Generation from request data as an int (None stays None).
+
+    Clients may send numbers as strings; anything that is not a whole
+    number raises ValueError before it reaches the counters.
+    """
+    if value is None:
         return None
-    return User.query.get(user_id)
+    try:
+        generation = int(value)
+    except (ValueError, TypeError):
+        raise ValueError('Generation must be a whole number')
+    if isinstance(value, float) and value != generation:
+        raise ValueError('Generation must be a whole number')
+    return generation
+
+def default_offspring_name(parent1, parent2, generation):
+    generation_suffix = f"F{generation}" if generation and generation > 0 else "F1"
+    return f"{parent1.name} x {parent2.name} ({generation_suffix})"
+
+def estimate_offspring_strain(parent1, parent2, offspring_name, user_id):
+    """Build an unsaved offspring strain with traits estimated from its parents"""
+    estimated_thc = None
+    estimated_cbd = None
+    estimated_type = "Hybrid"
+    
+    if parent1.thc_content and parent2.thc_content:
+        estimated_thc = round((parent1.thc_content + parent2.thc_content) / 2, 1)
+    elif parent1.thc_content:
+        estimated_thc = parent1.thc_content
+    elif parent2.thc_content:
+        estimated_thc = parent2.thc_content
+        
+    if parent1.cbd_content and parent2.cbd_content:
+        estimated_cbd = round((parent1.cbd_content + parent2.cbd_content) / 2, 1)
+    elif parent1.cbd_content:
+        estimated_cbd = parent1.cbd_content
+    elif parent2.cbd_content:
+        estimated_cbd = parent2.cbd_content
+    
+    if parent1.strain_type and parent2.strain_type:
+        if parent1.strain_type == parent2.strain_type:
+            estimated_type = parent1.strain_type
+        else:
+            estimated_type = "Hybrid"
+    elif parent1.strain_type:
+        estimated_type = parent1.strain_type
+    elif parent2.strain_type:
+        estimated_type = parent2.strain_type
+    
+    return Strain(
+        name=offspring_name,
+        description=f"Cross between {parent1.name} and {parent2.name}. Automatically generated offspring strain.",
+        strain_type=estimated_type,
+        thc_content=estimated_thc,
+        cbd_content=estimated_cbd,
+        flowering_time=None,
+        yield_info=None,
+        created_by=user_id,
+        is_verified=False
+    )
 
 @family_tree_bp.route('/', methods=['GET'])
+@login_required
 def get_family_trees():
     try:
-        user = require_auth()
-        if not user:
-            return jsonify({'error': 'Authentication required'}), 401
+        user = current_user()
         
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         
-        pagination = FamilyTree.query.filter_by(owner_id=user.id).order_by(
+        try:
+            fields = tree_fields()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = FamilyTree.query.filter_by(owner_id=user.id)
+        
+        if wants_cursor():
+            query = query.options(*FamilyTree.load_options(fields, [FamilyTree.updated_at]))
+            try:
+                items, pagination_data = cursor_paginate(query, TREE_CURSOR_KEYS, per_page)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return jsonify({
+                'family_trees': [ft.to_dict(fields) for ft in items],
+                **pagination_data
+            }), 200
+        
+        pagination = query.options(*FamilyTree.load_options(fields)).order_by(
             FamilyTree.updated_at.desc()
         ).paginate(page=page, per_page=per_page, error_out=False)
         
-        family_trees = [ft.to_dict() for ft in pagination.items]
+        family_trees = [ft.to_dict(fields) for ft in pagination.items]
         
         return jsonify({
             'family_trees': family_trees,
@@ -40,11 +221,10 @@ def get_family_trees():
         return jsonify({'error': 'Failed to fetch family trees'}), 500
 
 @family_tree_bp.route('/', methods=['POST'])
+@login_required
 def create_family_tree():
     try:
-        user = require_auth()
-        if not user:
-            return jsonify({'error': 'Authentication required'}), 401
+        user = current_user()
         
         data = request.get_json()
         if not data:
@@ -72,31 +252,88 @@ def create_family_tree():
         db.session.rollback()
         return jsonify({'error': 'Failed to create family tree'}), 500
 
+def export_tree_filter():
+    """Tree filter for exports: the caller's own trees, or public ones with ?scope=public"""
+    if request.args.get('scope') == 'public':
+        return FamilyTree.is_public == True
+    user = current_user()
+    if not user:
+        return None
+    return FamilyTree.owner_id == user.id
+
+@family_tree_bp.route('/export', methods=['GET'])
+def export_family_trees():
+    """Stream family trees as NDJSON (?gzip=true to compress)"""
+    tree_filter = export_tree_filter()
+    if tree_filter is None:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    statement = select(
+        *FamilyTree.__table__.columns,
+        User.username.label('owner_username')
+    ).join(User, User.id == FamilyTree.owner_id).where(tree_filter).order_by(FamilyTree.id)
+    
+    return ndjson_response(stream_rows(statement), 'family_trees.ndjson')
+
+@family_tree_bp.route('/export/crosses', methods=['GET'])
+def export_crosses():
+    """Stream crosses of the exported trees as NDJSON, optionally for one ?tree_id="""
+    tree_filter = export_tree_filter()
+    if tree_filter is None:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    parent1 = aliased(Strain)
+    parent2 = aliased(Strain)
+    offspring = aliased(Strain)
+    statement = select(
+        *Cross.__table__.columns,
+        parent1.name.label('parent1_name'),
+        parent2.name.label('parent2_name'),
+        offspring.name.label('offspring_name')
+    ).join(FamilyTree, FamilyTree.id == Cross.family_tree_id).outerjoin(
+        parent1, parent1.id == Cross.parent1_id
+    ).outerjoin(
+        parent2, parent2.id == Cross.parent2_id
+    ).outerjoin(
+        offspring, offspring.id == Cross.offspring_id
+    ).where(tree_filter)
+    
+    tree_id = request.args.get('tree_id', type=int)
+    if tree_id:
+        statement = statement.where(Cross.family_tree_id == tree_id)
+    
+    return ndjson_response(stream_rows(statement.order_by(Cross.id)), 'crosses.ndjson')
+
 @family_tree_bp.route('/<int:tree_id>', methods=['GET'])
 def get_family_tree(tree_id):
     try:
-        family_tree = FamilyTree.query.get_or_404(tree_id)
+        family_tree = load_family_tree(tree_id)
         
-        user = require_auth()
+        user = current_user()
         if not family_tree.is_public and (not user or family_tree.owner_id != user.id):
             return jsonify({'error': 'Access denied'}), 403
         
-        crosses = Cross.query.filter_by(family_tree_id=tree_id).all()
+        etag, last_modified = tree_validators(family_tree, 'detail')
+        private = not family_tree.is_public
+        cached = not_modified(etag, last_modified, private)
+        if cached:
+            return cached
+        
+        crosses = load_tree_crosses(tree_id)
         
         tree_data = family_tree.to_dict()
         tree_data['crosses'] = [cross.to_dict() for cross in crosses]
         
-        return jsonify({'family_tree': tree_data}), 200
+        return add_validators(jsonify({'family_tree': tree_data}), etag, last_modified, private), 200
         
     except Exception as e:
         return jsonify({'error': 'Family tree not found'}), 404
 
 @family_tree_bp.route('/<int:tree_id>', methods=['PUT'])
+@login_required
 def update_family_tree(tree_id):
     try:
-        user = require_auth()
-        if not user:
-            return jsonify({'error': 'Authentication required'}), 401
+        user = current_user()
         
         family_tree = FamilyTree.query.get_or_404(tree_id)
         
@@ -132,11 +369,10 @@ def update_family_tree(tree_id):
         return jsonify({'error': 'Failed to update family tree'}), 500
 
 @family_tree_bp.route('/<int:tree_id>', methods=['DELETE'])
+@login_required
 def delete_family_tree(tree_id):
     try:
-        user = require_auth()
-        if not user:
-            return jsonify({'error': 'Authentication required'}), 401
+        user = current_user()
         
         family_tree = FamilyTree.query.get_or_404(tree_id)
         
@@ -153,11 +389,10 @@ def delete_family_tree(tree_id):
         return jsonify({'error': 'Failed to delete family tree'}), 500
 
 @family_tree_bp.route('/<int:tree_id>/crosses', methods=['POST'])
+@login_required
 def create_cross(tree_id):
     try:
-        user = require_auth()
-        if not user:
-            return jsonify({'error': 'Authentication required'}), 401
+        user = current_user()
         
         family_tree = FamilyTree.query.get_or_404(tree_id)
         
@@ -181,10 +416,13 @@ def create_cross(tree_id):
         if not all([parent1, parent2]):
             return jsonify({'error': 'One or more parent strains not found'}), 404
         
+        try:
+            generation = parse_generation(data.get('generation', 1))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         if not offspring_name:
-            generation = data.get('generation', 1)
-            generation_suffix = f"F{generation}" if generation > 0 else "F1"
-            offspring_name = f"{parent1.name} x {parent2.name} ({generation_suffix})"
+            offspring_name = default_offspring_name(parent1, parent2, generation)
         
         existing_offspring = Strain.query.filter_by(
             name=offspring_name, 
@@ -194,45 +432,7 @@ def create_cross(tree_id):
         if existing_offspring:
             offspring_id = existing_offspring.id
         else:
-            estimated_thc = None
-            estimated_cbd = None
-            estimated_type = "Hybrid"
-            
-            if parent1.thc_content and parent2.thc_content:
-                estimated_thc = round((parent1.thc_content + parent2.thc_content) / 2, 1)
-            elif parent1.thc_content:
-                estimated_thc = parent1.thc_content
-            elif parent2.thc_content:
-                estimated_thc = parent2.thc_content
-                
-            if parent1.cbd_content and parent2.cbd_content:
-                estimated_cbd = round((parent1.cbd_content + parent2.cbd_content) / 2, 1)
-            elif parent1.cbd_content:
-                estimated_cbd = parent1.cbd_content
-            elif parent2.cbd_content:
-                estimated_cbd = parent2.cbd_content
-            
-            if parent1.strain_type and parent2.strain_type:
-                if parent1.strain_type == parent2.strain_type:
-                    estimated_type = parent1.strain_type
-                else:
-                    estimated_type = "Hybrid"
-            elif parent1.strain_type:
-                estimated_type = parent1.strain_type
-            elif parent2.strain_type:
-                estimated_type = parent2.strain_type
-            
-            offspring_strain = Strain(
-                name=offspring_name,
-                description=f"Cross between {parent1.name} and {parent2.name}. Automatically generated offspring strain.",
-                strain_type=estimated_type,
-                thc_content=estimated_thc,
-                cbd_content=estimated_cbd,
-                flowering_time=None,
-                yield_info=None,
-                created_by=user.id,
-                is_verified=False
-            )
+            offspring_strain = estimate_offspring_strain(parent1, parent2, offspring_name, user.id)
             
             db.session.add(offspring_strain)
             db.session.flush()
@@ -242,7 +442,7 @@ def create_cross(tree_id):
             parent1_id=parent1_id,
             parent2_id=parent2_id,
             offspring_id=offspring_id,
-            generation=data.get('generation', 1),
+            generation=generation,
             cross_date=datetime.strptime(data['cross_date'], '%Y-%m-%d').date() if data.get('cross_date') else None,
             notes=data.get('notes', '').strip(),
             family_tree_id=tree_id,
@@ -251,8 +451,11 @@ def create_cross(tree_id):
         )
         
         db.session.add(cross)
+        add_cross_to_lineage(cross)
         family_tree.updated_at = datetime.utcnow()
         db.session.commit()
+        if not existing_offspring:
+            strain_name_index.upsert(offspring_strain)
         
         return jsonify({
             'message': 'Cross created successfully and offspring added to strain catalog',
@@ -265,36 +468,180 @@ def create_cross(tree_id):
         db.session.rollback()
         return jsonify({'error': f'Failed to create cross: {str(e)}'}), 500
 
+@family_tree_bp.route('/<int:tree_id>/crosses/batch', methods=['POST'])
+@login_required
+def create_crosses_batch(tree_id):
+    """Create many crosses in one transaction, e.g. a season's crossing plan.
+
+    Expects {"crosses": [...]} where each item takes the same fields as a
+    single cross POST. Invalid items are skipped and reported by index;
+    everything valid is committed together.
+    """
+    try:
+        user = current_user()
+        
+        family_tree = FamilyTree.query.get_or_404(tree_id)
+        
+        if family_tree.owner_id != user.id:
+            return jsonify({'error': 'Permission denied'}), 403
+        
+        data = request.get_json()
+        items = data.get('crosses') if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'A non-empty crosses list is required'}), 400
+        
+        if len(items) > MAX_BATCH_CROSSES:
+            return jsonify({'error': f'At most {MAX_BATCH_CROSSES} crosses per batch'}), 400
+        
+        errors = []
+        checked = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors.append({'index': index, 'error': 'Cross must be an object'})
+                continue
+            
+            if not item.get('parent1_id') or not item.get('parent2_id'):
+                errors.append({'index': index, 'error': 'Both parent strains are required'})
+                continue
+            
+            try:
+                parent_ids = (parse_strain_id(item['parent1_id']), parse_strain_id(item['parent2_id']))
+            except ValueError as e:
+                errors.append({'index': index, 'error': str(e)})
+                continue
+            
+            if not all(isinstance(item.get(field) or '', str) for field in ('notes', 'offspring_name')):
+                errors.append({'index': index, 'error': 'notes and offspring_name must be strings'})
+                continue
+            
+            checked.append((index, item, parent_ids))
+        
+        # Validate every referenced parent with a single IN query
+        parent_ids = {strain_id for _, _, ids in checked for strain_id in ids}
+        parents = {strain.id: strain for strain in Strain.query.filter(Strain.id.in_(parent_ids)).all()} if parent_ids else {}
+        
+        planned = []
+        for index, item, (parent1_id, parent2_id) in checked:
+            parent1 = parents.get(parent1_id)
+            parent2 = parents.get(parent2_id)
+            if not all([parent1, parent2]):
+                errors.append({'index': index, 'error': 'One or more parent strains not found'})
+                continue
+            
+            try:
+                generation = parse_generation(item.get('generation', 1))
+                cross_date = datetime.strptime(item['cross_date'], '%Y-%m-%d').date() if item.get('cross_date') else None
+            except (ValueError, TypeError):
+                errors.append({'index': index, 'error': 'Invalid generation or cross_date'})
+                continue
+            
+            offspring_name = (item.get('offspring_name') or '').strip()
+            if not offspring_name:
+                offspring_name = default_offspring_name(parent1, parent2, generation)
+            
+            planned.append((index, item, parent1, parent2, generation, cross_date, offspring_name))
+        
+        # Reuse the user's existing offspring strains, looked up by name in one query
+        names = {plan[6] for plan in planned}
+        offspring = {}
+        if names:
+            for strain in Strain.query.filter(Strain.created_by == user.id, Strain.name.in_(names)).all():
+                offspring.setdefault(strain.name, strain)
+        
+        created_strains = []
+        for index, item, parent1, parent2, generation, cross_date, offspring_name in planned:
+            if offspring_name not in offspring:
+                strain = estimate_offspring_strain(parent1, parent2, offspring_name, user.id)
+                offspring[offspring_name] = strain
+                created_strains.append(strain)
+        
+        # Core executemany inserts: the ORM would flush one INSERT per row on SQLite
+        if created_strains:
+            columns = ['name', 'description', 'strain_type', 'thc_content', 'cbd_content',
+                       'flowering_time', 'yield_info', 'created_by', 'is_verified']
+            db.session.execute(
+                Strain.__table__.insert(),
+                [{column: getattr(strain, column) for column in columns} for strain in created_strains]
+            )
+            created_names = [strain.name for strain in created_strains]
+            created_ids = dict(db.session.query(Strain.name, Strain.id).filter(
+                Strain.created_by == user.id, Strain.name.in_(created_names)
+            ).all())
+            for strain in created_strains:
+                strain.id = created_ids[strain.name]
+        
+        created = []
+        cross_rows = []
+        for index, item, parent1, parent2, generation, cross_date, offspring_name in planned:
+            offspring_id = offspring[offspring_name].id
+            cross_rows.append({
+                'parent1_id': parent1.id,
+                'parent2_id': parent2.id,
+                'offspring_id': offspring_id,
+                'generation': generation,
+                'cross_date': cross_date,
+                'notes': (item.get('notes') or '').strip(),
+                'family_tree_id': tree_id,
+                'position_x': item.get('position_x', 0),
+                'position_y': item.get('position_y', 0)
+            })
+            created.append({'index': index, 'offspring_id': offspring_id, 'offspring_name': offspring_name})
+        
+        if cross_rows:
+            db.session.execute(Cross.__table__.insert(), cross_rows)
+            apply_cross_counters(db.session.connection(), cross_rows)
+            refresh_lineage({row['offspring_id'] for row in cross_rows})
+            family_tree.updated_at = datetime.utcnow()
+        db.session.commit()
+        for strain in created_strains:
+            strain_name_index.upsert(strain)
+        
+        errors.sort(key=lambda error: error['index'])
+        return jsonify({
+            'message': f'{len(created)} crosses created, {len(errors)} rejected',
+            'created': created,
+            'created_offspring_count': len(created_strains),
+            'errors': errors
+        }), 201 if created else 400
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Failed to create crosses: {str(e)}'}), 500
+
 @family_tree_bp.route('/<int:tree_id>/crosses', methods=['GET'])
+@login_required
 def get_crosses(tree_id):
     try:
-        user = require_auth()
-        if not user:
-            return jsonify({'error': 'Authentication required'}), 401
+        user = current_user()
         
         family_tree = FamilyTree.query.get_or_404(tree_id)
         
         if not family_tree.is_public and family_tree.owner_id != user.id:
             return jsonify({'error': 'Access denied'}), 403
         
-        crosses = Cross.query.filter_by(family_tree_id=tree_id).all()
+        etag, last_modified = tree_validators(family_tree, 'crosses')
+        private = not family_tree.is_public
+        cached = not_modified(etag, last_modified, private)
+        if cached:
+            return cached
+        
+        crosses = load_tree_crosses(tree_id)
         
         crosses_data = [cross.to_dict() for cross in crosses]
         
-        return jsonify({
+        return add_validators(jsonify({
             'crosses': crosses_data,
             'total': len(crosses_data)
-        }), 200
+        }), etag, last_modified, private), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to fetch crosses'}), 500
 
 @family_tree_bp.route('/<int:tree_id>/crosses/<int:cross_id>', methods=['PUT'])
+@login_required
 def update_cross(tree_id, cross_id):
     try:
-        user = require_auth()
-        if not user:
-            return jsonify({'error': 'Authentication required'}), 401
+        user = current_user()
         
         family_tree = FamilyTree.query.get_or_404(tree_id)
         cross = Cross.query.get_or_404(cross_id)
@@ -307,7 +654,10 @@ def update_cross(tree_id, cross_id):
             return jsonify({'error': 'No data provided'}), 400
         
         if 'generation' in data:
-            cross.generation = data['generation']
+            try:
+                cross.generation = parse_generation(data['generation'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
         if 'cross_date' in data and data['cross_date']:
             cross.cross_date = datetime.strptime(data['cross_date'], '%Y-%m-%d').date()
         if 'notes' in data:
@@ -330,11 +680,10 @@ def update_cross(tree_id, cross_id):
         return jsonify({'error': 'Failed to update cross'}), 500
 
 @family_tree_bp.route('/<int:tree_id>/crosses/<int:cross_id>', methods=['DELETE'])
+@login_required
 def delete_cross(tree_id, cross_id):
     try:
-        user = require_auth()
-        if not user:
-            return jsonify({'error': 'Authentication required'}), 401
+        user = current_user()
         
         family_tree = FamilyTree.query.get_or_404(tree_id)
         cross = Cross.query.get_or_404(cross_id)
@@ -355,17 +704,26 @@ def delete_cross(tree_id, cross_id):
 @family_tree_bp.route('/shared/<share_token>', methods=['GET'])
 def get_shared_family_tree(share_token):
     try:
-        family_tree = FamilyTree.query.filter_by(share_token=share_token).first()
+        family_tree = FamilyTree.query.options(
+            joinedload(FamilyTree.owner)
+        ).filter_by(share_token=share_token).first()
         
         if not family_tree:
             return jsonify({'error': 'Shared family tree not found'}), 404
         
-        crosses = Cross.query.filter_by(family_tree_id=family_tree.id).all()
+        etag, last_modified = tree_validators(family_tree, 'shared')
+        cached = not_modified(etag, last_modified)
+        if cached:
+            return cached
         
-        tree_data = family_tree.to_dict()
-        tree_data['crosses'] = [cross.to_dict() for cross in crosses]
+        def build():
+            crosses = load_tree_crosses(family_tree.id)
+            tree_data = family_tree.to_dict()
+            tree_data['crosses'] = [cross.to_dict() for cross in crosses]
+            return {'family_tree': tree_data}
         
-        return jsonify({'family_tree': tree_data}), 200
+        response = cached_json(('shared', share_token), etag, build)
+        return add_validators(response, etag, last_modified), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to load shared family tree'}), 500
@@ -376,29 +734,64 @@ def get_public_family_trees():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
         
-        pagination = FamilyTree.query.filter_by(is_public=True).order_by(
-            FamilyTree.updated_at.desc()
-        ).paginate(page=page, per_page=per_page, error_out=False)
+        try:
+            fields = tree_fields()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        query = FamilyTree.query.filter_by(is_public=True)
+        
+        # Any change to a public tree, or to which trees are public, moves this version
+        version = db.session.query(
+            func.count(FamilyTree.id), func.max(FamilyTree.updated_at)
+        ).filter(FamilyTree.is_public == True).one()
+        # Keyed on the parsed parameters only, so junk query args can't mint new entries
+        fields_key = tuple(fields) if fields else None
+        
+        if wants_cursor():
+            include_total = request.args.get('include_total', '').lower() == 'true'
+            cache_key = ('public', 'cursor', request.args.get('cursor', ''), per_page, fields_key, include_total)
+            def build():
+                items, pagination_data = cursor_paginate(
+                    query.options(*FamilyTree.load_options(fields, [FamilyTree.updated_at])), TREE_CURSOR_KEYS, per_page
+                )
+                return {
+                    'family_trees': [ft.to_dict(fields) for ft in items],
+                    **pagination_data
+                }
+            
+            try:
+                return cached_json(cache_key, version, build), 200
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
         
-        family_trees = [ft.to_dict() for ft in pagination.items]
+        cache_key = ('public', page, per_page, fields_key)
         
-        return jsonify({
-            'family_trees': family_trees,
-            'total': pagination.total,
-            'pages': pagination.pages,
-            'current_page': page,
-            'per_page': per_page
-        }), 200
+        def build():
+            pagination = query.options(*FamilyTree.load_options(fields)).order_by(
+                FamilyTree.updated_at.desc()
+            ).paginate(page=page, per_page=per_page, error_out=False)
+            
+            family_trees = [ft.to_dict(fields) for ft in pagination.items]
+            
+            return {
+                'family_trees': family_trees,
+                'total': pagination.total,
+                'pages': pagination.pages,
+                'current_page': page,
+                'per_page': per_page
+            }
+        
+        return cached_json(cache_key, version, build), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to fetch public family trees'}), 500
 
 @family_tree_bp.route('/<int:tree_id>/parent-strains', methods=['POST'])
+@login_required
 def add_parent_strain(tree_id):
     try:
-        user = require_auth()
-        if not user:
-            return jsonify({'error': 'Authentication required'}), 401
+        user = current_user()
         
         family_tree = FamilyTree.query.get_or_404(tree_id)
         
@@ -434,11 +827,10 @@ def add_parent_strain(tree_id):
         return jsonify({'error': 'Failed to add parent strain'}), 500
 
 @family_tree_bp.route('/<int:tree_id>/generate-offspring', methods=['POST'])
+@login_required
 def generate_offspring(tree_id):
     try:
-        user = require_auth()
-        if not user:
-            return jsonify({'error': 'Authentication required'}), 401
+        user = current_user()
         
         family_tree = FamilyTree.query.get_or_404(tree_id)
         
@@ -469,6 +861,11 @@ def generate_offspring(tree_id):
         if existing_offspring:
             return jsonify({'error': 'A strain with this name already exists'}), 400
         
+        try:
+            generation = parse_generation(data.get('generation', 1))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         avg_thc = 0
         avg_cbd = 0
         parent_count = 0
@@ -533,7 +930,7 @@ def generate_offspring(tree_id):
             parent1_id=parent1_id,
             parent2_id=parent2_id,
             offspring_id=offspring.id,
-            generation=data.get('generation', 1),
+            generation=generation,
             cross_date=datetime.strptime(data['cross_date'], '%Y-%m-%d').date() if data.get('cross_date') else datetime.utcnow().date(),
             notes=data.get('notes', f'Auto-generated cross: {parent1.name} × {parent2.name}'),
             family_tree_id=tree_id,
@@ -542,8 +939,10 @@ def generate_offspring(tree_id):
         )
         
         db.session.add(cross)
+        add_cross_to_lineage(cross)
         family_tree.updated_at = datetime.utcnow()
         db.session.commit()
+        strain_name_index.upsert(offspring)
         
         return jsonify({
             'message': 'Offspring generated successfully',
@@ -558,87 +957,89 @@ def generate_offspring(tree_id):
 @family_tree_bp.route('/<int:tree_id>/visualization', methods=['GET'])
 def get_family_tree_visualization(tree_id):
     try:
-        family_tree = FamilyTree.query.get_or_404(tree_id)
+        family_tree = load_family_tree(tree_id)
         
-        user = require_auth()
+        user = current_user()
         if not family_tree.is_public and (not user or family_tree.owner_id != user.id):
             return jsonify({'error': 'Access denied'}), 403
         
-        crosses = Cross.query.filter_by(family_tree_id=tree_id).all()
+        with_layout = request.args.get('layout', '').lower() == 'true'
+        etag, last_modified = tree_validators(family_tree, 'visualization', with_layout)
+        private = not family_tree.is_public
+        cached = not_modified(etag, last_modified, private)
+        if cached:
+            return cached
+        
+        crosses = load_tree_crosses(tree_id)
+        visualization_data = build_visualization_data(family_tree, crosses)
+        
+        # ?layout=true adds server-computed coordinates to every strain node
+        if with_layout:
+            layout = get_tree_layout(family_tree)
+            placed = {node['id']: node for node in layout['nodes']}
+            visualization_data['nodes'] = [
+                dict(node, **{key: placed[node['id']][key] for key in ('x', 'y', 'layer', 'order', 'pinned')})
+                for node in visualization_data['nodes']
+            ]
+            visualization_data['layout'] = {
+                'width': layout['width'],
+                'height': layout['height'],
+                'layers': layout['layers']
+            }
+        
+        return add_validators(jsonify(visualization_data), etag, last_modified, private), 200
         
-        nodes = {}
-        edges = []
+    except Exception as e:
+        return jsonify({'error': 'Failed to load visualization data'}), 500
+
+@family_tree_bp.route('/<int:tree_id>/kinship', methods=['GET'])
+def get_family_tree_kinship(tree_id):
+    """Inbreeding coefficients and the kinship matrix for every strain in a tree"""
+    try:
+        family_tree = load_family_tree(tree_id)
         
-        for cross in crosses:
-            if cross.parent1_id not in nodes:
-                nodes[cross.parent1_id] = {
-                    'id': cross.parent1_id,
-                    'name': cross.parent1_strain.name,
-                    'type': 'parent',
-                    'strain_type': cross.parent1_strain.strain_type,
-                    'thc_content': cross.parent1_strain.thc_content,
-                    'cbd_content': cross.parent1_strain.cbd_content,
-                    'description': cross.parent1_strain.description,
-                    'flowering_time': cross.parent1_strain.flowering_time,
-                    'yield_info': cross.parent1_strain.yield_info
-                }
-            
-            if cross.parent2_id not in nodes:
-                nodes[cross.parent2_id] = {
-                    'id': cross.parent2_id,
-                    'name': cross.parent2_strain.name,
-                    'type': 'parent',
-                    'strain_type': cross.parent2_strain.strain_type,
-                    'thc_content': cross.parent2_strain.thc_content,
-                    'cbd_content': cross.parent2_strain.cbd_content,
-                    'description': cross.parent2_strain.description,
-                    'flowering_time': cross.parent2_strain.flowering_time,
-                    'yield_info': cross.parent2_strain.yield_info
-                }
-            
-            if cross.offspring_id not in nodes:
-                nodes[cross.offspring_id] = {
-                    'id': cross.offspring_id,
-                    'name': cross.offspring_strain.name,
-                    'type': 'offspring',
-                    'strain_type': cross.offspring_strain.strain_type,
-                    'thc_content': cross.offspring_strain.thc_content,
-                    'cbd_content': cross.offspring_strain.cbd_content,
-                    'description': cross.offspring_strain.description,
-                    'flowering_time': cross.offspring_strain.flowering_time,
-                    'yield_info': cross.offspring_strain.yield_info,
-                    'generation': cross.generation
-                }
-            
-            edges.append({
-                'id': cross.id,
-                'parent1_id': cross.parent1_id,
-                'parent2_id': cross.parent2_id,
-                'offspring_id': cross.offspring_id,
-                'generation': cross.generation,
-                'cross_date': cross.cross_date.isoformat() if cross.cross_date else None,
-                'notes': cross.notes,
-                'position_x': cross.position_x,
-                'position_y': cross.position_y
-            })
+        user = current_user()
+        if not family_tree.is_public and (not user or family_tree.owner_id != user.id):
+            return jsonify({'error': 'Access denied'}), 403
+        
+        analysis = get_tree_kinship(family_tree, lambda: load_tree_crosses(tree_id))
         
-        visualization_data = {
-            'family_tree': family_tree.to_dict(),
-            'nodes': list(nodes.values()),
-            'edges': edges
+        # Kinship is a coefficient of coancestry; relatedness is twice the kinship
+        response = {
+            'family_tree_id': family_tree.id,
+            'strains': analysis['strains'],
+            'mean_inbreeding': analysis['mean_inbreeding']
         }
+        if request.args.get('include_matrix', 'true').lower() != 'false':
+            response['kinship'] = analysis['kinship']
         
-        return jsonify(visualization_data), 200
+        return jsonify(response), 200
         
     except Exception as e:
-        return jsonify({'error': 'Failed to load visualization data'}), 500
+        return jsonify({'error': 'Failed to compute kinship'}), 500
+
+@family_tree_bp.route('/<int:tree_id>/layout', methods=['GET'])
+def get_family_tree_layout(tree_id):
+    """Layered pedigree layout: node coordinates by generation with crossings reduced"""
+    try:
+        family_tree = load_family_tree(tree_id)
+        
+        user = current_user()
+        if not family_tree.is_public and (not user or family_tree.owner_id != user.id):
+            return jsonify({'error': 'Access denied'}), 403
+        
+        layout = dict(get_tree_layout(family_tree), family_tree_id=family_tree.id)
+        
+        return jsonify(layout), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to compute layout'}), 500
 
 @family_tree_bp.route('/<int:tree_id>/available-strains', methods=['GET'])
+@login_required
 def get_available_strains(tree_id):
     try:
-        user = require_auth()
-        if not user:
-            return jsonify({'error': 'Authentication required'}), 401
+        user = current_user()
         
         family_tree = FamilyTree.query.get_or_404(tree_id)
         
@@ -675,11 +1076,10 @@ def get_available_strains(tree_id):
         return jsonify({'error': 'Failed to fetch available strains'}), 500
 
 @family_tree_bp.route('/<int:tree_id>/next-generation', methods=['GET'])
+@login_required
 def get_next_generation(tree_id):
     try:
-        user = require_auth()
-        if not user:
-            return jsonify({'error': 'Authentication required'}), 401
+        user = current_user()
         
         family_tree = FamilyTree.query.get_or_404(tree_id)
         
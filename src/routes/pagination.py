@@ -0,0 +1,88 @@
+from flask import request
+from sqlalchemy import and_, or_, literal
+from datetime import datetime
+import base64
+import json
+
+# Keyset (cursor) pagination shared by the listing endpoints.
+#
+# A listing opts in by sending a `cursor` query parameter (empty for the
+# first page). Each key is a (column expression, descending, getter, type)
+# tuple where getter reads the key value back from a result row and type is
+# the Python type a cursor must carry for it (bool, int, str or datetime);
+# the last key must be unique (the primary key) so the order is total.
+
+def encode_cursor(values):
+    payload = [{'dt': v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_value(value, value_type):
+    if value_type is datetime:
+        if not isinstance(value, dict) or not isinstance(value.get('dt'), str):
+            raise ValueError('Invalid cursor')
+        return datetime.fromisoformat(value['dt'])
+    # bool is an int subclass; neither stands in for the other
+    if type(value) is not value_type:
+        raise ValueError('Invalid cursor')
+    return value
+
+def decode_cursor(cursor, keys):
+    """Decode an opaque cursor back into values for `keys`.
+
+    Raises ValueError unless there is exactly one non-null value per key,
+    of the key's declared type.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(keys):
+            raise ValueError('Invalid cursor')
+        return [decode_value(value, value_type) for value, (_, _, _, value_type) in zip(payload, keys)]
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def keyset_condition(keys, values):
+    """Rows strictly after `values` in the order described by `keys`"""
+    # Bound explicitly: SQLAlchemy refuses < and > against a bare True/False
+    bounds = [(column, descending, literal(value, column.type)) for (column, descending, *_), value in zip(keys, values)]
+    condition = None
+    for column, descending, value in reversed(bounds):
+        after = column < value if descending else column > value
+        condition = after if condition is None else or_(after, and_(column == value, condition))
+    # Redundant range on the leading key, so an index on the keys can seek
+    # to the cursor instead of scanning from the first row
+    column, descending, value = bounds[0]
+    return and_(column <= value if descending else column >= value, condition)
+
+def wants_cursor():
+    return 'cursor' in request.args
+
+def cursor_paginate(query, keys, per_page):
+    """Fetch one keyset page of `query`.
+
+    Returns (items, pagination_data) where pagination_data carries the
+    opaque next_cursor and, when include_total=true is passed, the total row
+    count (skipped by default because it costs a full COUNT).
+    """
+    per_page = max(per_page, 1)
+    base_query = query
+    cursor = request.args.get('cursor', '')
+    if cursor:
+        values = decode_cursor(cursor, keys)
+        query = query.filter(keyset_condition(keys, values))
+
+    ordered = query.order_by(
+        *[column.desc() if descending else column.asc() for column, descending, *_ in keys]
+    )
+    rows = ordered.limit(per_page + 1).all()
+    items = rows[:per_page]
+
+    next_cursor = None
+    if len(rows) > per_page:
+        next_cursor = encode_cursor([getter(items[-1]) for _, _, getter, _ in keys])
+
+    pagination_data = {'next_cursor': next_cursor, 'per_page': per_page}
+    if request.args.get('include_total', '').lower() == 'true':
+        pagination_data['total'] = base_query.order_by(None).count()
+    return items, pagination_data
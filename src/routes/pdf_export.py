@@ -4,19 +4,30 @@ import os
 import io
 import json
 from datetime import datetime, timedelta
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.graphics.shapes import Drawing, Circle, Line, String
-from reportlab.graphics import renderPDF
 from src.models.user import User, db
-from src.models.family_tree import FamilyTree, Cross
+from src.models.family_tree import FamilyTree
+from src.models.pdf_export_job import PdfExportJob
+from src.models.pdf_cache import (
+    pdf_cache_dir, pdf_cache_path, export_pdf_path, cached_pdf, evict_pdf_cache, remove_file,
+    PDF_CACHE_MAX_BYTES, EXPORT_PREFIX
+)
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import threading
 import uuid
 
 pdf_bp = Blueprint('pdf', __name__)
 
+# Local worker pool for PDF rendering; the pdf_export_job table is the queue
+PDF_WORKERS = 2
+DOWNLOAD_TTL = timedelta(hours=24)
+# Running jobs not finished after this long are assumed lost with their worker
+JOB_TIMEOUT = timedelta(minutes=30)
+
+_executor = None
+_executor_lock = threading.Lock()
+_worker_app = None
+
 # Simulated payment processing (in production, integrate with Stripe, PayPal, etc.)
 PAYMENT_PLANS = {
     'basic': {
@@ -85,7 +96,7 @@ def create_payment_intent():
 @pdf_bp.route('/api/pdf/confirm-payment', methods=['POST'])
 @cross_origin()
 def confirm_payment():
-    """Confirm payment and generate PDF"""
+    """Confirm payment and queue PDF generation"""
     try:
         data = request.get_json()
         payment_intent_id = data.get('payment_intent_id')
@@ -99,66 +110,103 @@ def confirm_payment():
         if not payment_verified:
             return jsonify({'success': False, 'error': 'Payment verification failed'}), 400
         
-        # Generate PDF
+        if plan_type not in PAYMENT_PLANS:
+            return jsonify({'success': False, 'error': 'Invalid plan type'}), 400
+        
         family_tree = FamilyTree.query.get(family_tree_id)
         if not family_tree:
             return jsonify({'success': False, 'error': 'Family tree not found'}), 404
         
-        pdf_path = generate_family_tree_pdf(family_tree, plan_type)
+        # The download token is issued now and starts serving the file once the job is done
+        job = PdfExportJob(
+            family_tree_id=family_tree.id,
+            plan_type=plan_type,
+            expires_at=datetime.utcnow() + DOWNLOAD_TTL
+        )
         
-        # Create download token for secure access
-        download_token = str(uuid.uuid4())
+        # An unchanged tree exported on the same plan is served from the render cache;
+        # anything else, including every export with caching off, renders on the worker pool
+        cache_enabled = current_app.config.get('PDF_CACHE_ENABLED', True)
+        pdf_path = cache_enabled and cached_pdf(pdf_cache_path(family_tree, plan_type))
+        if pdf_path:
+            job.status = 'done'
+            job.progress = 100
+            job.pdf_path = pdf_path
+            job.finished_at = datetime.utcnow()
         
-        # Store download info (in production, use Redis or database)
-        download_info = {
-            'pdf_path': pdf_path,
-            'family_tree_id': family_tree_id,
-            'plan_type': plan_type,
-            'created_at': datetime.utcnow().isoformat(),
-            'expires_at': (datetime.utcnow() + timedelta(hours=24)).isoformat()
-        }
+        db.session.add(job)
+        db.session.commit()
         
-        # In production, store this in a proper cache/database
-        current_app.config.setdefault('PDF_DOWNLOADS', {})[download_token] = download_info
+        if job.status != 'done':
+            submit_pdf_job(job.id)
         
         return jsonify({
             'success': True,
-            'download_token': download_token,
-            'download_url': f'/api/pdf/download/{download_token}',
-            'expires_in': 24 * 60 * 60  # 24 hours in seconds
-        })
+            'status': job.status,
+            'job_id': job.id,
+            'status_url': f'/api/pdf/jobs/{job.id}',
+            'download_token': job.download_token,
+            'download_url': f'/api/pdf/download/{job.download_token}',
+            'expires_in': int(DOWNLOAD_TTL.total_seconds())
+        }), 200 if job.status == 'done' else 202
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@pdf_bp.route('/api/pdf/jobs/<job_id>', methods=['GET'])
+@cross_origin()
+def get_pdf_job(job_id):
+    """Status and progress of a queued PDF export"""
+    job = PdfExportJob.query.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    return jsonify({'success': True, 'job': job.to_dict()})
+
 @pdf_bp.route('/api/pdf/download/<download_token>', methods=['GET'])
 @cross_origin()
 def download_pdf(download_token):
     """Download PDF using secure token"""
     try:
-        downloads = current_app.config.get('PDF_DOWNLOADS', {})
-        download_info = downloads.get(download_token)
+        job = PdfExportJob.query.filter_by(download_token=download_token).first()
         
-        if not download_info:
+        if not job:
             return jsonify({'success': False, 'error': 'Invalid or expired download token'}), 404
         
         # Check if token has expired
-        expires_at = datetime.fromisoformat(download_info['expires_at'])
-        if datetime.utcnow() > expires_at:
-            # Clean up expired token
-            del downloads[download_token]
+        if job.expires_at and datetime.utcnow() > job.expires_at:
             return jsonify({'success': False, 'error': 'Download token has expired'}), 410
         
-        pdf_path = download_info['pdf_path']
-        if not os.path.exists(pdf_path):
-            return jsonify({'success': False, 'error': 'PDF file not found'}), 404
+        if job.status == 'failed':
+            return jsonify({'success': False, 'error': job.error or 'PDF generation failed'}), 500
+        
+        if job.status != 'done':
+            return jsonify({'success': True, 'job': job.to_dict()}), 202
         
         # Get family tree for filename
-        family_tree = FamilyTree.query.get(download_info['family_tree_id'])
+        family_tree = FamilyTree.query.get(job.family_tree_id)
+        if not family_tree:
+            return jsonify({'success': False, 'error': 'Family tree not found'}), 404
         filename = f"{family_tree.name.replace(' ', '_')}_family_tree.pdf"
         
+        pdf_file = job.pdf_path
+        if not pdf_file:
+            return jsonify({'success': False, 'error': 'PDF was already downloaded'}), 410
+        if not os.path.exists(pdf_file):
+            return jsonify({'success': False, 'error': 'PDF file not found'}), 404
+        
+        if os.path.basename(pdf_file).startswith(EXPORT_PREFIX):
+            # Rendered with caching off: a single download. The open handle keeps
+            # the data readable after the file is unlinked.
+            path = pdf_file
+            pdf_file = open(path, 'rb')
+            remove_file(path)
+            job.pdf_path = None
+            db.session.commit()
+        
         return send_file(
-            pdf_path,
+            pdf_file,
             as_attachment=True,
             download_name=filename,
             mimetype='application/pdf'
@@ -167,195 +215,102 @@ def download_pdf(download_token):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-def generate_family_tree_pdf(family_tree, plan_type='basic'):
-    """Generate PDF for family tree"""
-    # Create PDF directory if it doesn't exist
-    pdf_dir = os.path.join(current_app.root_path, 'generated_pdfs')
-    os.makedirs(pdf_dir, exist_ok=True)
-    
-    # Generate unique filename
-    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-    filename = f"family_tree_{family_tree.id}_{timestamp}.pdf"
-    pdf_path = os.path.join(pdf_dir, filename)
-    
-    # Create PDF document
-    doc = SimpleDocTemplate(pdf_path, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        textColor=colors.HexColor('#059669'),
-        alignment=1  # Center alignment
-    )
-    
-    subtitle_style = ParagraphStyle(
-        'CustomSubtitle',
-        parent=styles['Heading2'],
-        fontSize=16,
-        spaceAfter=20,
-        textColor=colors.HexColor('#374151')
-    )
-    
-    # Title page
-    story.append(Paragraph(family_tree.name, title_style))
-    story.append(Spacer(1, 20))
-    
-    if family_tree.description:
-        story.append(Paragraph(family_tree.description, styles['Normal']))
-        story.append(Spacer(1, 20))
-    
-    # Family tree information
-    info_data = [
-        ['Created by:', family_tree.owner.username],
-        ['Created on:', family_tree.created_at.strftime('%B %d, %Y')],
-        ['Last updated:', family_tree.updated_at.strftime('%B %d, %Y')],
-        ['Total crosses:', str(len(family_tree.crosses))],
-        ['Generations:', f"F1-F{max([cross.generation for cross in family_tree.crosses], default=1)}"]
-    ]
-    
-    info_table = Table(info_data, colWidths=[2*inch, 3*inch])
-    info_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-    ]))
-    
-    story.append(info_table)
-    story.append(Spacer(1, 30))
-    
-    # Crosses section
-    story.append(Paragraph("Breeding History", subtitle_style))
-    
-    if family_tree.crosses:
-        # Group crosses by generation
-        crosses_by_gen = {}
-        for cross in family_tree.crosses:
-            gen = f"F{cross.generation}"
-            if gen not in crosses_by_gen:
-                crosses_by_gen[gen] = []
-            crosses_by_gen[gen].append(cross)
+def get_executor():
+    """Process pool shared by this web worker, created on first use.
+
+    Creating it also re-dispatches jobs left queued, or stuck running, by a
+    previous process so nothing in the queue table is lost across restarts.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+            _executor = ProcessPoolExecutor(
+                max_workers=current_app.config.get('PDF_WORKERS', PDF_WORKERS),
+                mp_context=context
+            )
+            stale = datetime.utcnow() - JOB_TIMEOUT
+            PdfExportJob.query.filter(
+                PdfExportJob.status == 'running', PdfExportJob.started_at < stale
+            ).update({'status': 'queued', 'progress': 0}, synchronize_session=False)
+            db.session.commit()
+            for (job_id,) in db.session.query(PdfExportJob.id).filter_by(status='queued'):
+                _executor.submit(run_pdf_job, job_id, worker_config())
+        return _executor
+
+def worker_config():
+    return {
+        'PDF_CACHE_DIR': pdf_cache_dir(),
+        'PDF_CACHE_ENABLED': current_app.config.get('PDF_CACHE_ENABLED', True),
+        'SQLALCHEMY_DATABASE_URI': current_app.config['SQLALCHEMY_DATABASE_URI'],
+        'SQLALCHEMY_ENGINE_OPTIONS': current_app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+        'PDF_CACHE_MAX_BYTES': current_app.config.get('PDF_CACHE_MAX_BYTES', PDF_CACHE_MAX_BYTES)
+    }
+
+def submit_pdf_job(job_id):
+    get_executor().submit(run_pdf_job, job_id, worker_config())
+
+def get_worker_app(config):
+    """Minimal Flask app giving pool processes a database session and the render directory"""
+    global _worker_app
+    if _worker_app is None:
+        from flask import Flask
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = config['SQLALCHEMY_DATABASE_URI']
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = config['SQLALCHEMY_ENGINE_OPTIONS']
+        app.config['PDF_CACHE_MAX_BYTES'] = config['PDF_CACHE_MAX_BYTES']
+        app.config['PDF_CACHE_DIR'] = config['PDF_CACHE_DIR']
+        app.config['PDF_CACHE_ENABLED'] = config['PDF_CACHE_ENABLED']
+        db.init_app(app)
+        _worker_app = app
+    return _worker_app
+
+def run_pdf_job(job_id, config):
+    """Render one queued export inside a pool process"""
+    app = get_worker_app(config)
+    with app.app_context():
+        # Claim the job atomically so a re-dispatched job never renders twice
+        claimed = PdfExportJob.query.filter_by(id=job_id, status='queued').update(
+            {'status': 'running', 'started_at': datetime.utcnow(), 'progress': 0},
+            synchronize_session=False
+        )
+        db.session.commit()
+        if not claimed:
+            return
         
-        for generation in sorted(crosses_by_gen.keys()):
-            story.append(Paragraph(f"{generation} Generation", styles['Heading3']))
-            
-            crosses_data = [['Parent 1', 'Parent 2', 'Offspring', 'Date', 'Notes']]
-            
-            for cross in crosses_by_gen[generation]:
-                crosses_data.append([
-                    cross.parent1_name,
-                    cross.parent2_name,
-                    cross.offspring_name,
-                    cross.cross_date.strftime('%m/%d/%Y') if cross.cross_date else 'N/A',
-                    cross.notes[:50] + '...' if cross.notes and len(cross.notes) > 50 else cross.notes or ''
-                ])
-            
-            crosses_table = Table(crosses_data, colWidths=[1.2*inch, 1.2*inch, 1.2*inch, 0.8*inch, 2*inch])
-            crosses_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f3f4f6')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 8),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ]))
-            
-            story.append(crosses_table)
-            story.append(Spacer(1, 20))
-    
-    # Strain summary
-    story.append(Paragraph("Strain Summary", subtitle_style))
-    
-    # Get all unique strains
-    strains = set()
-    for cross in family_tree.crosses:
-        strains.add(cross.parent1_name)
-        strains.add(cross.parent2_name)
-        strains.add(cross.offspring_name)
-    
-    strain_list = sorted(list(strains))
-    strain_text = ", ".join(strain_list)
-    story.append(Paragraph(f"Strains involved: {strain_text}", styles['Normal']))
-    story.append(Spacer(1, 20))
-    
-    # Premium features
-    if plan_type == 'premium':
-        story.append(Paragraph("Breeding Analysis", subtitle_style))
+        job = PdfExportJob.query.get(job_id)
         
-        # Add breeding statistics
-        stats_data = [
-            ['Total unique strains:', str(len(strains))],
-            ['Most used parent:', get_most_used_parent(family_tree.crosses)],
-            ['Average generation:', f"F{sum([cross.generation for cross in family_tree.crosses]) / len(family_tree.crosses):.1f}"],
-            ['Breeding timespan:', get_breeding_timespan(family_tree.crosses)]
-        ]
+        def report_progress(percent):
+            job.progress = percent
+            db.session.commit()
         
-        stats_table = Table(stats_data, colWidths=[2.5*inch, 2.5*inch])
-        stats_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ]))
+        try:
+            family_tree = FamilyTree.query.get(job.family_tree_id)
+            if not family_tree:
+                raise ValueError('Family tree not found')
+            # ReportLab is only imported by processes that actually render
+            if app.config['PDF_CACHE_ENABLED']:
+                # An identical job may have filled the cache while this one was queued
+                pdf_path = pdf_cache_path(family_tree, job.plan_type)
+                if not cached_pdf(pdf_path):
+                    from src.routes.pdf_render import generate_family_tree_pdf
+                    generate_family_tree_pdf(family_tree, job.plan_type, progress=report_progress, pdf_path=pdf_path)
+            else:
+                from src.routes.pdf_render import generate_family_tree_pdf
+                pdf_path = generate_family_tree_pdf(
+                    family_tree, job.plan_type, progress=report_progress, pdf_path=export_pdf_path(job.id)
+                )
+            job.pdf_path = pdf_path
+            job.status = 'done'
+            job.progress = 100
+        except Exception as e:
+            db.session.rollback()
+            job = PdfExportJob.query.get(job_id)
+            job.status = 'failed'
+            job.error = str(e)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
         
-        story.append(stats_table)
-        story.append(Spacer(1, 20))
-    
-    # Footer
-    story.append(Spacer(1, 50))
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=colors.grey,
-        alignment=1
-    )
-    
-    footer_text = f"Generated by StrainTree on {datetime.utcnow().strftime('%B %d, %Y at %I:%M %p UTC')}"
-    if plan_type == 'premium':
-        footer_text += " | Premium Export"
-    
-    story.append(Paragraph(footer_text, footer_style))
-    
-    # Build PDF
-    doc.build(story)
-    
-    return pdf_path
-
-def get_most_used_parent(crosses):
-    """Get the most frequently used parent strain"""
-    parent_counts = {}
-    for cross in crosses:
-        parent_counts[cross.parent1_name] = parent_counts.get(cross.parent1_name, 0) + 1
-        parent_counts[cross.parent2_name] = parent_counts.get(cross.parent2_name, 0) + 1
-    
-    if not parent_counts:
-        return "N/A"
-    
-    most_used = max(parent_counts, key=parent_counts.get)
-    return f"{most_used} ({parent_counts[most_used]} uses)"
-
-def get_breeding_timespan(crosses):
-    """Get the timespan of breeding activities"""
-    if not crosses:
-        return "N/A"
-    
-    dates = [cross.cross_date for cross in crosses if cross.cross_date]
-    if not dates:
-        return "N/A"
-    
-    earliest = min(dates)
-    latest = max(dates)
-    
-    if earliest == latest:
-        return earliest.strftime('%B %Y')
-    
-    return f"{earliest.strftime('%B %Y')} - {latest.strftime('%B %Y')}"
-
+        if job.status == 'done':
+            evict_pdf_cache(app.config['PDF_CACHE_MAX_BYTES'])
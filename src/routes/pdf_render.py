@@ -0,0 +1,325 @@
+import os
+import uuid
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib import colors
+from reportlab.graphics.shapes import Drawing, Circle, Line, String
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+from src.models.user import db
+from src.models.strain import Strain
+from src.models.family_tree import Cross
+from src.models.pedigree_layout import get_tree_layout
+from src.routes.pagination import keyset_condition
+from src.models.pdf_cache import pdf_cache_path
+from datetime import datetime
+
+def generate_family_tree_pdf(family_tree, plan_type='basic', progress=None, pdf_path=None):
+    """Render a family tree into the PDF cache, returning the file path"""
+    if pdf_path is None:
+        pdf_path = pdf_cache_path(family_tree, plan_type)
+    
+    # Render beside the target and rename, so readers never see a partial file
+    tmp_path = f"{pdf_path}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        render_family_tree_pdf(family_tree, tmp_path, plan_type, progress=progress)
+        os.replace(tmp_path, pdf_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    
+    return pdf_path
+
+class FlowableStream(list):
+    """Story list that ReportLab drains while it is being filled.
+
+    doc.build() pops flowables off the front and checks len() before each
+    one, so topping the buffer up from a generator there keeps only a few
+    flowables alive at a time instead of the whole document.
+    """
+    
+    LOOKAHEAD = 8
+    
+    def __init__(self, flowables):
+        super().__init__()
+        self._source = iter(flowables)
+    
+    def __len__(self):
+        while self._source is not None and list.__len__(self) < self.LOOKAHEAD:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+        return list.__len__(self)
+
+class TreeStats:
+    """Report statistics accumulated while the crosses stream past once"""
+    
+    def __init__(self):
+        self.strains = set()
+        self.parent_counts = {}
+        self.generation_total = 0
+        self.crosses = 0
+        self.earliest = None
+        self.latest = None
+    
+    def add(self, row):
+        self.crosses += 1
+        self.generation_total += row.generation or 0
+        self.strains.update((row.parent1_name, row.parent2_name, row.offspring_name))
+        for name in (row.parent1_name, row.parent2_name):
+            self.parent_counts[name] = self.parent_counts.get(name, 0) + 1
+        if row.cross_date:
+            self.earliest = min(self.earliest or row.cross_date, row.cross_date)
+            self.latest = max(self.latest or row.cross_date, row.cross_date)
+    
+    def most_used_parent(self):
+        if not self.parent_counts:
+            return "N/A"
+        most_used = max(self.parent_counts, key=self.parent_counts.get)
+        return f"{most_used} ({self.parent_counts[most_used]} uses)"
+    
+    def breeding_timespan(self):
+        if not self.earliest:
+            return "N/A"
+        if self.earliest == self.latest:
+            return self.earliest.strftime('%B %Y')
+        return f"{self.earliest.strftime('%B %Y')} - {self.latest.strftime('%B %Y')}"
+
+# Crosses fetched per query and rows per table when streaming a tree into a PDF
+PDF_PAGE_SIZE = 200
+
+def iter_cross_rows(family_tree_id):
+    """Crosses with strain names in generation order, a keyset page at a time.
+
+    Rows are plain tuples from one joined select, so nothing accumulates in
+    the session however large the tree is.
+    """
+    parent1 = aliased(Strain)
+    parent2 = aliased(Strain)
+    offspring = aliased(Strain)
+    generation = func.coalesce(Cross.generation, 0)
+    query = db.session.query(
+        Cross.id, Cross.generation, Cross.cross_date, Cross.notes,
+        generation.label('generation_key'),
+        parent1.name.label('parent1_name'),
+        parent2.name.label('parent2_name'),
+        offspring.name.label('offspring_name')
+    ).join(parent1, Cross.parent1_id == parent1.id
+    ).join(parent2, Cross.parent2_id == parent2.id
+    ).join(offspring, Cross.offspring_id == offspring.id
+    ).filter(Cross.family_tree_id == family_tree_id)
+    keys = [(generation, False, None, int), (Cross.id, False, None, int)]
+    
+    page = query
+    while True:
+        rows = page.order_by(generation, Cross.id).limit(PDF_PAGE_SIZE).all()
+        for row in rows:
+            yield row
+        if len(rows) < PDF_PAGE_SIZE:
+            return
+        page = query.filter(keyset_condition(keys, [rows[-1].generation_key, rows[-1].id]))
+
+# Largest diagram that fits an A4 frame below the section heading, in points
+DIAGRAM_WIDTH = 450
+DIAGRAM_HEIGHT = 620
+
+def pedigree_drawing(layout, max_width=DIAGRAM_WIDTH, max_height=DIAGRAM_HEIGHT):
+    """Draw a pedigree layout scaled down to fit the page.
+
+    Labels are dropped once the scale makes them unreadable, which keeps
+    trees with thousands of strains to circles and lines.
+    """
+    scale = min(max_width / max(layout['width'], 1), max_height / max(layout['height'], 1), 1.0)
+    height = layout['height'] * scale
+    drawing = Drawing(layout['width'] * scale, height)
+    
+    points = {node['id']: (node['x'] * scale, height - node['y'] * scale) for node in layout['nodes']}
+    line_color = colors.HexColor('#9ca3af')
+    for edge in layout['edges']:
+        x2, y2 = points[edge['offspring_id']]
+        for parent_id in (edge['parent1_id'], edge['parent2_id']):
+            x1, y1 = points[parent_id]
+            drawing.add(Line(x1, y1, x2, y2, strokeColor=line_color, strokeWidth=0.5))
+    
+    radius = max(8 * scale, 1)
+    font_size = 7 * scale
+    for node in layout['nodes']:
+        x, y = points[node['id']]
+        drawing.add(Circle(x, y, radius, fillColor=colors.HexColor('#059669'), strokeColor=None))
+        if font_size >= 4:
+            drawing.add(String(x, y - radius - font_size, node['name'][:24], fontSize=font_size, textAnchor='middle'))
+    
+    return drawing
+
+def render_family_tree_pdf(family_tree, output, plan_type='basic', progress=None):
+    """Render a family tree PDF to a path or binary file object"""
+    doc = SimpleDocTemplate(output, pagesize=A4)
+    doc.build(FlowableStream(family_tree_story(family_tree, plan_type, progress)))
+
+def family_tree_story(family_tree, plan_type='basic', progress=None):
+    """Yield the report's flowables, streaming crosses in generation order"""
+    styles = getSampleStyleSheet()
+    
+    # Custom styles
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30,
+        textColor=colors.HexColor('#059669'),
+        alignment=1  # Center alignment
+    )
+    
+    subtitle_style = ParagraphStyle(
+        'CustomSubtitle',
+        parent=styles['Heading2'],
+        fontSize=16,
+        spaceAfter=20,
+        textColor=colors.HexColor('#374151')
+    )
+    
+    total_crosses = family_tree.crosses_count
+    max_generation = family_tree.max_generation
+    
+    # Title page
+    yield Paragraph(family_tree.name, title_style)
+    yield Spacer(1, 20)
+    
+    if family_tree.description:
+        yield Paragraph(family_tree.description, styles['Normal'])
+        yield Spacer(1, 20)
+    
+    # Family tree information
+    info_data = [
+        ['Created by:', family_tree.owner.username],
+        ['Created on:', family_tree.created_at.strftime('%B %d, %Y')],
+        ['Last updated:', family_tree.updated_at.strftime('%B %d, %Y')],
+        ['Total crosses:', str(total_crosses)],
+        ['Generations:', f"F1-F{max_generation or 1}"]
+    ]
+    
+    info_table = Table(info_data, colWidths=[2*inch, 3*inch])
+    info_table.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ]))
+    
+    yield info_table
+    yield Spacer(1, 30)
+    if progress:
+        progress(10)
+    
+    # Pedigree diagram
+    if plan_type == 'premium' and total_crosses:
+        yield PageBreak()
+        yield Paragraph("Pedigree Diagram", subtitle_style)
+        yield pedigree_drawing(get_tree_layout(family_tree))
+        yield PageBreak()
+    
+    # Crosses section
+    yield Paragraph("Breeding History", subtitle_style)
+    
+    crosses_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f3f4f6')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ])
+    
+    def crosses_table(crosses_data):
+        table = Table(crosses_data, colWidths=[1.2*inch, 1.2*inch, 1.2*inch, 0.8*inch, 2*inch], repeatRows=1)
+        table.setStyle(crosses_style)
+        return table
+    
+    # Tables hold at most PDF_PAGE_SIZE rows so each is laid out and released on its own
+    header = ['Parent 1', 'Parent 2', 'Offspring', 'Date', 'Notes']
+    stats = TreeStats()
+    crosses_data = None
+    generation = object()
+    for row in iter_cross_rows(family_tree.id):
+        # Group on the sort key, so a missing generation sorts and heads as F0
+        if row.generation_key != generation:
+            if crosses_data:
+                yield crosses_table(crosses_data)
+                yield Spacer(1, 20)
+            generation = row.generation_key
+            crosses_data = [header]
+            yield Paragraph(f"F{generation} Generation", styles['Heading3'])
+        elif len(crosses_data) > PDF_PAGE_SIZE:
+            yield crosses_table(crosses_data)
+            crosses_data = [header]
+        
+        stats.add(row)
+        crosses_data.append([
+            row.parent1_name,
+            row.parent2_name,
+            row.offspring_name,
+            row.cross_date.strftime('%m/%d/%Y') if row.cross_date else 'N/A',
+            row.notes[:50] + '...' if row.notes and len(row.notes) > 50 else row.notes or ''
+        ])
+        
+        if progress and stats.crosses % PDF_PAGE_SIZE == 0:
+            # crosses_count is a maintained counter and can lag the rows streamed here
+            progress(10 + min(70 * stats.crosses // max(total_crosses, 1), 70))
+    
+    if crosses_data:
+        yield crosses_table(crosses_data)
+        yield Spacer(1, 20)
+    
+    # Strain summary
+    yield Paragraph("Strain Summary", subtitle_style)
+    
+    strain_text = ", ".join(sorted(stats.strains))
+    yield Paragraph(f"Strains involved: {strain_text}", styles['Normal'])
+    yield Spacer(1, 20)
+    
+    # Premium features
+    if plan_type == 'premium' and stats.crosses:
+        yield Paragraph("Breeding Analysis", subtitle_style)
+        
+        # Add breeding statistics
+        stats_data = [
+            ['Total unique strains:', str(len(stats.strains))],
+            ['Most used parent:', stats.most_used_parent()],
+            ['Average generation:', f"F{stats.generation_total / stats.crosses:.1f}"],
+            ['Breeding timespan:', stats.breeding_timespan()]
+        ]
+        
+        stats_table = Table(stats_data, colWidths=[2.5*inch, 2.5*inch])
+        stats_table.setStyle(TableStyle([
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ]))
+        
+        yield stats_table
+        yield Spacer(1, 20)
+    
+    # Footer
+    yield Spacer(1, 50)
+    footer_style = ParagraphStyle(
+        'Footer',
+        parent=styles['Normal'],
+        fontSize=8,
+        textColor=colors.grey,
+        alignment=1
+    )
+    
+    footer_text = f"Generated by StrainTree on {datetime.utcnow().strftime('%B %d, %Y at %I:%M %p UTC')}"
+    if plan_type == 'premium':
+        footer_text += " | Premium Export"
+    
+    yield Paragraph(footer_text, footer_style)
+    
+    if progress:
+        progress(90)
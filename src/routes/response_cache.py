@@ -0,0 +1,183 @@
+from flask import Response, current_app, jsonify
+from collections import OrderedDict
+import hashlib
+import os
+import threading
+import time
+import uuid
+
+# Bodies kept per process; RESPONSE_CACHE_SIZE overrides
+RESPONSE_CACHE_SIZE = 256
+# Disk budget and lifetime of shared bodies; RESPONSE_CACHE_DISK_MAX_BYTES and RESPONSE_CACHE_TTL override
+RESPONSE_CACHE_DISK_MAX_BYTES = 64 * 1024 * 1024
+RESPONSE_CACHE_TTL = 3600
+# Seconds between disk sweeps of one process
+DISK_SWEEP_INTERVAL = 60
+
+class ResponseCache:
+    """LRU of serialized JSON bodies, each stored with the version it was built at.
+
+    A lookup only hits when the caller's current version matches, so a stale
+    body is never served and writes need not clear anything; superseded
+    bodies age out of the LRU. With
+    a directory configured, bodies are also written there (one file per key,
+    replaced atomically) so workers on the same host share their misses.
+    Files older than RESPONSE_CACHE_TTL are ignored, and each process
+    sweeps the directory back under RESPONSE_CACHE_DISK_MAX_BYTES at most
+    once per DISK_SWEEP_INTERVAL, expired files and oldest writes first.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._last_sweep = 0.0
+
+    def _disk_path(self, directory, key):
+        return os.path.join(directory, hashlib.sha1(repr(key).encode()).hexdigest() + '.json')
+
+    def get(self, key, version, directory=None):
+        version = str(version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        body = self._read_disk(directory, key, version) if directory else None
+        with self._lock:
+            if body is None:
+                self.misses += 1
+            else:
+                self.disk_hits += 1
+                self._store(key, version, body)
+        return body
+
+    def put(self, key, version, body, directory=None):
+        version = str(version)
+        with self._lock:
+            self._store(key, version, body)
+        if directory:
+            self._write_disk(directory, key, version, body)
+            self._maybe_sweep(directory)
+
+    def _store(self, key, version, body):
+        self._entries[key] = (version, body)
+        self._entries.move_to_end(key)
+        max_entries = current_app.config.get('RESPONSE_CACHE_SIZE', RESPONSE_CACHE_SIZE)
+        while len(self._entries) > max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_disk(self, directory, key, version):
+        path = self._disk_path(directory, key)
+        try:
+            if os.path.getmtime(path) < time.time() - self._ttl():
+                return None
+            with open(path, 'rb') as f:
+                if f.readline().decode().rstrip('\n') != version:
+                    return None
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, directory, key, version, body):
+        path = self._disk_path(directory, key)
+        tmp_path = f'{path}.{uuid.uuid4().hex[:8]}.tmp'
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(version.encode() + b'\n' + body)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _ttl(self):
+        return current_app.config.get('RESPONSE_CACHE_TTL', RESPONSE_CACHE_TTL)
+
+    def _maybe_sweep(self, directory):
+        now = time.time()
+        with self._lock:
+            if now - self._last_sweep < DISK_SWEEP_INTERVAL:
+                return
+            self._last_sweep = now
+        max_bytes = current_app.config.get('RESPONSE_CACHE_DISK_MAX_BYTES', RESPONSE_CACHE_DISK_MAX_BYTES)
+        self.evict_disk(directory, max_bytes, self._ttl())
+
+    def evict_disk(self, directory, max_bytes, ttl):
+        """Remove bodies (and stray partial writes) older than `ttl` seconds, then
+        the oldest writes until the directory holds at most `max_bytes`.
+        Returns the number of files removed."""
+        expired_before = time.time() - ttl
+        removed = 0
+        entries = []
+        total = 0
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if not entry.is_file() or not entry.name.endswith(('.json', '.tmp')):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    if stat.st_mtime < expired_before:
+                        removed += self._remove(entry.path)
+                    elif entry.name.endswith('.json'):
+                        total += stat.st_size
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            return removed
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            if self._remove(path):
+                total -= size
+                removed += 1
+        return removed
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return 1
+        except OSError:
+            return 0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0
+            }
+
+response_cache = ResponseCache()
+
+def cached_json(key, version, build):
+    """JSON response for `key`, built by build() only when `version` moved on.
+
+    build() returns the payload dict. The response carries X-Cache: HIT or
+    MISS so cache behaviour is visible from the outside.
+    """
+    directory = current_app.config.get('RESPONSE_CACHE_DIR')
+    body = response_cache.get(key, version, directory)
+    status = 'HIT'
+    if body is None:
+        body = jsonify(build()).get_data()
+        response_cache.put(key, version, body, directory)
+        status = 'MISS'
+    response = Response(body, mimetype='application/json')
+    response.headers['X-Cache'] = status
+    return response
@@ -1,26 +1,40 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify
 from src.models.user import db, User
-from src.models.strain import Strain
-from src.models.family_tree import Cross
-from sqlalchemy import or_, func
+from src.models.strain import Strain, safe_float, parse_fields
+from src.models.family_tree import FamilyTree, Cross
+from src.models.strain_search import apply_strain_search
+from src.models.strain_index import strain_name_index
+from src.models.lineage import (
+    query_lineage, closure_enabled, lineage_descendants, lineage_relationship,
+    DEFAULT_MAX_DEPTH, MAX_DEPTH_LIMIT
+)
+from src.models.strain_import import import_strains, detect_format
+from src.routes.auth import current_user, login_required
+from src.routes.pagination import wants_cursor, cursor_paginate
+from src.routes.conditional import weak_etag, add_validators, not_modified
+from src.routes.export import stream_rows, ndjson_response
+from sqlalchemy import or_, func, select
+from sqlalchemy.orm import aliased
 from datetime import datetime
 
 strain_bp = Blueprint('strain', __name__)
 
-def require_auth():
-    user_id = session.get('user_id')
-    if not user_id:
-        return None
-    return User.query.get(user_id)
+# Keyset order for cursor pagination, matching the catalog ORDER BY and
+# ix_strain_catalog_order; the flags are raw columns (never NULL, see
+# backfill_strain_flags) so the index serves the order without a sort
+STRAIN_CURSOR_KEYS = [
+    (Strain.is_lab_tested, True, lambda s: bool(s.is_lab_tested), bool),
+    (Strain.is_verified, True, lambda s: bool(s.is_verified), bool),
+    (Strain.name, False, lambda s: s.name, str),
+    (Strain.id, False, lambda s: s.id, int)
+]
 
-def safe_float(value):
-    """Safely convert value to float, returning None for empty/invalid values"""
-    if value == '' or value is None:
-        return None
-    try:
-        return float(value)
-    except (ValueError, TypeError):
-        return None
+# Columns the keyset cursor reads back from the last strain of a page
+STRAIN_CURSOR_COLUMNS = (Strain.is_lab_tested, Strain.is_verified, Strain.name)
+
+def strain_fields():
+    """Fields requested with ?fields=a,b,c; None when the full record is wanted"""
+    return parse_fields(request.args.get('fields'), Strain.field_names())
 
 @strain_bp.route('/', methods=['GET'])
 def get_strains():
@@ -32,16 +46,12 @@ def get_strains():
         verified_only = request.args.get('verified_only', '').lower() == 'true'
         lab_tested_only = request.args.get('lab_tested_only', '').lower() == 'true'
         
-        query = Strain.query
+        try:
+            fields = strain_fields()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Apply search filter
-        if search:
-            query = query.filter(
-                or_(
-                    Strain.name.ilike(f'%{search}%'),
-                    Strain.description.ilike(f'%{search}%')
-                )
-            )
+        query = Strain.query
         
         # Apply type filter
         if strain_type:
@@ -54,19 +64,36 @@ def get_strains():
         if lab_tested_only:
             query = query.filter(Strain.is_lab_tested == True)
         
-        # Order by lab tested, verified status, and name
-        query = query.order_by(
-            Strain.is_lab_tested.desc(),
-            Strain.is_verified.desc(), 
-            Strain.name
-        )
+        # Cursor mode: keyset order, no relevance ranking and no OFFSET scan
+        if wants_cursor():
+            if search:
+                query = apply_strain_search(query, search, ranked=False)
+            query = query.options(*Strain.load_options(fields, STRAIN_CURSOR_COLUMNS))
+            try:
+                items, pagination_data = cursor_paginate(query, STRAIN_CURSOR_KEYS, per_page)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return jsonify({
+                'strains': [strain.to_dict(fields) for strain in items],
+                **pagination_data
+            }), 200
+        
+        # Order by lab tested, verified status, then relevance or name
+        if search:
+            query = apply_strain_search(query, search)
+        else:
+            query = query.order_by(
+                Strain.is_lab_tested.desc(),
+                Strain.is_verified.desc(), 
+                Strain.name
+            )
         
         # Paginate
-        pagination = query.paginate(
+        pagination = query.options(*Strain.load_options(fields)).paginate(
             page=page, per_page=per_page, error_out=False
         )
         
-        strains = [strain.to_dict() for strain in pagination.items]
+        strains = [strain.to_dict(fields) for strain in pagination.items]
         
         return jsonify({
             'strains': strains,
@@ -80,11 +107,10 @@ def get_strains():
         return jsonify({'error': 'Failed to fetch strains'}), 500
 
 @strain_bp.route('/', methods=['POST'])
+@login_required
 def create_strain():
     try:
-        user = require_auth()
-        if not user:
-            return jsonify({'error': 'Authentication required'}), 401
+        user = current_user()
         
         data = request.get_json()
         if not data:
@@ -116,6 +142,7 @@ def create_strain():
         
         db.session.add(strain)
         db.session.commit()
+        strain_name_index.upsert(strain)
         
         # Simple response without calling to_dict to avoid relationship issues
         return jsonify({
@@ -140,41 +167,154 @@ def create_strain():
         print(f"Traceback: {traceback.format_exc()}")
         return jsonify({'error': f'Failed to create strain: {str(e)}'}), 500
 
+@strain_bp.route('/export', methods=['GET'])
+def export_strains():
+    """Stream the whole strain catalog as NDJSON (?gzip=true to compress)"""
+    creator = aliased(User)
+    verifier = aliased(User)
+    statement = select(
+        *Strain.__table__.columns,
+        creator.username.label('creator_username'),
+        verifier.username.label('verifier_username')
+    ).outerjoin(creator, creator.id == Strain.created_by).outerjoin(
+        verifier, verifier.id == Strain.verified_by
+    ).order_by(Strain.id)
+    
+    return ndjson_response(stream_rows(statement), 'strains.ndjson')
+
+@strain_bp.route('/import', methods=['POST'])
+@login_required
+def import_strain_catalog():
+    """Bulk import strains from a CSV or NDJSON upload.
+
+    Accepts a multipart `file` field or the raw request body. The format is
+    taken from ?format=csv|ndjson, else from the file name or content type.
+    """
+    try:
+        user = current_user()
+        
+        upload = request.files.get('file')
+        if upload:
+            stream = upload.stream
+            fmt = request.args.get('format') or detect_format(upload.filename, upload.mimetype)
+        else:
+            stream = request.stream
+            fmt = request.args.get('format') or detect_format(content_type=request.content_type)
+        
+        if fmt not in ('csv', 'ndjson'):
+            return jsonify({'error': 'Format must be csv or ndjson'}), 400
+        
+        report = import_strains(stream, fmt, user.id)
+        
+        # An upload cut short still reports the rows committed before the bad line
+        return jsonify({
+            'message': f'Imported {report.accepted} strains',
+            **report.to_dict()
+        }), 400 if report.error else 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Failed to import strains: {str(e)}'}), 500
+
 @strain_bp.route('/<int:strain_id>', methods=['GET'])
 def get_strain(strain_id):
     try:
         strain = Strain.query.get_or_404(strain_id)
         
-        # Get family trees where this strain appears
-        crosses_as_parent1 = Cross.query.filter_by(parent1_id=strain_id).all()
-        crosses_as_parent2 = Cross.query.filter_by(parent2_id=strain_id).all()
-        crosses_as_offspring = Cross.query.filter_by(offspring_id=strain_id).all()
-        
-        family_tree_ids = set()
-        for cross in crosses_as_parent1 + crosses_as_parent2 + crosses_as_offspring:
-            family_tree_ids.add(cross.family_tree_id)
-        
-        from src.models.family_tree import FamilyTree
-        family_trees = FamilyTree.query.filter(
-            FamilyTree.id.in_(family_tree_ids),
+        # The payload also lists the strain's trees, so any cross write
+        # touching it (which bumps its tree's updated_at) changes the tag
+        in_strain_crosses = or_(
+            Cross.parent1_id == strain_id, Cross.parent2_id == strain_id, Cross.offspring_id == strain_id
+        )
+        trees_modified = db.session.query(func.max(FamilyTree.updated_at)).join(
+            Cross, Cross.family_tree_id == FamilyTree.id
+        ).filter(in_strain_crosses).scalar()
+        etag = weak_etag('strain', strain.id, strain.version, strain.usage_count, trees_modified)
+        last_modified = max(value for value in (strain.updated_at, strain.created_at, trees_modified) if value)
+        cached = not_modified(etag, last_modified)
+        if cached:
+            return cached
+        
+        # Get public family trees where this strain appears
+        family_trees = FamilyTree.query.options(*FamilyTree.load_options()).filter(
+            FamilyTree.id.in_(select(Cross.family_tree_id).where(in_strain_crosses)),
             FamilyTree.is_public == True
         ).all()
         
         strain_data = strain.to_dict()
         strain_data['family_trees'] = [ft.to_dict() for ft in family_trees]
-        strain_data['usage_count'] = len(crosses_as_parent1) + len(crosses_as_parent2) + len(crosses_as_offspring)
         
-        return jsonify({'strain': strain_data}), 200
+        return add_validators(jsonify({'strain': strain_data}), etag, last_modified), 200
         
     except Exception as e:
         return jsonify({'error': 'Strain not found'}), 404
 
+def lineage_response(strain_id, direction):
+    strain = Strain.query.get(strain_id)
+    if not strain:
+        return jsonify({'error': 'Strain not found'}), 404
+    
+    max_depth = request.args.get('max_depth', DEFAULT_MAX_DEPTH, type=int)
+    max_depth = max(1, min(max_depth, MAX_DEPTH_LIMIT))
+    
+    user = current_user()
+    user_id = user.id if user else None
+    
+    # Flat descendant lists come from the closure table when enabled
+    if direction == 'descendants' and closure_enabled() and request.args.get('flat', '').lower() == 'true':
+        return jsonify({
+            'lineage': {
+                'strain_id': strain.id,
+                'direction': direction,
+                'max_depth': max_depth,
+                'nodes': lineage_descendants(strain.id, max_depth=max_depth, user_id=user_id)
+            }
+        }), 200
+    
+    lineage = query_lineage(strain.id, direction, max_depth=max_depth, user_id=user_id)
+    
+    return jsonify({'lineage': lineage}), 200
+
+@strain_bp.route('/<int:strain_id>/ancestors', methods=['GET'])
+def get_strain_ancestors(strain_id):
+    """Every ancestor of a strain across public trees and the caller's own trees"""
+    try:
+        return lineage_response(strain_id, 'ancestors')
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to load strain ancestors'}), 500
+
+@strain_bp.route('/<int:strain_id>/descendants', methods=['GET'])
+def get_strain_descendants(strain_id):
+    """Every descendant of a strain across public trees and the caller's own trees"""
+    try:
+        return lineage_response(strain_id, 'descendants')
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to load strain descendants'}), 500
+
+@strain_bp.route('/<int:strain_id>/relationship/<int:other_id>', methods=['GET'])
+def get_strain_relationship(strain_id, other_id):
+    """Ancestry between two strains and their shared ancestors across public trees and the caller's own"""
+    try:
+        if not closure_enabled():
+            return jsonify({'error': 'Lineage closure table is not enabled'}), 501
+        
+        strains = Strain.query.filter(Strain.id.in_([strain_id, other_id])).count()
+        if strains != len({strain_id, other_id}):
+            return jsonify({'error': 'Strain not found'}), 404
+        
+        user = current_user()
+        return jsonify({'relationship': lineage_relationship(strain_id, other_id, user.id if user else None)}), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to load strain relationship'}), 500
+
 @strain_bp.route('/<int:strain_id>', methods=['PUT'])
+@login_required
 def update_strain(strain_id):
     try:
-        user = require_auth()
-        if not user:
-            return jsonify({'error': 'Authentication required'}), 401
+        user = current_user()
         
         strain = Strain.query.get_or_404(strain_id)
         
@@ -216,6 +356,7 @@ def update_strain(strain_id):
             strain.yield_info = data['yield_info'].strip()
         
         db.session.commit()
+        strain_name_index.upsert(strain)
         
         return jsonify({
             'message': 'Strain updated successfully',
@@ -227,12 +368,11 @@ def update_strain(strain_id):
         return jsonify({'error': 'Failed to update strain'}), 500
 
 @strain_bp.route('/<int:strain_id>/submit-verification', methods=['POST'])
+@login_required
 def submit_lab_verification(strain_id):
     """Submit lab test results for strain verification"""
     try:
-        user = require_auth()
-        if not user:
-            return jsonify({'error': 'Authentication required'}), 401
+        user = current_user()
         
         strain = Strain.query.get_or_404(strain_id)
         
@@ -266,6 +406,7 @@ def submit_lab_verification(strain_id):
         strain.verified_by = user.id  # In future, this should be admin
         
         db.session.commit()
+        strain_name_index.upsert(strain)
         
         return jsonify({
             'message': 'Lab verification submitted successfully',
@@ -277,12 +418,11 @@ def submit_lab_verification(strain_id):
         return jsonify({'error': 'Failed to submit verification'}), 500
 
 @strain_bp.route('/<int:strain_id>/verify', methods=['POST'])
+@login_required
 def verify_strain(strain_id):
     """Admin endpoint to verify a strain"""
     try:
-        user = require_auth()
-        if not user:
-            return jsonify({'error': 'Authentication required'}), 401
+        user = current_user()
         
         # For now, allow any user to verify. In future, restrict to admins
         # if not user.is_admin:
@@ -305,6 +445,7 @@ def verify_strain(strain_id):
             strain.verification_notes = data['notes'].strip()
         
         db.session.commit()
+        strain_name_index.upsert(strain)
         
         return jsonify({
             'message': f'Strain {verification_type} verification approved',
@@ -322,16 +463,24 @@ def search_strains():
         if not query:
             return jsonify({'strains': []}), 200
         
-        strains = Strain.query.filter(
-            Strain.name.ilike(f'%{query}%')
-        ).order_by(
-            Strain.is_lab_tested.desc(),
-            Strain.is_verified.desc(), 
-            Strain.name
+        # Lightweight autocomplete served from the in-process name index
+        if request.args.get('mode') == 'typeahead':
+            limit = min(request.args.get('limit', 10, type=int), 50)
+            return jsonify({
+                'strains': strain_name_index.lookup(query, limit=limit)
+            }), 200
+        
+        try:
+            fields = strain_fields()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        strains = apply_strain_search(
+            Strain.query.options(*Strain.load_options(fields)), query, columns=['name']
         ).limit(10).all()
         
         return jsonify({
-            'strains': [strain.to_dict() for strain in strains]
+            'strains': [strain.to_dict(fields) for strain in strains]
         }), 200
         
     except Exception as e:
@@ -344,19 +493,37 @@ def get_verified_strains():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         
+        try:
+            fields = strain_fields()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         query = Strain.query.filter(
             or_(Strain.is_verified == True, Strain.is_lab_tested == True)
-        ).order_by(
+        )
+        
+        if wants_cursor():
+            query = query.options(*Strain.load_options(fields, STRAIN_CURSOR_COLUMNS))
+            try:
+                items, pagination_data = cursor_paginate(query, STRAIN_CURSOR_KEYS, per_page)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return jsonify({
+                'strains': [strain.to_dict(fields) for strain in items],
+                **pagination_data
+            }), 200
+        
+        query = query.order_by(
             Strain.is_lab_tested.desc(),
             Strain.is_verified.desc(),
             Strain.name
         )
         
-        pagination = query.paginate(
+        pagination = query.options(*Strain.load_options(fields)).paginate(
             page=page, per_page=per_page, error_out=False
         )
         
-        strains = [strain.to_dict() for strain in pagination.items]
+        strains = [strain.to_dict(fields) for strain in pagination.items]
         
         return jsonify({
             'strains': strains,
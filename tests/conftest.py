@@ -0,0 +1,83 @@
+import hashlib
+import pytest
+from flask.testing import FlaskClient
+from src.main import create_app
+from src.models.user import db, User
+from src.models.strain import Strain
+from src.models.family_tree import FamilyTree, Cross
+from src.models.storage import BUNDLED_DATABASE
+
+class RequestClient(FlaskClient):
+    """Test client that gives every request its own app context, as in production.
+
+    Tests hold an app context for their own queries; without this, `g`
+    (and with it current_user()) would be shared by all requests of a test.
+    The test's session is committed first so SQLite is not left holding a
+    read lock the request may need to write past.
+    """
+
+    def open(self, *args, **kwargs):
+        db.session.commit()
+        with self.application.app_context():
+            return super().open(*args, **kwargs)
+
+@pytest.fixture(autouse=True)
+def isolated_database(tmp_path, monkeypatch):
+    """Point apps built without a database URI at a scratch file, never the bundled one"""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'default.db'}")
+
+@pytest.fixture(scope='session', autouse=True)
+def bundled_database_untouched():
+    with open(BUNDLED_DATABASE, 'rb') as f:
+        before = hashlib.sha256(f.read()).hexdigest()
+    yield
+    with open(BUNDLED_DATABASE, 'rb') as f:
+        assert hashlib.sha256(f.read()).hexdigest() == before, 'tests modified src/database/app.db'
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'APP_ENV': 'development',
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'PDF_EXPORT_ENABLED': False
+    })
+    app.test_client_class = RequestClient
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def login(client, user):
+    with client.session_transaction() as session:
+        session['user_id'] = user.id
+
+def make_user(name):
+    user = User(username=name, email=f'{name}@example.com')
+    user.set_password('Password1')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def make_tree(owner, is_public=True, name='tree'):
+    tree = FamilyTree(name=name, owner_id=owner.id, is_public=is_public)
+    db.session.add(tree)
+    db.session.commit()
+    return tree
+
+def make_strains(owner, count, prefix='strain'):
+    strains = [Strain(name=f'{prefix} {i}', created_by=owner.id) for i in range(count)]
+    db.session.add_all(strains)
+    db.session.commit()
+    return strains
+
+def make_cross(tree, parent1, parent2, offspring, generation=1):
+    cross = Cross(parent1_id=parent1.id, parent2_id=parent2.id, offspring_id=offspring.id,
+                  generation=generation, family_tree_id=tree.id)
+    db.session.add(cross)
+    db.session.commit()
+    return cross
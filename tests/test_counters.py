@@ -0,0 +1,49 @@
+import pytest
+from conftest import login, make_user, make_tree, make_strains
+from src.models.user import db
+from src.models.family_tree import FamilyTree, Cross
+from src.models.counters import reconcile_counters
+
+@pytest.fixture
+def tree(app, client):
+    owner = make_user('owner')
+    tree = make_tree(owner)
+    make_strains(owner, 4)
+    login(client, owner)
+    return tree
+
+def cross_payload(generation, **extra):
+    return {'parent1_id': 1, 'parent2_id': 2, 'generation': generation, **extra}
+
+def test_generation_sent_as_string_is_coerced(tree, client):
+    response = client.post(f'/api/family-trees/{tree.id}/crosses', json=cross_payload('2'))
+    assert response.status_code == 201
+    assert response.get_json()['cross']['generation'] == 2
+
+    response = client.post(f'/api/family-trees/{tree.id}/crosses/batch', json={'crosses': [
+        cross_payload('3', offspring_name='batch child')
+    ]})
+    assert response.status_code == 201
+
+    response = client.post(f'/api/family-trees/{tree.id}/generate-offspring',
+                           json=cross_payload('4', offspring_name='generated child'))
+    assert response.status_code == 201
+
+    family_tree = db.session.get(FamilyTree, tree.id)
+    assert (family_tree.crosses_count, family_tree.max_generation) == (3, 4)
+    assert reconcile_counters() == (0, 0)
+
+@pytest.mark.parametrize('generation', ['two', {'n': 2}, [2], 2.5])
+def test_invalid_generation_is_a_bad_request(tree, client, generation):
+    response = client.post(f'/api/family-trees/{tree.id}/crosses', json=cross_payload(generation))
+    assert response.status_code == 400
+    assert Cross.query.count() == 0
+
+    response = client.post(f'/api/family-trees/{tree.id}/generate-offspring',
+                           json=cross_payload(generation, offspring_name='generated child'))
+    assert response.status_code == 400
+
+    cross = client.post(f'/api/family-trees/{tree.id}/crosses', json=cross_payload(1)).get_json()['cross']
+    response = client.put(f'/api/family-trees/{tree.id}/crosses/{cross["id"]}', json={'generation': generation})
+    assert response.status_code == 400
+    assert db.session.get(FamilyTree, tree.id).max_generation == 1
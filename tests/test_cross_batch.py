@@ -0,0 +1,29 @@
+from conftest import login, make_user, make_tree, make_strains
+from src.models.family_tree import Cross
+
+def test_batch_reports_bad_items_and_keeps_the_rest(app, client):
+    owner = make_user('owner')
+    tree = make_tree(owner)
+    a, b = make_strains(owner, 2)
+    login(client, owner)
+
+    response = client.post(f'/api/family-trees/{tree.id}/crosses/batch', json={'crosses': [
+        {'parent1_id': str(a.id), 'parent2_id': b.id, 'offspring_name': 'string ids', 'notes': ' kept '},
+        {'parent1_id': a.id, 'parent2_id': b.id, 'notes': ['not', 'text']},
+        {'parent1_id': a.id, 'parent2_id': b.id, 'offspring_name': 42},
+        {'parent1_id': 'twelve', 'parent2_id': b.id},
+        {'parent1_id': True, 'parent2_id': b.id},
+        {'parent1_id': 9999, 'parent2_id': b.id}
+    ]})
+    assert response.status_code == 201
+    body = response.get_json()
+    assert [created['index'] for created in body['created']] == [0]
+    assert body['errors'] == [
+        {'index': 1, 'error': 'notes and offspring_name must be strings'},
+        {'index': 2, 'error': 'notes and offspring_name must be strings'},
+        {'index': 3, 'error': 'Parent strain ids must be integers'},
+        {'index': 4, 'error': 'Parent strain ids must be integers'},
+        {'index': 5, 'error': 'One or more parent strains not found'}
+    ]
+    cross = Cross.query.one()
+    assert (cross.parent1_id, cross.notes) == (a.id, 'kept')
@@ -0,0 +1,82 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter so modules imported by other tests don't leak in
+SCRIPT = textwrap.dedent('''
+    import sys
+    import time
+    from src.main import create_app
+
+    def loaded():
+        return sorted(name for name in ('numpy', 'reportlab') if name in sys.modules)
+
+    app = create_app({
+        'TESTING': True,
+        'APP_ENV': 'development',
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + sys.argv[1],
+        'PDF_EXPORT_ENABLED': True,
+        'PDF_CACHE_ENABLED': False,
+        'PDF_CACHE_DIR': sys.argv[2]
+    })
+    client = app.test_client()
+    print('boot', loaded())
+
+    with app.app_context():
+        from conftest import make_user, make_tree, make_strains, make_cross
+        owner = make_user('owner')
+        tree = make_tree(owner)
+        a, b, c = make_strains(owner, 3)
+        make_cross(tree, a, b, c)
+        tree_id = tree.id
+    assert client.get('/api/strains/').status_code == 200
+    assert client.get(f'/api/family-trees/{tree_id}').status_code == 200
+    print('lists', loaded())
+
+    assert client.get(f'/api/family-trees/{tree_id}/kinship').status_code == 200
+    print('kinship', loaded())
+
+    job = client.post('/api/pdf/confirm-payment', json={'payment_intent_id': 'pi', 'family_tree_id': tree_id}).get_json()
+    for _ in range(300):
+        if client.get(job['status_url']).get_json()['job']['status'] == 'done':
+            break
+        time.sleep(0.1)
+    assert client.get(job['download_url']).status_code == 200
+    print('pdf', loaded())
+''')
+
+def test_heavy_modules_load_with_their_routes(tmp_path):
+    result = subprocess.run(
+        [sys.executable, '-c', SCRIPT, str(tmp_path / 'test.db'), str(tmp_path / 'renders')],
+        cwd=ROOT, env={**os.environ, 'PYTHONPATH': os.pathsep.join([ROOT, os.path.join(ROOT, 'tests')])},
+        capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    stages = dict(line.split(' ', 1) for line in result.stdout.splitlines() if line.split(' ', 1)[0] in ('boot', 'lists', 'kinship', 'pdf'))
+    assert stages == {
+        'boot': '[]',
+        'lists': '[]',
+        'kinship': "['numpy']",
+        # PDFs render in the worker pool, never in the web process
+        'pdf': "['numpy']"
+    }
+
+def test_importtime_of_main_excludes_heavy_modules():
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import src.main'],
+        cwd=ROOT, env={**os.environ, 'PYTHONPATH': ROOT}, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    # Lines read "import time: <self us> | <cumulative us> | <indented module>"
+    imported = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line and 'cumulative' not in line:
+            _, cumulative, module = line.split('|')
+            imported[module.strip()] = int(cumulative)
+    assert 'src.main' in imported
+    heavy = sorted(name for name in imported if name.split('.')[0] in ('numpy', 'reportlab'))
+    assert heavy == []
+    print(f"\nimport src.main: {imported['src.main'] / 1000:.0f} ms cumulative")
@@ -0,0 +1,119 @@
+import pytest
+from conftest import login, make_user, make_tree, make_strains, make_cross
+from src.models.user import db
+from src.models import lineage
+from src.models.lineage import StrainLineage, rebuild_lineage
+
+@pytest.fixture
+def closure_app(app):
+    app.config['LINEAGE_CLOSURE_ENABLED'] = True
+    return app
+
+def pedigree(owner, is_public=True):
+    """a x b -> c, c x d -> e in one tree"""
+    tree = make_tree(owner, is_public=is_public)
+    a, b, c, d, e = make_strains(owner, 5, prefix=f'tree {tree.id}')
+    make_cross(tree, a, b, c)
+    make_cross(tree, c, d, e)
+    rebuild_lineage()
+    db.session.commit()
+    return tree, (a, b, c, d, e)
+
+def flat_descendants(client, strain):
+    response = client.get(f'/api/strains/{strain.id}/descendants?flat=true')
+    assert response.status_code == 200
+    return {node['id'] for node in response.get_json()['lineage']['nodes']}
+
+def test_deleting_tree_removes_its_closure_rows(closure_app, client):
+    owner = make_user('owner')
+    tree, (a, b, c, d, e) = pedigree(owner)
+    assert flat_descendants(client, a) == {c.id, e.id}
+
+    login(client, owner)
+    assert client.delete(f'/api/family-trees/{tree.id}').status_code == 200
+
+    assert db.session.query(StrainLineage).count() == 0
+    assert flat_descendants(client, a) == set()
+    relationship = client.get(f'/api/strains/{a.id}/relationship/{e.id}').get_json()['relationship']
+    assert relationship['a_is_ancestor_of_b'] is None
+
+def test_deleting_user_removes_closure_rows_of_their_trees(closure_app, client):
+    owner = make_user('owner')
+    keeper = make_user('keeper')
+    pedigree(owner)
+    tree, (a, b, c, d, e) = pedigree(keeper)
+
+    db.session.delete(owner)
+    db.session.commit()
+
+    assert flat_descendants(client, a) == {c.id, e.id}
+    assert {row.descendant_id for row in db.session.query(StrainLineage)} == {c.id, e.id}
+
+def relationship(client, a, b):
+    response = client.get(f'/api/strains/{a.id}/relationship/{b.id}')
+    assert response.status_code == 200
+    return response.get_json()['relationship']
+
+def test_private_tree_lineage_is_not_exposed(closure_app, client):
+    owner = make_user('owner')
+    make_user('stranger')
+    tree, (a, b, c, d, e) = pedigree(owner, is_public=False)
+
+    assert db.session.query(StrainLineage).count() == 0
+    assert flat_descendants(client, a) == set()
+    ancestors = client.get(f'/api/strains/{e.id}/ancestors').get_json()['lineage']
+    assert [node['id'] for node in ancestors['nodes']] == [e.id]
+    assert relationship(client, a, e)['a_is_ancestor_of_b'] is None
+    assert relationship(client, c, d)['shared_ancestors'] == []
+
+    other = client.application.test_client()
+    from src.models.user import User
+    login(other, User.query.filter_by(username='stranger').one())
+    assert flat_descendants(other, a) == set()
+    assert relationship(other, a, e)['a_is_ancestor_of_b'] is None
+
+    login(client, owner)
+    assert flat_descendants(client, a) == {c.id, e.id}
+    assert relationship(client, a, e)['a_is_ancestor_of_b'] == {'depth': 2, 'path_count': 1}
+
+def test_publishing_a_tree_adds_it_to_the_closure(closure_app, client):
+    owner = make_user('owner')
+    tree, (a, b, c, d, e) = pedigree(owner, is_public=False)
+    login(client, owner)
+
+    assert client.put(f'/api/family-trees/{tree.id}', json={'is_public': True}).status_code == 200
+    assert {row.descendant_id for row in db.session.query(StrainLineage)} == {c.id, e.id}
+    assert flat_descendants(closure_app.test_client(), a) == {c.id, e.id}
+
+    assert client.put(f'/api/family-trees/{tree.id}', json={'is_public': False}).status_code == 200
+    assert db.session.query(StrainLineage).count() == 0
+
+def test_walks_match_closure(closure_app, monkeypatch):
+    owner = make_user('owner')
+    tree = make_tree(owner)
+    s = make_strains(owner, 6)
+    for parent1, parent2, offspring in [(0, 1, 2), (0, 2, 3), (1, 3, 4), (2, 4, 5), (3, 4, 5)]:
+        make_cross(tree, s[parent1], s[parent2], s[offspring])
+    rebuild_lineage()
+    db.session.commit()
+
+    pairs = [(0, 5), (5, 0), (3, 4), (2, 5)]
+    from_closure = [lineage.lineage_relationship(s[x].id, s[y].id) for x, y in pairs]
+    flat_closure = [lineage.lineage_descendants(strain.id, depth) for strain in s for depth in (None, 2)]
+
+    monkeypatch.setattr(lineage, 'closure_covers', lambda user_id=None: False)
+    assert [lineage.lineage_relationship(s[x].id, s[y].id) for x, y in pairs] == from_closure
+    assert [lineage.lineage_descendants(strain.id, depth) for strain in s for depth in (None, 2)] == flat_closure
+
+def test_cyclic_pedigree_stops_at_max_depth(app):
+    owner = make_user('owner')
+    tree = make_tree(owner)
+    a, b, c = make_strains(owner, 3)
+    # a x b -> c and, in bad data, c x b -> a
+    make_cross(tree, a, b, c)
+    make_cross(tree, c, b, a)
+
+    result = lineage.query_lineage(c.id, 'ancestors', max_depth=6)
+    assert {node['id']: node['depth'] for node in result['nodes']} == {c.id: 0, a.id: 1, b.id: 1}
+    assert len(result['edges']) == 2
+    assert result['depth_reached'] == 1
@@ -0,0 +1,59 @@
+import os
+import random
+import time
+import pytest
+from conftest import make_user, make_tree
+from src.models.user import db
+from src.models.strain import Strain
+from src.models.family_tree import Cross
+from src.models import lineage
+
+# Opt-in: RUN_BENCHMARKS=1 python -m pytest -s tests/test_lineage_benchmark.py
+pytestmark = pytest.mark.skipif(not os.environ.get('RUN_BENCHMARKS'), reason='set RUN_BENCHMARKS=1 to run benchmarks')
+
+FOUNDERS = 500
+CROSSES = 50_000
+# Parents are drawn from the most recent strains, which keeps generations overlapping
+PARENT_WINDOW = 2_000
+
+def synthetic_pedigree(owner, tree):
+    """FOUNDERS strains, then CROSSES crosses each breeding one new offspring"""
+    rng = random.Random(42)
+    total = FOUNDERS + CROSSES
+    db.session.execute(Strain.__table__.insert(), [
+        {'name': f'bench {i}', 'created_by': owner.id} for i in range(total)
+    ])
+    ids = [strain_id for (strain_id,) in db.session.query(Strain.id).order_by(Strain.id)]
+    crosses = []
+    for index in range(FOUNDERS, total):
+        low = max(0, index - PARENT_WINDOW)
+        parent1, parent2 = rng.sample(range(low, index), 2)
+        crosses.append({
+            'parent1_id': ids[parent1], 'parent2_id': ids[parent2], 'offspring_id': ids[index],
+            'generation': 1, 'family_tree_id': tree.id
+        })
+    db.session.execute(Cross.__table__.insert(), crosses)
+    db.session.commit()
+    return ids
+
+def timed(label, call, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = call()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f'{label:<40} {best * 1000:9.1f} ms  {len(result["nodes"]):6} nodes  {len(result["edges"]):6} crosses')
+    return result
+
+def test_query_lineage_on_a_50k_cross_pedigree(app):
+    owner = make_user('owner')
+    ids = synthetic_pedigree(owner, make_tree(owner))
+    newest, middle, founder = ids[-1], ids[len(ids) // 2], ids[0]
+    print()
+    for max_depth in (5, lineage.DEFAULT_MAX_DEPTH):
+        timed(f'ancestors of newest, depth {max_depth}', lambda: lineage.query_lineage(newest, 'ancestors', max_depth))
+        timed(f'ancestors of middle, depth {max_depth}', lambda: lineage.query_lineage(middle, 'ancestors', max_depth))
+        result = timed(f'descendants of founder, depth {max_depth}',
+                       lambda: lineage.query_lineage(founder, 'descendants', max_depth))
+        assert result['depth_reached'] <= max_depth
@@ -0,0 +1,66 @@
+import base64
+import json
+import pytest
+from conftest import login, make_user
+from src.routes.pagination import decode_cursor, encode_cursor
+from src.routes.strain import STRAIN_CURSOR_KEYS
+from src.routes.family_tree import TREE_CURSOR_KEYS
+from datetime import datetime
+
+def raw_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+def test_cursor_round_trip():
+    values = [True, 'name', 7]
+    assert decode_cursor(encode_cursor(values), STRAIN_CURSOR_KEYS[1:]) == values
+    values = [datetime(2024, 5, 1, 12, 30), 3]
+    assert decode_cursor(encode_cursor(values), TREE_CURSOR_KEYS) == values
+
+@pytest.mark.parametrize('cursor', [
+    '***', raw_cursor({'dt': '2024-01-01'}), raw_cursor([{'x': 1}, 1]),
+    raw_cursor([{'dt': 'yesterday'}, 1]), raw_cursor([[1], 2]), raw_cursor([{'dt': 5}, 1]),
+    raw_cursor(['notadate', 1]), raw_cursor([1.5, None]), raw_cursor([{'dt': '2024-01-01'}, None]),
+    raw_cursor([{'dt': '2024-01-01'}, True]), raw_cursor([{'dt': '2024-01-01'}, '1']),
+    raw_cursor([{'dt': '2024-01-01'}]), raw_cursor([{'dt': '2024-01-01'}, 1, 2])
+])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError, match='Invalid cursor'):
+        decode_cursor(cursor, TREE_CURSOR_KEYS)
+
+TREE_PAYLOADS = [[{'x': 1}, 1], [{'dt': 'yesterday'}, 1], [[1], 2], ['notadate', 1], [1.5, None], [{'dt': '2024-01-01'}]]
+STRAIN_PAYLOADS = [['a', 'b', 'c', 1], [True, False, 'x'], [1, 0, 'x', 1], [True, False, None, 1], [True, False, 'x', 1.5]]
+
+@pytest.mark.parametrize('payload', TREE_PAYLOADS)
+def test_malformed_tree_cursor_is_a_bad_request(app, client, payload):
+    login(client, make_user('owner'))
+    cursor = raw_cursor(payload)
+    assert client.get('/api/family-trees/', query_string={'cursor': cursor}).status_code == 400
+    assert client.get('/api/family-trees/public', query_string={'cursor': cursor}).status_code == 400
+
+@pytest.mark.parametrize('payload', STRAIN_PAYLOADS)
+def test_malformed_strain_cursor_is_a_bad_request(app, client, payload):
+    cursor = raw_cursor(payload)
+    assert client.get('/api/strains/', query_string={'cursor': cursor}).status_code == 400
+    assert client.get('/api/strains/verified', query_string={'cursor': cursor}).status_code == 400
+
+def test_strain_cursor_pages_follow_catalog_order(app, client):
+    from src.models.user import db
+    from src.models.strain import Strain
+    from src.models.schema import backfill_strain_flags
+    owner = make_user('owner')
+    rows = [{'name': f'strain {i % 7}-{i}', 'created_by': owner.id, 'is_lab_tested': i % 3 == 0, 'is_verified': i % 2 == 0}
+            for i in range(20)]
+    rows.append({'name': 'legacy', 'created_by': owner.id, 'is_lab_tested': None, 'is_verified': None})
+    db.session.execute(Strain.__table__.insert(), rows)
+    db.session.commit()
+    backfill_strain_flags()
+
+    for url in ('/api/strains/', '/api/strains/verified'):
+        expected = [strain['id'] for strain in client.get(url, query_string={'per_page': 100}).get_json()['strains']]
+        seen = []
+        cursor = ''
+        while cursor is not None:
+            page = client.get(url, query_string={'cursor': cursor, 'per_page': 3}).get_json()
+            seen.extend(strain['id'] for strain in page['strains'])
+            cursor = page['next_cursor']
+        assert seen == expected
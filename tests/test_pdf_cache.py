@@ -0,0 +1,30 @@
+import os
+import pytest
+from src.main import create_app
+from src.models import pdf_cache
+
+def build_app(tmp_path, **config):
+    return create_app({'APP_ENV': 'production', 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}", **config})
+
+@pytest.mark.parametrize('export_enabled, cache_enabled, started', [
+    (False, True, False), (True, False, False), (True, True, True)
+])
+def test_sweeper_only_runs_with_pdf_export_and_cache(tmp_path, monkeypatch, export_enabled, cache_enabled, started):
+    calls = []
+    monkeypatch.setattr(pdf_cache, 'start_download_sweeper', calls.append)
+    app = build_app(tmp_path, PDF_EXPORT_ENABLED=export_enabled, PDF_CACHE_ENABLED=cache_enabled)
+    assert calls == ([app] if started else [])
+
+def test_render_directory_defaults_outside_the_package(tmp_path, monkeypatch):
+    app = build_app(tmp_path)
+    source_dir = os.path.dirname(os.path.dirname(os.path.abspath(pdf_cache.__file__)))
+    assert not app.instance_path.startswith(source_dir + os.sep)
+
+    monkeypatch.setattr(app, 'instance_path', str(tmp_path / 'instance'))
+    with app.app_context():
+        assert pdf_cache.pdf_cache_dir() == str(tmp_path / 'instance' / 'generated_pdfs')
+
+    app = build_app(tmp_path, PDF_CACHE_DIR=str(tmp_path / 'renders'))
+    with app.app_context():
+        assert pdf_cache.pdf_cache_dir() == str(tmp_path / 'renders')
+    assert os.path.isdir(tmp_path / 'renders')
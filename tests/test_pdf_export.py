@@ -0,0 +1,47 @@
+import os
+import pytest
+from conftest import make_user, make_tree, make_strains, make_cross
+from src.models.user import db
+from src.models.pdf_export_job import PdfExportJob
+from src.routes import pdf_export
+
+@pytest.fixture
+def export_app(app, tmp_path, monkeypatch):
+    from src.routes.pdf_export import pdf_bp
+    app.register_blueprint(pdf_bp)
+    app.config.update(PDF_CACHE_ENABLED=False, PDF_CACHE_DIR=str(tmp_path / 'renders'))
+    queued = []
+    monkeypatch.setattr(pdf_export, 'submit_pdf_job', queued.append)
+    monkeypatch.setattr(pdf_export, '_worker_app', None)
+    return queued
+
+def test_uncached_export_renders_on_the_worker_and_is_deleted_after_download(export_app, app, client, tmp_path):
+    owner = make_user('owner')
+    tree = make_tree(owner)
+    a, b, c = make_strains(owner, 3)
+    make_cross(tree, a, b, c)
+
+    confirmed = client.post('/api/pdf/confirm-payment', json={'payment_intent_id': 'pi', 'family_tree_id': tree.id})
+    assert confirmed.status_code == 202
+    job_id = confirmed.get_json()['job_id']
+    assert export_app == [job_id]
+    download_url = confirmed.get_json()['download_url']
+
+    # The request thread never renders: the download waits on the queue
+    assert client.get(download_url).status_code == 202
+    assert not os.path.exists(tmp_path / 'renders') or not os.listdir(tmp_path / 'renders')
+
+    with app.test_request_context():
+        config = pdf_export.worker_config()
+    pdf_export.run_pdf_job(job_id, config)
+    db.session.expire_all()
+    job = db.session.get(PdfExportJob, job_id)
+    assert job.status == 'done'
+    pdf_path = job.pdf_path
+    assert os.path.exists(pdf_path)
+
+    response = client.get(download_url)
+    assert response.status_code == 200
+    assert response.data.startswith(b'%PDF')
+    assert not os.path.exists(pdf_path)
+    assert client.get(download_url).status_code == 410
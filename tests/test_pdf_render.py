@@ -0,0 +1,39 @@
+import io
+import pytest
+from conftest import make_user, make_tree, make_strains, make_cross
+from src.models.user import db
+from src.models.family_tree import Cross
+from src.routes import pdf_render
+
+@pytest.mark.parametrize('stale_count', [0, 1])
+def test_progress_stays_in_range_with_a_stale_cross_count(app, monkeypatch, stale_count):
+    owner = make_user('owner')
+    tree = make_tree(owner)
+    strains = make_strains(owner, 9)
+    for index in range(0, 9, 3):
+        make_cross(tree, strains[index], strains[index + 1], strains[index + 2])
+    tree.crosses_count = stale_count
+    db.session.commit()
+
+    monkeypatch.setattr(pdf_render, 'PDF_PAGE_SIZE', 1)
+    reported = []
+    pdf_render.render_family_tree_pdf(tree, io.BytesIO(), 'basic', progress=reported.append)
+
+    streamed = [value for value in reported if value not in (10, 90)]
+    assert len(streamed) == 3
+    assert all(10 <= value <= 80 for value in streamed)
+    assert reported == sorted(reported)
+
+def test_missing_generation_groups_with_zero(app):
+    owner = make_user('owner')
+    tree = make_tree(owner)
+    strains = make_strains(owner, 12)
+    for index, generation in zip(range(0, 12, 3), [None, 0, None, 1]):
+        cross = make_cross(tree, strains[index], strains[index + 1], strains[index + 2])
+        # Set with Core so the rows hold real NULLs, as legacy rows can
+        db.session.execute(Cross.__table__.update().where(Cross.id == cross.id).values(generation=generation))
+    db.session.commit()
+
+    headings = [flowable.getPlainText() for flowable in pdf_render.family_tree_story(tree)
+                if isinstance(flowable, pdf_render.Paragraph) and flowable.getPlainText().endswith(' Generation')]
+    assert headings == ['F0 Generation', 'F1 Generation']
@@ -0,0 +1,53 @@
+import pytest
+from sqlalchemy import event
+from conftest import login, make_user, make_tree, make_strains, make_cross
+from src.models.user import db, User
+
+class QueryCounter:
+    def __enter__(self):
+        self.count = 0
+        event.listen(db.engine, 'before_cursor_execute', self.record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(db.engine, 'before_cursor_execute', self.record)
+
+    def record(self, *args):
+        self.count += 1
+
+def grow(owner, tree, size):
+    """Add `size` trees, crosses in `tree`, and strains by `size` different users"""
+    for index in range(size):
+        make_tree(owner, name=f'extra {index}')
+    strains = make_strains(owner, size + 2, prefix=f'batch {size}')
+    for index in range(size):
+        make_cross(tree, strains[index], strains[index + 1], strains[index + 2])
+        creator = User(username=f'creator {size}-{index}', email=f'creator{size}-{index}@example.com', password_hash='-')
+        db.session.add(creator)
+        db.session.flush()
+        make_strains(creator, 1, prefix=creator.username)[0].verified_by = owner.id
+    db.session.commit()
+
+def count_queries(client, url):
+    client.get(url)
+    with QueryCounter() as counter:
+        response = client.get(url)
+    assert response.status_code == 200
+    return counter.count
+
+@pytest.mark.parametrize('url', [
+    '/api/family-trees/?per_page=50',
+    '/api/family-trees/{tree_id}/crosses',
+    '/api/family-trees/{tree_id}',
+    '/api/strains/?per_page=50',
+])
+def test_query_count_does_not_grow_with_rows(app, client, url):
+    owner = make_user('owner')
+    tree = make_tree(owner)
+    login(client, owner)
+    url = url.format(tree_id=tree.id)
+
+    grow(owner, tree, 3)
+    small = count_queries(client, url)
+    grow(owner, tree, 30)
+    assert count_queries(client, url) == small
@@ -0,0 +1,77 @@
+import re
+import pytest
+from sqlalchemy import event
+from conftest import login, make_user, make_tree, make_strains, make_cross
+from src.models.user import db
+
+# A plan step reading a whole table, or sorting rows the index should have ordered
+FULL_SCAN = re.compile(r'^SCAN (\w+)\b(?! USING (COVERING )?INDEX)')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+class PlanRecorder:
+    """EXPLAIN QUERY PLAN for every statement one request runs"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __enter__(self):
+        event.listen(db.engine, 'before_cursor_execute', self.record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(db.engine, 'before_cursor_execute', self.record)
+
+    def record(self, connection, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            self.statements.append((statement, parameters))
+
+    def problems(self):
+        found = []
+        with db.engine.connect() as connection:
+            for statement, parameters in self.statements:
+                for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters):
+                    detail = row[-1]
+                    if FULL_SCAN.match(detail) or TEMP_SORT in detail:
+                        found.append(f'{detail}\n    in {statement}')
+        return found
+
+@pytest.fixture
+def catalog(app, client):
+    owner = make_user('owner')
+    strains = make_strains(owner, 60)
+    for index, strain in enumerate(strains):
+        strain.is_lab_tested = index % 5 == 0
+        strain.is_verified = index % 3 == 0
+    db.session.commit()
+    trees = [make_tree(owner, is_public=index % 2 == 0, name=f'tree {index}') for index in range(6)]
+    for index in range(0, 57, 3):
+        make_cross(trees[index % 6], strains[index], strains[index + 1], strains[index + 2], generation=index // 9 + 1)
+    login(client, owner)
+    return {'owner': owner, 'strains': strains, 'trees': trees}
+
+def next_cursor(client, url):
+    return client.get(url, query_string={'cursor': '', 'per_page': 2}).get_json()['next_cursor']
+
+def hot_urls(client, catalog):
+    tree_id = catalog['trees'][0].id
+    strain_id = catalog['strains'][3].id
+    return [
+        '/api/strains/?per_page=5&page=3',
+        f"/api/strains/?per_page=5&cursor={next_cursor(client, '/api/strains/')}",
+        f"/api/strains/verified?per_page=5&cursor={next_cursor(client, '/api/strains/verified')}",
+        '/api/family-trees/?per_page=2',
+        f"/api/family-trees/?per_page=2&cursor={next_cursor(client, '/api/family-trees/')}",
+        '/api/family-trees/public?per_page=2',
+        f"/api/family-trees/public?per_page=2&cursor={next_cursor(client, '/api/family-trees/public')}",
+        f'/api/family-trees/{tree_id}',
+        f'/api/family-trees/{tree_id}/crosses',
+        f'/api/strains/{strain_id}',
+    ]
+
+def test_hot_queries_use_indexes(catalog, client):
+    for url in hot_urls(client, catalog):
+        with PlanRecorder() as plans:
+            response = client.get(url)
+        assert response.status_code == 200, url
+        assert plans.statements, url
+        assert plans.problems() == [], url
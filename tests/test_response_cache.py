@@ -0,0 +1,71 @@
+import os
+import time
+import pytest
+from conftest import login, make_user, make_tree
+from src.models.user import User
+from src.routes.response_cache import response_cache
+
+@pytest.fixture
+def public_trees(app, tmp_path):
+    app.config['RESPONSE_CACHE_DIR'] = str(tmp_path / 'responses')
+    response_cache.clear()
+    owner = make_user('owner')
+    for index in range(3):
+        make_tree(owner, name=f'tree {index}')
+    yield app.config['RESPONSE_CACHE_DIR']
+    response_cache.clear()
+
+def cache_status(client, query_string):
+    response = client.get('/api/family-trees/public', query_string=query_string)
+    assert response.status_code == 200
+    return response.headers['X-Cache']
+
+def test_unrecognized_parameters_share_one_entry(public_trees, client):
+    assert cache_status(client, {'per_page': 2}) == 'MISS'
+    assert cache_status(client, {'per_page': 2, 'junk': 'a'}) == 'HIT'
+    assert cache_status(client, {'per_page': '2', 'page': 1, 'utm_source': 'b'}) == 'HIT'
+    assert cache_status(client, {'per_page': 2, 'page': 2}) == 'MISS'
+
+    assert cache_status(client, {'per_page': 2, 'cursor': ''}) == 'MISS'
+    assert cache_status(client, {'per_page': 2, 'cursor': '', 'junk': 'c'}) == 'HIT'
+    assert cache_status(client, {'per_page': 2, 'cursor': '', 'include_total': 'true'}) == 'MISS'
+    assert len(os.listdir(public_trees)) == 4
+
+def test_disk_bodies_expire(public_trees, client, app):
+    assert cache_status(client, {'per_page': 2}) == 'MISS'
+    response_cache.clear()
+    assert cache_status(client, {'per_page': 2}) == 'HIT'
+
+    response_cache.clear()
+    app.config['RESPONSE_CACHE_TTL'] = 60
+    for name in os.listdir(public_trees):
+        path = os.path.join(public_trees, name)
+        os.utime(path, (time.time() - 120, time.time() - 120))
+    assert cache_status(client, {'per_page': 2}) == 'MISS'
+
+def test_evict_disk_trims_expired_then_oldest(tmp_path, app):
+    directory = tmp_path / 'responses'
+    directory.mkdir()
+    now = time.time()
+    for name, age in [('old.json', 500), ('a.json', 30), ('b.json', 20), ('c.json', 10), ('partial.json.1234.tmp', 500), ('notes.txt', 500)]:
+        path = directory / name
+        path.write_bytes(b'x' * 100)
+        os.utime(path, (now - age, now - age))
+
+    assert response_cache.evict_disk(str(directory), max_bytes=200, ttl=300) == 3
+    assert sorted(os.listdir(directory)) == ['b.json', 'c.json', 'notes.txt']
+
+def test_writes_only_invalidate_what_they_change(public_trees, client):
+    owner = User.query.filter_by(username='owner').one()
+    login(client, owner)
+    private = make_tree(owner, is_public=False, name='private')
+    assert cache_status(client, {'per_page': 2}) == 'MISS'
+
+    assert client.put(f'/api/family-trees/{private.id}', json={'name': 'renamed'}).status_code == 200
+    assert cache_status(client, {'per_page': 2}) == 'HIT'
+
+    assert client.put(f'/api/family-trees/{private.id}', json={'is_public': True}).status_code == 200
+    assert cache_status(client, {'per_page': 2}) == 'MISS'
+
+def test_cache_stats_are_not_exposed(app, client):
+    assert client.get('/api/family-trees/cache-stats').status_code in (404, 405)
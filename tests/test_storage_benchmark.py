@@ -0,0 +1,123 @@
+import multiprocessing
+import os
+import time
+import pytest
+from conftest import login, make_user, make_tree, make_strains, make_cross
+from src.main import create_app
+from src.models.user import db, User
+
+# Opt-in: RUN_BENCHMARKS=1 python -m pytest -s tests/test_storage_benchmark.py
+# Run on a multi-core machine; on one core the processes only measure CPU contention.
+pytestmark = [
+    pytest.mark.skipif(not os.environ.get('RUN_BENCHMARKS'), reason='set RUN_BENCHMARKS=1 to run benchmarks'),
+    pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='needs fork')
+]
+
+DURATION = float(os.environ.get('BENCH_SECONDS', '8'))
+READERS = 4
+WRITERS = 2
+# Crosses in the tree the readers fetch, and per batch the writers post
+READ_TREE_CROSSES = 40
+WRITE_BATCH = 20
+
+def build_app(path, production):
+    return create_app({
+        'APP_ENV': 'production',
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'SQLITE_PRODUCTION': production,
+        'PDF_EXPORT_ENABLED': False
+    })
+
+def reader(path, production, tree_id, user_id, results):
+    app = build_app(path, production)
+    client = app.test_client()
+    with app.app_context():
+        login(client, db.session.get(User, user_id))
+    ok = errors = 0
+    latencies = []
+    end = time.time() + DURATION
+    while time.time() < end:
+        started = time.perf_counter()
+        response = client.get(f'/api/family-trees/{tree_id}/crosses')
+        latencies.append(time.perf_counter() - started)
+        if response.status_code == 200:
+            ok += 1
+        else:
+            errors += 1
+    results.put(('read', ok, errors, latencies))
+
+def writer(path, production, tree_id, user_id, strain_ids, results):
+    app = build_app(path, production)
+    client = app.test_client()
+    with app.app_context():
+        login(client, db.session.get(User, user_id))
+    ok = errors = 0
+    batch = 0
+    end = time.time() + DURATION
+    while time.time() < end:
+        crosses = [{
+            'parent1_id': strain_ids[(batch + k) % len(strain_ids)],
+            'parent2_id': strain_ids[(batch + k + 1) % len(strain_ids)],
+            'offspring_name': f'writer {os.getpid()} {batch}-{k}'
+        } for k in range(WRITE_BATCH)]
+        response = client.post(f'/api/family-trees/{tree_id}/crosses/batch', json={'crosses': crosses})
+        batch += 1
+        if response.status_code == 201:
+            ok += 1
+        else:
+            errors += 1
+    results.put(('write', ok, errors, []))
+
+def seed(path):
+    app = create_app({
+        'TESTING': True,
+        'APP_ENV': 'development',
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'PDF_EXPORT_ENABLED': False
+    })
+    with app.app_context():
+        owner = make_user('owner')
+        read_tree = make_tree(owner, name='read')
+        strains = make_strains(owner, READ_TREE_CROSSES * 3)
+        for index in range(0, len(strains), 3):
+            make_cross(read_tree, strains[index], strains[index + 1], strains[index + 2])
+        write_tree = make_tree(owner, name='write')
+        ids = (read_tree.id, write_tree.id, owner.id, [strain.id for strain in strains[:50]])
+        db.session.remove()
+        db.engine.dispose()
+    return ids
+
+def run(path, production, writers):
+    read_tree_id, write_tree_id, user_id, strain_ids = seed(path)
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    processes = [context.Process(target=reader, args=(path, production, read_tree_id, user_id, results))
+                 for _ in range(READERS)]
+    processes += [context.Process(target=writer, args=(path, production, write_tree_id, user_id, strain_ids, results))
+                  for _ in range(writers)]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    reads = [result for result in collected if result[0] == 'read']
+    writes = [result for result in collected if result[0] == 'write']
+    latencies = sorted(latency for result in reads for latency in result[3])
+    return {
+        'reads_per_second': sum(result[1] for result in reads) / DURATION,
+        'read_errors': sum(result[2] for result in reads),
+        'batches_per_second': sum(result[1] for result in writes) / DURATION,
+        'write_errors': sum(result[2] for result in writes),
+        'read_p50_ms': 1000 * latencies[len(latencies) // 2],
+        'read_p99_ms': 1000 * latencies[int(len(latencies) * 0.99)]
+    }
+
+@pytest.mark.parametrize('writers', [0, WRITERS])
+@pytest.mark.parametrize('production', [False, True], ids=['default', 'sqlite-production'])
+def test_read_throughput_during_write_bursts(tmp_path, production, writers):
+    result = run(str(tmp_path / 'bench.db'), production, writers)
+    print(f"\n{'production' if production else 'default':<10} writers={writers} "
+          f"reads/s {result['reads_per_second']:.0f} (p50 {result['read_p50_ms']:.0f} ms, p99 {result['read_p99_ms']:.0f} ms) "
+          f"batches/s {result['batches_per_second']:.1f} errors {result['read_errors']}/{result['write_errors']}")
+    assert result['read_errors'] == 0
+    assert result['write_errors'] == 0
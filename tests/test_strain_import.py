@@ -0,0 +1,37 @@
+import io
+import json
+from conftest import login, make_user
+from src.models.strain import Strain
+from src.models.strain_import import import_strains
+
+def ndjson(*names):
+    return b''.join(json.dumps({'name': name}).encode() + b'\n' for name in names)
+
+def test_invalid_utf8_returns_partial_report(app, client):
+    user = make_user('importer')
+    login(client, user)
+    body = ndjson('Blue Dream', 'Sour Diesel') + b'{"name": "Bad \xff Kush"}\n' + ndjson('Never Read')
+
+    response = client.post('/api/strains/import?format=ndjson', data=body)
+    assert response.status_code == 400
+    report = response.get_json()
+    assert report['accepted'] == 2
+    assert report['error'] == 'Line 3 is not valid UTF-8'
+    assert sorted(name for (name,) in Strain.query.with_entities(Strain.name)) == ['Blue Dream', 'Sour Diesel']
+
+def test_decode_error_keeps_committed_batches(app):
+    user = make_user('importer')
+    body = ndjson('a', 'b', 'c') + b'\xc3\x28\n' + ndjson('d')
+
+    report = import_strains(io.BytesIO(body), 'ndjson', user.id, batch_size=2)
+    assert (report.accepted, report.rejected, report.error) == (3, 0, 'Line 4 is not valid UTF-8')
+    assert Strain.query.count() == 3
+
+def test_csv_with_bom_and_multibyte_names(app):
+    user = make_user('importer')
+    body = '﻿name,description\nCrème Brûlée,"spans\nlines"\n'.encode()
+
+    report = import_strains(io.BytesIO(body), 'csv', user.id)
+    assert (report.accepted, report.error) == (1, None)
+    strain = Strain.query.one()
+    assert (strain.name, strain.description) == ('Crème Brûlée', 'spans\nlines')
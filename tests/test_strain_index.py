@@ -0,0 +1,85 @@
+import threading
+import time
+from conftest import make_user, make_strains
+from src.models.user import db
+from src.models.strain import Strain
+from src.models import strain_index
+from src.models.strain_index import StrainNameIndex
+
+def names(index, prefix):
+    return [entry['name'] for entry in index.lookup(prefix)]
+
+def test_concurrent_first_lookups_load_once(app):
+    make_strains(make_user('owner'), 3, prefix='kush')
+    index = StrainNameIndex()
+    real_load = index.load
+    loads = []
+
+    def slow_load():
+        loads.append(1)
+        time.sleep(0.05)
+        real_load()
+
+    index.load = slow_load
+    results = []
+
+    def lookup():
+        with app.app_context():
+            results.append(len(index.lookup('kush')))
+
+    threads = [threading.Thread(target=lookup) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+    assert results == [3] * 5
+
+def test_stale_index_refreshes_in_background(app, monkeypatch):
+    owner = make_user('owner')
+    make_strains(owner, 2, prefix='haze')
+    index = StrainNameIndex()
+    index.lookup('haze')
+    make_strains(owner, 1, prefix='haze extra')
+
+    real_load = index.load
+    release = threading.Event()
+    loads = []
+
+    def blocked_load():
+        loads.append(1)
+        release.wait(5)
+        real_load()
+
+    index.load = blocked_load
+    monkeypatch.setattr(strain_index, 'INDEX_TTL', 0)
+    index.loaded_at -= 1
+    # Old snapshot keeps answering while a single reload is held up
+    assert len(names(index, 'haze')) == 2
+    assert len(names(index, 'haze')) == 2
+    assert len(loads) == 1
+
+    monkeypatch.setattr(strain_index, 'INDEX_TTL', 300)
+    release.set()
+    for _ in range(100):
+        if not index.refreshing:
+            break
+        time.sleep(0.01)
+    assert len(names(index, 'haze')) == 3
+
+def test_writes_during_a_load_are_replayed(app, monkeypatch):
+    strain, = make_strains(make_user('owner'), 1, prefix='skunk')
+    index = StrainNameIndex()
+    real_query = db.session.query
+
+    def query_with_write(*args):
+        # Another request renames the strain after the load started
+        index.upsert(Strain(id=strain.id, name='Blue Dream', strain_type=strain.strain_type))
+        return real_query(*args)
+
+    monkeypatch.setattr(db.session, 'query', query_with_write)
+    index.load()
+    monkeypatch.undo()
+
+    assert names(index, 'blue') == ['Blue Dream']
+    assert names(index, 'skunk') == []
@@ -0,0 +1,65 @@
+from conftest import make_user
+from src.models.user import db
+from src.models.strain import Strain
+from src.models.strain_search import apply_strain_search, strain_search_enabled
+
+def add_strains(owner, *specs):
+    strains = [Strain(created_by=owner.id, **spec) for spec in specs]
+    db.session.add_all(strains)
+    db.session.commit()
+    return strains
+
+def search(text, **kwargs):
+    return [strain.name for strain in apply_strain_search(Strain.query, text, **kwargs)]
+
+def test_schema_setup_enables_fts(app):
+    assert app.config['STRAIN_SEARCH_FTS'] is True
+    # Apps that skip schema setup find the index on first search
+    del app.config['STRAIN_SEARCH_FTS']
+    assert strain_search_enabled() is True
+
+def test_prefix_matching(app):
+    owner = make_user('owner')
+    add_strains(owner,
+        {'name': 'Blue Dream'},
+        {'name': 'Bluebird'},
+        {'name': 'Sour Diesel'},
+        {'name': 'Crème Brûlée'}
+    )
+
+    assert sorted(search('blu')) == ['Blue Dream', 'Bluebird']
+    assert search('blue dr') == ['Blue Dream']
+    assert search('dies') == ['Sour Diesel']
+    assert search('creme') == ['Crème Brûlée']
+    # Tokens match word prefixes only, not infixes
+    assert search('ream') == []
+    assert search('?!') == []
+
+def test_ranking_order(app):
+    owner = make_user('owner')
+    add_strains(owner,
+        {'name': 'Afghani', 'description': 'kush landrace parent'},
+        {'name': 'Hindu Kush'},
+        {'name': 'Purple Haze', 'description': 'kush hybrid', 'is_verified': True},
+        {'name': 'Master Kush', 'is_lab_tested': True},
+        {'name': 'Zkittlez'}
+    )
+
+    # Lab tested, then verified, then a name hit (weight 10) before a description hit
+    assert search('kush') == ['Master Kush', 'Purple Haze', 'Hindu Kush', 'Afghani']
+    assert search('kush', columns=['name']) == ['Master Kush', 'Hindu Kush']
+    assert sorted(search('kush', ranked=False)) == ['Afghani', 'Hindu Kush', 'Master Kush', 'Purple Haze']
+
+def test_like_fallback_without_fts(app):
+    owner = make_user('owner')
+    add_strains(owner,
+        {'name': 'Blue Dream', 'description': 'sativa'},
+        {'name': 'Dream Queen', 'is_verified': True},
+        {'name': 'Sour Diesel', 'description': 'dreamy finish'}
+    )
+    app.config['STRAIN_SEARCH_FTS'] = False
+
+    # Case-insensitive substring match, ordered by tier then name
+    assert search('REAM') == ['Dream Queen', 'Blue Dream', 'Sour Diesel']
+    assert search('ream', columns=['name']) == ['Dream Queen', 'Blue Dream']
+    assert search('blue dr') == ['Blue Dream']
@@ -0,0 +1,29 @@
+from sqlalchemy.orm import Session
+from conftest import login, make_user, make_strains
+from src.models.user import db
+from src.models.strain import Strain
+
+def test_concurrent_edits_both_bump_the_version(app):
+    strain, = make_strains(make_user('owner'), 1)
+    assert strain.version == 1
+
+    with Session(db.engine) as other:
+        stale = other.get(Strain, strain.id)
+        strain.description = 'first edit'
+        db.session.commit()
+        # Loaded before the first edit committed; still saves without a StaleDataError
+        stale.thc_content = 20.0
+        other.commit()
+
+    db.session.expire_all()
+    strain = db.session.get(Strain, strain.id)
+    assert (strain.description, strain.thc_content, strain.version) == ('first edit', 20.0, 3)
+
+def test_update_moves_the_etag(app, client):
+    owner = make_user('owner')
+    strain, = make_strains(owner, 1)
+    login(client, owner)
+    etag = client.get(f'/api/strains/{strain.id}').headers['ETag']
+
+    assert client.put(f'/api/strains/{strain.id}', json={'description': 'edited'}).status_code == 200
+    assert client.get(f'/api/strains/{strain.id}').headers['ETag'] != etag
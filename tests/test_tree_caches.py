@@ -0,0 +1,49 @@
+import pytest
+from conftest import login, make_user, make_tree, make_strains, make_cross
+from src.models.user import db
+from src.models.family_tree import FamilyTree
+from src.models.pdf_cache import pdf_cache_key
+
+@pytest.fixture
+def pedigree(app, client):
+    owner = make_user('owner')
+    tree = make_tree(owner)
+    a, b, c, d, e, unrelated = make_strains(owner, 6)
+    make_cross(tree, a, b, c)
+    make_cross(tree, c, d, e)
+    login(client, owner)
+    return tree, (a, b, c, d, e, unrelated)
+
+def rename(client, strain, name):
+    assert client.put(f'/api/strains/{strain.id}', json={'name': name}).status_code == 200
+
+def test_pdf_cache_key_follows_strain_edits(pedigree, client):
+    tree, (a, b, c, d, e, unrelated) = pedigree
+    key = pdf_cache_key(tree, 'basic')
+
+    rename(client, unrelated, 'Still unrelated')
+    assert pdf_cache_key(db.session.get(FamilyTree, tree.id), 'basic') == key
+
+    rename(client, c, 'Renamed offspring')
+    assert pdf_cache_key(db.session.get(FamilyTree, tree.id), 'basic') != key
+
+def kinship_names(client, tree):
+    strains = client.get(f'/api/family-trees/{tree.id}/kinship').get_json()['strains']
+    return {strain['name'] for strain in strains}
+
+def test_kinship_cache_follows_strain_edits(pedigree, client):
+    tree, (a, b, c, d, e, unrelated) = pedigree
+    assert 'strain 2' in kinship_names(client, tree)
+
+    rename(client, c, 'Renamed offspring')
+    names = kinship_names(client, tree)
+    assert 'Renamed offspring' in names and 'strain 2' not in names
+
+def test_layout_cache_follows_strain_edits(pedigree, client):
+    tree, (a, b, c, d, e, unrelated) = pedigree
+    layout = client.get(f'/api/family-trees/{tree.id}/layout').get_json()
+    assert 'strain 2' in {node['name'] for node in layout['nodes']}
+
+    rename(client, c, 'Renamed offspring')
+    layout = client.get(f'/api/family-trees/{tree.id}/layout').get_json()
+    assert 'Renamed offspring' in {node['name'] for node in layout['nodes']}